@@ -1,4 +1,5 @@
-from fastapi import Depends
+from fastapi import Depends, HTTPException, Query
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.services.team_service import Team_Service
 from app.services.mongodb_service import MongoDB_Service
@@ -11,8 +12,16 @@ from app.services.company_service import Company_Service
 from app.services.crm_service import CRM_Service
 from app.services.prospect_service import Prospect_Service
 from app.services.quote_service import Quote_Service
+from app.services.pricing_service import Pricing_Service
+from app.services.reporting_service import Reporting_Service
+from app.services.dynamic_entity_service import DynamicEntityService
+from app.services.workflow_runtime import WorkflowRuntimeService
 from app.services.file_service import File_Service
 from app.services.email_service import Email_Service
+from app.services.template_extraction_service import Template_Extraction_Service
+from app.services.data_loader import OrgDataLoader
+from app.schemas.user import UserContext, AuthenticatedUser
+from app.utils.auth import AuthError, JWKSCache, TokenVerifier, http_jwks_fetcher
 from app.config import settings
 
 
@@ -23,8 +32,48 @@ async def get_mongodb_client():
     finally:
         client.close()
 
-def get_company_service(client: AsyncIOMotorClient = Depends(get_mongodb_client)):
-    return Company_Service(client)
+# Auth0 signing keys, cached per worker and refreshed in the background (started in main.py)
+jwks_cache = JWKSCache(
+    http_jwks_fetcher(f"https://{settings.AUTH0_DOMAIN}/.well-known/jwks.json"),
+    refresh_seconds=settings.JWKS_REFRESH_SECONDS,
+    min_refetch_seconds=settings.JWKS_MIN_REFETCH_SECONDS,
+)
+token_verifier = TokenVerifier(
+    jwks_cache,
+    issuer=f"https://{settings.AUTH0_DOMAIN}/",
+    audience=settings.AUTH0_AUDIENCE,
+    claims_namespace=settings.AUTH0_CLAIMS_NAMESPACE,
+)
+bearer_scheme = HTTPBearer(auto_error=False)
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> AuthenticatedUser:
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    try:
+        return await token_verifier.verify(credentials.credentials)
+    except AuthError as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+
+# owner_org comes from the token claims, so the common path opens no database client.
+# Tokens issued before the claim existed fall back to the cached user context.
+async def get_owner_org(user: AuthenticatedUser = Depends(get_current_user)) -> str:
+    if user.owner_org:
+        return user.owner_org
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    try:
+        context = await User_Service(client).get_user_context(auth0_id=user.sub)
+    finally:
+        client.close()
+    if not context or not context.org:
+        raise HTTPException(status_code=403, detail="User has no organization")
+    return context.org
+
+# One loader per request (FastAPI caches dependencies per request), shared by every service
+def get_org_loader():
+    return OrgDataLoader()
+
+def get_company_service(client: AsyncIOMotorClient = Depends(get_mongodb_client), loader: OrgDataLoader = Depends(get_org_loader)):
+    return Company_Service(client, loader)
 
 def get_team_service(client: AsyncIOMotorClient = Depends(get_mongodb_client)):
     return Team_Service(client)
@@ -41,23 +90,45 @@ def get_project_service(client: AsyncIOMotorClient = Depends(get_mongodb_client)
 def get_user_service(client: AsyncIOMotorClient = Depends(get_mongodb_client)):
     return User_Service(client)
 
+# Resolved once per request, and served from the user context cache across requests
+async def get_user_context(email: str = Query(...), user_service: User_Service = Depends(get_user_service)) -> UserContext:
+    context = await user_service.get_user_context(email=email)
+    if not context:
+        raise HTTPException(status_code=404, detail="User not found")
+    return context
+
 def get_dashboard_service(client: AsyncIOMotorClient = Depends(get_mongodb_client)):
     return Dashboard_Service(client)
 
-def get_invoice_service(client: AsyncIOMotorClient = Depends(get_mongodb_client)):
-    return Invoice_Service(client)
+def get_invoice_service(client: AsyncIOMotorClient = Depends(get_mongodb_client), loader: OrgDataLoader = Depends(get_org_loader)):
+    return Invoice_Service(client, loader)
+
+def get_company_service(client: AsyncIOMotorClient = Depends(get_mongodb_client), loader: OrgDataLoader = Depends(get_org_loader)):
+    return Company_Service(client, loader)
+
+def get_crm_service(client: AsyncIOMotorClient = Depends(get_mongodb_client), loader: OrgDataLoader = Depends(get_org_loader)):
+    return CRM_Service(client, loader)
+
+def get_prospect_service(client: AsyncIOMotorClient = Depends(get_mongodb_client), loader: OrgDataLoader = Depends(get_org_loader)):
+    return Prospect_Service(client, loader)
+
+def get_quote_service(client: AsyncIOMotorClient = Depends(get_mongodb_client), loader: OrgDataLoader = Depends(get_org_loader)):
+    return Quote_Service(client, loader)
+
+def get_template_extraction_service(client: AsyncIOMotorClient = Depends(get_mongodb_client)):
+    return Template_Extraction_Service(client)
 
-def get_company_service(client: AsyncIOMotorClient = Depends(get_mongodb_client)):
-    return Company_Service(client)
+def get_pricing_service(client: AsyncIOMotorClient = Depends(get_mongodb_client), loader: OrgDataLoader = Depends(get_org_loader)):
+    return Pricing_Service(client, loader)
 
-def get_crm_service(client: AsyncIOMotorClient = Depends(get_mongodb_client)):
-    return CRM_Service(client)
+def get_reporting_service(client: AsyncIOMotorClient = Depends(get_mongodb_client)):
+    return Reporting_Service(client)
 
-def get_prospect_service(client: AsyncIOMotorClient = Depends(get_mongodb_client)):
-    return Prospect_Service(client)
+def get_dynamic_entity_service(client: AsyncIOMotorClient = Depends(get_mongodb_client)):
+    return DynamicEntityService(client)
 
-def get_quote_service(client: AsyncIOMotorClient = Depends(get_mongodb_client)):
-    return Quote_Service(client)
+def get_workflow_runtime_service(client: AsyncIOMotorClient = Depends(get_mongodb_client)):
+    return WorkflowRuntimeService(client)
 
 def get_file_service():
     return File_Service()
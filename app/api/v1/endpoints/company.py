@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, Body, Query
 from app.schemas.company import Company, Payment
 from app.schemas.collections import PricingData
+from app.schemas.pricing import OrgTotalsReport
 from app.services.company_service import Company_Service
-from app.api.deps import get_company_service
+from app.services.pricing_service import Pricing_Service
+from app.api.deps import get_company_service, get_pricing_service
+from app.utils.responses import ModelResponse
 
 router = APIRouter()
 
@@ -41,7 +44,7 @@ async def get_pricing_data(
     owner: str = Query(...),
     pricing_service: Company_Service = Depends(get_company_service)
 ):
-    return await pricing_service.get_pricing_data(owner)
+    return ModelResponse(await pricing_service.get_pricing_data(owner))
 
 @router.post("/pricing/", response_model=PricingData)
 async def update_pricing_data(
@@ -49,4 +52,12 @@ async def update_pricing_data(
     pricing_data: PricingData = Body(...),
     pricing_service: Company_Service = Depends(get_company_service)
 ):
-    return await pricing_service.update_pricing_data(owner, pricing_data)
\ No newline at end of file
+    return ModelResponse(await pricing_service.update_pricing_data(owner, pricing_data))
+
+# Server-side recomputation of every quote and invoice total of an org
+@router.get("/totals-report/", response_model=OrgTotalsReport)
+async def get_totals_report(
+    owner: str = Query(...),
+    pricing_service: Pricing_Service = Depends(get_pricing_service)
+):
+    return ModelResponse(await pricing_service.totals_report(owner))
@@ -3,6 +3,7 @@ from app.schemas.crm import CustomerNamesList
 from app.schemas.collections import CRM_Data
 from app.services.crm_service import CRM_Service
 from app.api.deps import get_crm_service
+from app.utils.responses import ModelResponse
 
 router = APIRouter()
 
@@ -14,7 +15,7 @@ async def get_crm_data(
     owner: str = Query(...),
     crm_service: CRM_Service = Depends(get_crm_service)
 ):
-    return await crm_service.get_crm_data(owner)
+    return ModelResponse(await crm_service.get_crm_data(owner))
 
 
 @router.get("/customer-list/", response_model=CustomerNamesList)
@@ -22,7 +23,7 @@ async def customer_list(
     owner: str = Query(...),
     crm_service: CRM_Service = Depends(get_crm_service)
 ):
-    return await crm_service.customer_list(owner)
+    return ModelResponse(await crm_service.customer_list(owner))
 
 # # # # # # # All POST Routes # # # # # # # # # #
 # # # # # # # # # # # # # # # # # # # # # # # # #
@@ -33,7 +34,7 @@ async def update_crm_data(
     crm_data: CRM_Data = Body(...),
     crm_service: CRM_Service = Depends(get_crm_service)
 ):
-    return await crm_service.update_crm_data(owner, crm_data)
+    return ModelResponse(await crm_service.update_crm_data(owner, crm_data))
 
 
 @router.post("/delete/")
@@ -5,6 +5,7 @@ from typing import List
 from app.schemas.dashboard import DashboardItem
 from app.services.dashboard_service import Dashboard_Service
 from app.api.deps import get_dashboard_service
+from app.utils.responses import ModelResponse
 
 router = APIRouter()
 
@@ -13,7 +14,7 @@ async def get_dashboard_data(
     owner_org: str = Query(..., description="Organization ID to filter slates"),
     dashboard_service: Dashboard_Service = Depends(get_dashboard_service)
 ):
-    return await dashboard_service.get_dashboard_data(owner_org)
+    return ModelResponse(await dashboard_service.get_dashboard_data(owner_org))
 
 @router.get("/dashboard-kpis")
 async def get_dashboard_kpis(
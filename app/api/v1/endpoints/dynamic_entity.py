@@ -1,7 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import Dict, Any, List
+# app/api/v1/endpoints/dynamic_entity.py
+
+from fastapi import APIRouter, Depends, HTTPException, Body, Query
+from typing import Dict, Any, List, Optional
 from app.services.dynamic_entity_service import DynamicEntityService
-from app.schemas.dynamic_entity import EntitySchema, EntityInstance, CompanyWorkflow
+from app.services.workflow_runtime import WorkflowRuntimeService, workflow_worker
+from app.schemas.dynamic_entity import EntitySchema, WorkflowDefinition, BulkEntityRequest, BulkEntityResult, EntityQuery, EntityPage, StepCompletion
+from app.api.deps import get_dynamic_entity_service, get_workflow_runtime_service
+from app.config import settings
+from app.utils.responses import ModelResponse
 
 router = APIRouter()
 
@@ -9,60 +15,207 @@ router = APIRouter()
 async def create_schema(
     company_id: str,
     schema: EntitySchema,
-    service: DynamicEntityService = Depends()
+    service: DynamicEntityService = Depends(get_dynamic_entity_service)
 ) -> Dict:
     """Create a new entity schema for a company"""
-    return await service.create_schema(company_id, schema)
+    try:
+        return ModelResponse(await service.create_schema(company_id, schema))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/companies/{company_id}/schemas")
 async def list_schemas(
     company_id: str,
-    service: DynamicEntityService = Depends()
+    service: DynamicEntityService = Depends(get_dynamic_entity_service)
 ) -> List[Dict]:
     """List all schemas for a company"""
-    return await service.list_schemas(company_id)
+    return ModelResponse(await service.list_schemas(company_id))
+
+@router.post("/workflows")
+async def create_workflow(
+    workflow: WorkflowDefinition,
+    service: DynamicEntityService = Depends(get_dynamic_entity_service)
+) -> Dict:
+    """Create a workflow; its schemas and field mappings must exist"""
+    try:
+        return ModelResponse(await service.create_workflow(workflow))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/companies/{company_id}/entities")
 async def create_entity(
     company_id: str,
-    schema_id: str,
-    data: Dict[str, Any],
-    relationships: Dict[str, str] = None,
-    service: DynamicEntityService = Depends()
+    workflow_id: str,
+    step_name: str,
+    data: Dict[str, Any] = Body(...),
+    relationships: Optional[Dict[str, List[str]]] = Body(None),
+    service: DynamicEntityService = Depends(get_dynamic_entity_service)
 ) -> Dict:
-    """Create a new entity instance"""
+    """Create a new entity instance; relationships map a declared type to entity ids"""
     try:
-        return await service.create_entity(
+        return ModelResponse(await service.create_entity(
             company_id, 
-            schema_id, 
-            data, 
+            workflow_id, 
+            step_name, 
+            data,
             relationships
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/companies/{company_id}/entities/bulk", response_model=BulkEntityResult)
+async def bulk_create_entities(
+    company_id: str,
+    request: BulkEntityRequest,
+    service: DynamicEntityService = Depends(get_dynamic_entity_service)
+):
+    """Create many entities for one workflow step; invalid rows are reported, not fatal"""
+    if len(request.entities) > settings.ENTITY_BULK_MAX_ENTITIES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.ENTITY_BULK_MAX_ENTITIES} entities per request"
+        )
+    try:
+        return await service.bulk_create_entities(
+            company_id,
+            request.workflow_id,
+            request.step_name,
+            request.entities
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/companies/{company_id}/entities/query", response_model=EntityPage)
+async def query_entities(
+    company_id: str,
+    query: EntityQuery,
+    service: DynamicEntityService = Depends(get_dynamic_entity_service)
+):
+    """Filter and sort a schema's entities; pass next_cursor back as cursor for the next page"""
+    try:
+        return ModelResponse(await service.query_entities(company_id, query))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/companies/{company_id}/entities/{entity_id}")
 async def get_entity(
     company_id: str,
     entity_id: str,
-    service: DynamicEntityService = Depends()
+    service: DynamicEntityService = Depends(get_dynamic_entity_service)
 ) -> Dict:
     """Get an entity by ID"""
-    entity = await service.get_entity(company_id, entity_id)
+    try:
+        entity = await service.get_entity(company_id, entity_id)
+    except ValueError:
+        entity = None
     if not entity:
         raise HTTPException(status_code=404, detail="Entity not found")
-    return entity
+    return ModelResponse(entity)
+
+@router.post("/companies/{company_id}/entities/{entity_id}/relationships")
+async def link_entities(
+    company_id: str,
+    entity_id: str,
+    relationships: Dict[str, List[str]] = Body(...),
+    service: DynamicEntityService = Depends(get_dynamic_entity_service)
+) -> Dict:
+    """Add relationships (declared type -> entity ids) to an entity"""
+    try:
+        return ModelResponse(await service.link_entities(company_id, entity_id, relationships))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/companies/{company_id}/entities/{entity_id}/related")
 async def get_related_entities(
     company_id: str,
     entity_id: str,
-    relationship_type: str = None,
-    service: DynamicEntityService = Depends()
+    relationship_type: Optional[List[str]] = Query(None),
+    schema_name: Optional[List[str]] = Query(None),
+    depth: int = Query(1, ge=1, le=settings.ENTITY_TRAVERSAL_MAX_DEPTH),
+    service: DynamicEntityService = Depends(get_dynamic_entity_service)
+) -> List[Dict]:
+    """Entities within `depth` hops, optionally through the given relationship types and schemas"""
+    try:
+        return ModelResponse(await service.traverse(
+            company_id, 
+            entity_id, 
+            max_depth=depth,
+            relationship_types=relationship_type,
+            schema_names=schema_name
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/companies/{company_id}/workflows/{workflow_id}/instances")
+async def start_workflow_instance(
+    company_id: str,
+    workflow_id: str,
+    runtime: WorkflowRuntimeService = Depends(get_workflow_runtime_service)
+) -> Dict:
+    """Start a run of a workflow at its initial step"""
+    try:
+        return ModelResponse(await runtime.start_instance(company_id, workflow_id))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/companies/{company_id}/workflow-instances/{instance_id}")
+async def get_workflow_instance(
+    company_id: str,
+    instance_id: str,
+    runtime: WorkflowRuntimeService = Depends(get_workflow_runtime_service)
+) -> Dict:
+    """Instance status and per-step state"""
+    try:
+        instance = await runtime.get_instance(company_id, instance_id)
+    except ValueError:
+        instance = None
+    if not instance:
+        raise HTTPException(status_code=404, detail="Workflow instance not found")
+    return ModelResponse(instance)
+
+@router.post("/companies/{company_id}/workflow-instances/{instance_id}/steps/{step_name}")
+async def complete_workflow_step(
+    company_id: str,
+    instance_id: str,
+    step_name: str,
+    completion: StepCompletion,
+    runtime: WorkflowRuntimeService = Depends(get_workflow_runtime_service)
+) -> Dict:
+    """
+    Complete an active step. Mapped fields reach the next steps in the
+    background; repeating the call returns the first result (duplicate=true).
+    """
+    try:
+        result = await runtime.complete_step(
+            company_id, instance_id, step_name, completion.data, completion.relationships
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not result["duplicate"]:
+        workflow_worker.submit(result["event_id"])
+    return ModelResponse(result)
+
+@router.get("/companies/{company_id}/workflow-instances/{instance_id}/events")
+async def list_workflow_events(
+    company_id: str,
+    instance_id: str,
+    runtime: WorkflowRuntimeService = Depends(get_workflow_runtime_service)
 ) -> List[Dict]:
-    """Get related entities"""
-    return await service.get_related_entities(
-        company_id, 
-        entity_id, 
-        relationship_type
-    )
\ No newline at end of file
+    """The instance's event log, oldest first"""
+    try:
+        return ModelResponse(await runtime.list_events(company_id, instance_id))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/companies/{company_id}/workflow-instances/{instance_id}/replay")
+async def replay_workflow_instance(
+    company_id: str,
+    instance_id: str,
+    runtime: WorkflowRuntimeService = Depends(get_workflow_runtime_service)
+) -> Dict:
+    """Re-apply the propagation of every completed step, in order (open steps only)"""
+    try:
+        return {"replayed": await runtime.replay(company_id, instance_id)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -8,6 +8,8 @@ from app.services.quote_service import Quote_Service
 from app.services.invoice_service import Invoice_Service
 from app.utils.generate_pdf import generate_invoice_pdf
 from app.api.deps import get_company_service, get_prospect_service, get_quote_service, get_invoice_service
+from app.utils.responses import ModelResponse
+import asyncio
 import logging
 
 router = APIRouter()
@@ -24,7 +26,7 @@ async def get_invoice_data(
     owner: str = Query(...),
     invoice_service: Invoice_Service = Depends(get_invoice_service)
 ):
-    return await invoice_service.get_invoice_data(owner)
+    return ModelResponse(await invoice_service.get_invoice_data(owner))
 
 # Collect data for a single invoice
 @router.get("/single-invoice-details/", response_model=InvoiceSlateModel)
@@ -34,7 +36,7 @@ async def get_single_invoice_data(
     invoice_service: Invoice_Service = Depends(get_invoice_service)
 ):
     try:
-        return await invoice_service.get_single_invoice_data(owner, invoiceId)
+        return ModelResponse(await invoice_service.get_single_invoice_data(owner, invoiceId))
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -75,15 +77,20 @@ async def download_invoice(
 async def get_merged_invoice_data(owner: str, invoiceId: str, company_service: Company_Service, prospect_service: Prospect_Service, quote_service: Quote_Service, invoice_service: Invoice_Service):
     """Internal helper function"""
     try:
-        company_details = await company_service.get_company_details(owner)
-        payment_data = await company_service.get_payment_details(owner)
-        merged_data = await prospect_service.get_merged_prospect_data(owner)
-        invoice = await invoice_service.get_single_invoice_data(owner, invoiceId)
-        quote = await quote_service.get_single_quote_data(owner, invoice.quoteId)
+        company_details, payment_data, invoice = await asyncio.gather(
+            company_service.get_company_details(owner),
+            company_service.get_payment_details(owner),
+            invoice_service.get_single_invoice_data(owner, invoiceId),
+        )
+        quote, prospect = await asyncio.gather(
+            quote_service.get_single_quote_data(owner, invoice.quoteId),
+            prospect_service.get_merged_prospect(owner, invoice.companyId, invoice.projectId),
+        )
         
         # Use the merged data to create the invoice download model
         return InvoiceDownloadModel(
             **invoice.model_dump(),
+            totals=await invoice_service.pricing_service.document_totals(owner, invoice, invoice.cis_reversal),
             bank=payment_data.bank,
             bank_address=payment_data.bank_address,
             sort_code=payment_data.sort_code,
@@ -94,13 +101,13 @@ async def get_merged_invoice_data(owner: str, invoiceId: str, company_service: C
             companyEmail=company_details.companyEmail,
             companyTelephone=company_details.companyTelephone,
             quote_number=quote.quote_number,
-            projectName=next((p.projectName for p in merged_data.items if p.companyId == invoice.companyId), "Unknown"),
-            customer_name=next((p.companyName for p in merged_data.items if p.companyId == invoice.companyId), "Unknown"),
-            customer_address=next((p.company_address for p in merged_data.items if p.companyId == invoice.companyId), "Unknown"),
-            site_address=next((p.site_address for p in merged_data.items if p.companyId == invoice.companyId), "Unknown"),
-            vat_number=next((p.vat_number for p in merged_data.items if p.companyId == invoice.companyId), "Unknown"),
-            company_number=next((p.company_number for p in merged_data.items if p.companyId == invoice.companyId), "Unknown"),
-            telephone=next((p.telephone for p in merged_data.items if p.companyId == invoice.companyId), "Unknown"),
+            projectName=prospect.projectName if prospect else "Unknown",
+            customer_name=prospect.companyName if prospect else "Unknown",
+            customer_address=prospect.company_address if prospect else "Unknown",
+            site_address=prospect.site_address if prospect else "Unknown",
+            vat_number=prospect.vat_number if prospect else "Unknown",
+            company_number=prospect.company_number if prospect else "Unknown",
+            telephone=prospect.telephone if prospect else "Unknown",
             
         )
     except Exception as e:
@@ -117,7 +124,7 @@ async def update_invoice_data(
     invoice_data: Invoice_Complete_Data = Body(...),
     invoice_service: Invoice_Service = Depends(get_invoice_service)
 ):
-    return await invoice_service.update_invoice_data(owner, invoice_data)
+    return ModelResponse(await invoice_service.update_invoice_data(owner, invoice_data))
 
 # Route for archiving a specific invoiceId
 @router.post("/archive/")
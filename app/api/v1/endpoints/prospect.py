@@ -6,6 +6,7 @@ from app.schemas.collections import Prospect_Data, MergedProspectData
 from app.services.prospect_service import Prospect_Service
 from app.services.crm_service import CRM_Service
 from app.api.deps import get_prospect_service, get_crm_service
+from app.utils.responses import ModelResponse
 
 router = APIRouter()
 
@@ -14,7 +15,7 @@ async def get_prospect_data(
     owner: str = Query(...),
     prospect_service: Prospect_Service = Depends(get_prospect_service)
 ):
-    return await prospect_service.get_prospect_data(owner)
+    return ModelResponse(await prospect_service.get_prospect_data(owner))
 
 @router.get("/merged-prospect-data/", response_model=MergedProspectData)
 async def get_merged_prospect_data(
@@ -22,7 +23,7 @@ async def get_merged_prospect_data(
     prospect_service: Prospect_Service = Depends(get_prospect_service)
 ):
     """Endpoint that handles the HTTP request"""
-    return await prospect_service.get_merged_prospect_data(owner)
+    return ModelResponse(await prospect_service.get_merged_prospect_data(owner))
 
 @router.get("/merged-prospect-data/", response_model=MergedProspectData)
 async def get_merged_prospect_data(
@@ -30,7 +31,7 @@ async def get_merged_prospect_data(
     prospect_service: Prospect_Service = Depends(get_prospect_service)
 ):
     """Endpoint that handles the HTTP request"""
-    return await prospect_service.get_merged_prospect_data(owner)
+    return ModelResponse(await prospect_service.get_merged_prospect_data(owner))
 
 @router.get("/active-merged-prospect-data/", response_model=MergedProspectData)
 async def get_active_merged_prospect_data(
@@ -38,14 +39,14 @@ async def get_active_merged_prospect_data(
     prospect_service: Prospect_Service = Depends(get_prospect_service)
 ):
     """Endpoint that handles the HTTP request"""
-    return await prospect_service.get_active_merged_prospect_data(owner)
+    return ModelResponse(await prospect_service.get_active_merged_prospect_data(owner))
 
 @router.get("/customer-list/", response_model=CustomerNamesList)
 async def customer_list(
     owner: str = Query(...),
     prospect_service: Prospect_Service = Depends(get_prospect_service)
 ):
-    return await prospect_service.customer_list(owner)
+    return ModelResponse(await prospect_service.customer_list(owner))
 
 
 @router.get("/prospect-list/", response_model=ProspectsNamesList)
@@ -53,7 +54,7 @@ async def prospect_list(
     owner: str = Query(...),
     prospect_service: Prospect_Service = Depends(get_prospect_service)
 ):
-    return await prospect_service.prospect_list(owner)
+    return ModelResponse(await prospect_service.prospect_list(owner))
 
 
 @router.post("/prospect-details/", response_model=MergedProspectData)
@@ -62,7 +63,7 @@ async def update_prospect_data(
     prospect_data: Prospect_Data = Body(...),
     prospect_service: Prospect_Service = Depends(get_prospect_service)
 ):
-    return await prospect_service.update_prospect_data(owner, prospect_data)
+    return ModelResponse(await prospect_service.update_prospect_data(owner, prospect_data))
 
 
 @router.post("/archive/")
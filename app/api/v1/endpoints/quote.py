@@ -7,6 +7,8 @@ from app.services.prospect_service import Prospect_Service
 from app.services.company_service import Company_Service
 from app.utils.generate_pdf import generate_quote_pdf
 from app.api.deps import get_quote_service, get_prospect_service, get_company_service
+from app.utils.responses import ModelResponse
+import asyncio
 import logging
 from typing import Optional, List
 
@@ -22,7 +24,7 @@ async def get_quote_data(
     owner: str = Query(...),
     quote_service: Quote_Service = Depends(get_quote_service)
 ):
-    return await quote_service.get_quote_data(owner)
+    return ModelResponse(await quote_service.get_quote_data(owner))
 
 @router.get("/active-quote-details/", response_model=Quote_Complete_Data)
 async def get_active_quote_data(
@@ -30,10 +32,10 @@ async def get_active_quote_data(
     exclude_statuses: Optional[List[str]] = Query(None),
     quote_service: Quote_Service = Depends(get_quote_service)
 ):
-    return await quote_service.get_active_quote_data(
+    return ModelResponse(await quote_service.get_active_quote_data(
         owner, 
         exclude_statuses=exclude_statuses
-    )
+    ))
 
 # Collect data for a single quote
 @router.get("/single-quote-details/", response_model=QuoteSlateModel)
@@ -43,7 +45,7 @@ async def get_single_quote_data(
     quote_service: Quote_Service = Depends(get_quote_service)
 ):
     try:
-        return await quote_service.get_single_quote_data(owner, quoteId)
+        return ModelResponse(await quote_service.get_single_quote_data(owner, quoteId))
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -83,25 +85,27 @@ async def get_merged_quote_data(owner: str, quoteId: str, company_service: Compa
     """Internal helper function"""
     try:
         quote = await quote_service.get_single_quote_data(owner, quoteId)
-        merged_data = await prospect_service.get_merged_prospect_data(owner)
-        company_details = await company_service.get_company_details(owner)
-    
+        prospect, company_details = await asyncio.gather(
+            prospect_service.get_merged_prospect(owner, quote.companyId, quote.projectId),
+            company_service.get_company_details(owner),
+        )
         
         # Use the merged data to create the quote download model
         return QuoteDownloadModel(
             **quote.model_dump(),
+            totals=await quote_service.pricing_service.document_totals(owner, quote),
             companyName=company_details.companyName,
             companyAddress=company_details.companyAddress,
             companyVat=company_details.companyVat,
             companyEmail=company_details.companyEmail,
             companyTelephone=company_details.companyTelephone,
-            projectName=next((p.projectName for p in merged_data.items if p.companyId == quote.companyId), "Unknown"),
-            customer_name=next((p.companyName for p in merged_data.items if p.companyId == quote.companyId), "Unknown"),
-            customer_address=next((p.company_address for p in merged_data.items if p.companyId == quote.companyId), "Unknown"),
-            site_address=next((p.site_address for p in merged_data.items if p.companyId == quote.companyId), "Unknown"),
-            vat_number=next((p.vat_number for p in merged_data.items if p.companyId == quote.companyId), "Unknown"),
-            company_number=next((p.company_number for p in merged_data.items if p.companyId == quote.companyId), "Unknown"),
-            telephone=next((p.telephone for p in merged_data.items if p.companyId == quote.companyId), "Unknown"),
+            projectName=prospect.projectName if prospect else "Unknown",
+            customer_name=prospect.companyName if prospect else "Unknown",
+            customer_address=prospect.company_address if prospect else "Unknown",
+            site_address=prospect.site_address if prospect else "Unknown",
+            vat_number=prospect.vat_number if prospect else "Unknown",
+            company_number=prospect.company_number if prospect else "Unknown",
+            telephone=prospect.telephone if prospect else "Unknown",
         )
     except Exception as e:
         logger.exception(f"Error in get_merged_quote_data: {str(e)}")
@@ -117,7 +121,7 @@ async def update_quote_data(
     quote_data: Quote_Complete_Data = Body(...),
     quote_service: Quote_Service = Depends(get_quote_service)
 ):
-    return await quote_service.update_quote_data(owner, quote_data)
+    return ModelResponse(await quote_service.update_quote_data(owner, quote_data))
 
 # Route for deleting a specific quoteId
 @router.post("/delete/")
@@ -0,0 +1,30 @@
+# app/api/v1/endpoints/reporting.py
+
+from fastapi import APIRouter, Depends, Query
+from app.schemas.reporting import InvoiceReport, QuoteReport, ConversionReport
+from app.services.reporting_service import Reporting_Service
+from app.api.deps import get_reporting_service
+from app.utils.responses import ModelResponse
+
+router = APIRouter()
+
+@router.get("/invoices/", response_model=InvoiceReport)
+async def get_invoice_report(
+    owner: str = Query(...),
+    reporting_service: Reporting_Service = Depends(get_reporting_service)
+):
+    return ModelResponse(await reporting_service.invoice_report(owner))
+
+@router.get("/quotes/", response_model=QuoteReport)
+async def get_quote_report(
+    owner: str = Query(...),
+    reporting_service: Reporting_Service = Depends(get_reporting_service)
+):
+    return ModelResponse(await reporting_service.quote_report(owner))
+
+@router.get("/conversion/", response_model=ConversionReport)
+async def get_conversion_report(
+    owner: str = Query(...),
+    reporting_service: Reporting_Service = Depends(get_reporting_service)
+):
+    return ModelResponse(await reporting_service.conversion_report(owner))
@@ -1,12 +1,17 @@
 # app/api/v1/endpoints/slates.py
 
-from fastapi import APIRouter, Depends, HTTPException, Body, Query
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, File, UploadFile, Request
 from typing import List
 from bson import ObjectId
-from app.schemas.slate import CreateTemplateModel, AssignSlateModel, SlateTemplateModel
+from app.schemas.slate import CreateTemplateModel, AssignSlateModel, SlateTemplateModel, TemplateExtractionJob, SlateSync, SlateSyncBatch, SlateSyncResult
 from app.schemas.collections import TemplateCollection, AssignedSlatesCollection
 from app.services.slates_service import Slates_Service
-from app.api.deps import get_slates_service
+from app.services.template_extraction_service import Template_Extraction_Service, extraction_worker
+from app.services.slate_stream import slate_hub, assignee_topic, org_topic
+from app.api.deps import get_slates_service, get_template_extraction_service
+from app.config import settings
+from fastapi.responses import StreamingResponse
+from app.utils.responses import ModelResponse, gzipped
 import logging
 from bson import ObjectId
 from fastapi import APIRouter, Depends, HTTPException, Query
@@ -28,7 +33,7 @@ async def list_forms(
     status: bool,
     slates_service: Slates_Service = Depends(get_slates_service)
 ):
-    return await slates_service.list_forms(owner_org, status)
+    return ModelResponse(await slates_service.list_forms(owner_org, status))
 
 @router.get("/get-template/", response_model=SlateTemplateModel)
 async def get_template(
@@ -60,7 +65,60 @@ async def list_user_slates(
     status: bool,
     slates_service: Slates_Service = Depends(get_slates_service)
 ):
-    return await slates_service.list_user_slates(assignee, status)
+    return ModelResponse(await slates_service.list_user_slates(assignee, status))
+
+# Server-Sent Events stream of slate deltas (assigned / submitted / updated) for an
+# assignee and/or an org, replacing polling of user-slates and dashboard-data.
+# A "resync" event means deltas were dropped and the client should refetch.
+@router.get("/stream/")
+async def stream_slates(
+    request: Request,
+    assignee: Optional[str] = Query(None),
+    owner_org: Optional[str] = Query(None),
+):
+    topics = ([assignee_topic(assignee)] if assignee else []) + ([org_topic(owner_org)] if owner_org else [])
+    if not topics:
+        raise HTTPException(status_code=400, detail="assignee or owner_org is required")
+
+    async def events():
+        with slate_hub.subscribe(topics) as subscription:
+            yield b"retry: 5000\n\n"
+            while not await request.is_disconnected():
+                frame = await subscription.next(settings.SLATE_STREAM_HEARTBEAT_SECONDS)
+                # A comment line keeps proxies from closing an idle connection
+                yield frame if frame is not None else b": keep-alive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Offline sync: slates and templates changed or deleted since the previous sync's token
+@router.get("/sync", response_model=SlateSync)
+async def sync_slates(
+    request: Request,
+    assignee: str = Query(...),
+    owner_org: str = Query(...),
+    since: Optional[str] = Query(None),
+    slates_service: Slates_Service = Depends(get_slates_service)
+):
+    try:
+        result = await slates_service.sync(assignee, owner_org, since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return gzipped(request, ModelResponse(result))
+
+# Offline sync: a device's queued edits, changed fields only, merged per field
+@router.post("/sync", response_model=List[SlateSyncResult])
+async def sync_submit(
+    batch: SlateSyncBatch = Body(...),
+    slates_service: Slates_Service = Depends(get_slates_service)
+):
+    try:
+        return await slates_service.sync_submit(batch.assignee, batch.changes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/create-slate/")
 async def create_slate(
@@ -104,6 +162,30 @@ async def list_org_slates(
     owner_org: str,
     slates_service: Slates_Service = Depends(get_slates_service)
 ):
-    return await slates_service.list_org_slates(owner_org)
+    return ModelResponse(await slates_service.list_org_slates(owner_org))
+
+# Upload a paper form; the template is extracted in the background, poll the job for its status
+@router.post("/extract-template/", response_model=TemplateExtractionJob, status_code=202)
+async def extract_template(
+    owner_org: str = Query(...),
+    file: UploadFile = File(...),
+    extraction_service: Template_Extraction_Service = Depends(get_template_extraction_service)
+):
+    job = await extraction_service.create_job(owner_org, file)
+    extraction_worker.submit(job.job_id)
+    return job
+
+# Hit rate of the extraction result cache in this worker process
+@router.get("/extract-template/cache-stats")
+async def extraction_cache_stats():
+    return extraction_worker.cache_stats()
+
+@router.get("/extract-template/{job_id}", response_model=TemplateExtractionJob)
+async def get_extraction_job(
+    job_id: str,
+    owner_org: str = Query(...),
+    extraction_service: Template_Extraction_Service = Depends(get_template_extraction_service)
+):
+    return await extraction_service.get_job(owner_org, job_id)
 
 # Add more routes as needed
\ No newline at end of file
@@ -2,11 +2,11 @@
 
 from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request
 from typing import Optional
-from app.schemas.user import PlatformUsers, UserData
+from app.schemas.user import PlatformUsers, UserData, UserContext, AuthenticatedUser
 from app.schemas.early_bird import EarlyBird
 from app.schemas.collections import UsersCollection
 from app.services.user_service import User_Service
-from app.api.deps import get_user_service
+from app.api.deps import get_user_service, get_user_context, get_current_user, get_owner_org
 
 router = APIRouter()
 
@@ -24,6 +24,20 @@ async def get_user_data(
 ):
     return await user_service.get_user_data(email)
 
+@router.get("/user-context/", response_model=UserContext)
+async def read_user_context(
+    context: UserContext = Depends(get_user_context)
+):
+    return context
+
+# Identity and org taken from the verified bearer token
+@router.get("/me", response_model=AuthenticatedUser)
+async def read_current_user(
+    user: AuthenticatedUser = Depends(get_current_user),
+    owner_org: str = Depends(get_owner_org)
+):
+    return user.model_copy(update={"owner_org": owner_org})
+
 @router.put("/early-signon")
 async def early_signon(
     user_profile: EarlyBird = Body(...),
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import slates, user, project, team, dashboard, general, company, crm, prospect, quote, invoice, notification
+from app.api.v1.endpoints import slates, user, project, team, dashboard, general, company, crm, prospect, quote, invoice, notification, reporting, dynamic_entity
 
 api_router = APIRouter()
 api_router.include_router(user.router, prefix="/users", tags=["users"])
@@ -12,5 +12,7 @@ api_router.include_router(crm.router, prefix="/customer", tags=["crm"])
 api_router.include_router(prospect.router, prefix="/prospect", tags=["prospect"])
 api_router.include_router(quote.router, prefix="/quote", tags=["quote"])
 api_router.include_router(invoice.router, prefix="/invoice", tags=["invoice"])
+api_router.include_router(reporting.router, prefix="/reports", tags=["reports"])
+api_router.include_router(dynamic_entity.router, prefix="/dynamic", tags=["dynamic-entities"])
 api_router.include_router(notification.router, prefix="/notify", tags=["notify"])
 api_router.include_router(general.router, tags=["general"])
\ No newline at end of file
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 import os
+from typing import Optional
 from dotenv import load_dotenv
 
 # Load the .env file
@@ -34,6 +35,67 @@ class Settings(BaseSettings):
     ADMIN_EMAIL: str
     SECOND_ADMIN_EMAIL: str
 
+    # Local verification of Auth0 access tokens
+    AUTH0_AUDIENCE: str  # API identifier; required, every token's aud claim is checked against it
+    AUTH0_CLAIMS_NAMESPACE: str = "https://sitesteer.ai/"  # prefix of the owner_org / tier custom claims
+    JWKS_REFRESH_SECONDS: int = 3600
+    JWKS_MIN_REFETCH_SECONDS: int = 30
+
+    # Template extraction from uploaded PDF forms
+    ANTHROPIC_API_KEY: Optional[str] = None
+    TEMPLATE_EXTRACTION_WORKERS: int = 2
+    # Seconds a worker's claim on a running job lasts; must exceed the longest extraction
+    TEMPLATE_EXTRACTION_LEASE_SECONDS: int = 1800
+    EXTRACTION_CACHE_MEMORY_ENTRIES: int = 512
+    EXTRACTION_CACHE_TTL_DAYS: int = 90
+
+    # VAT rate for line items that match no pricing category
+    DEFAULT_VAT_PERCENTAGE: float = 20.0
+
+    # Background tasks propagating workflow step completions
+    WORKFLOW_WORKERS: int = 2
+    # Seconds after which a step completion that never recorded its entity is discarded and can be retried
+    WORKFLOW_COMPLETION_LEASE_SECONDS: int = 60
+
+    # Event bus worker: handler attempts before dead-lettering, base retry delay, checkpoint interval
+    EVENT_BUS_MAX_ATTEMPTS: int = 5
+    EVENT_BUS_RETRY_SECONDS: float = 1.0
+    EVENT_BUS_CHECKPOINT_SECONDS: float = 1.0
+
+    # Slate change streams: deltas buffered per client before it is told to resync, keep-alive interval
+    SLATE_STREAM_QUEUE_SIZE: int = 100
+    SLATE_STREAM_HEARTBEAT_SECONDS: float = 15.0
+
+    # Offline slate sync: tombstone retention (older tokens get a full snapshot),
+    # re-read window for late commits, slates per batched submit
+    SLATE_SYNC_TOMBSTONE_DAYS: int = 30
+    SLATE_SYNC_OVERLAP_SECONDS: int = 5
+    SLATE_SYNC_MAX_CHANGES: int = 200
+
+    # Largest batch accepted by the bulk entity ingestion endpoint
+    ENTITY_BULK_MAX_ENTITIES: int = 10000
+
+    # Deepest relationship traversal the API accepts
+    ENTITY_TRAVERSAL_MAX_DEPTH: int = 4
+
+    # Cap on partial indexes created for indexed dynamic entity fields, across all companies
+    ENTITY_MAX_FIELD_INDEXES: int = 40
+    # Cap on those indexes per company; schemas asking for more are rejected
+    ENTITY_MAX_FIELD_INDEXES_PER_COMPANY: int = 8
+
+    # Seconds a company's entity schemas and workflows are cached per worker
+    ENTITY_REGISTRY_TTL_SECONDS: int = 300
+    # Least seconds between reloads of a company's registry forced by an unknown schema or workflow
+    ENTITY_REGISTRY_MIN_RELOAD_SECONDS: int = 5
+
+    # Seconds a startup migration holds its lock; a crashed run is retried after this
+    MIGRATION_LOCK_SECONDS: int = 600
+
+    # Seconds a resolved user context (org membership, premium key) is cached per worker
+    USER_CONTEXT_TTL_SECONDS: int = 60
+    # Most user contexts cached per worker (least recently used are evicted)
+    USER_CONTEXT_CACHE_MAX_ENTRIES: int = 10000
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
 settings = Settings()
\ No newline at end of file
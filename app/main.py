@@ -1,10 +1,17 @@
 import logging
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from app.api.v1.router import api_router
 from fastapi.middleware.cors import CORSMiddleware
+from motor.motor_asyncio import AsyncIOMotorClient
 from app.config import settings
+from app.services.index_service import Index_Service
+from app.services.team_service import Team_Service
+from app.api.deps import jwks_cache
+from app.services.template_extraction_service import extraction_worker
+from app.services.workflow_runtime import workflow_worker
 
-app = FastAPI(title="SiteSteer API")
+app = FastAPI(title="SiteSteer API", default_response_class=ORJSONResponse)
 
 # Set pymongo logger to WARNING level
 logging.getLogger("pymongo").setLevel(logging.WARNING)
@@ -20,4 +27,58 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(api_router, prefix="/api/v1")
\ No newline at end of file
+app.include_router(api_router, prefix="/api/v1")
+
+
+# Make sure every declared MongoDB index exists and pending migrations ran
+# (one worker at a time runs a migration, see Team_Service.backfill_memberships)
+@app.on_event("startup")
+async def ensure_indexes():
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    try:
+        await Index_Service(client).ensure_indexes()
+        await Team_Service(client).backfill_memberships()
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Error preparing database: {str(e)}")
+    finally:
+        client.close()
+
+
+
+# Load the Auth0 signing keys and keep them fresh for local token verification
+@app.on_event("startup")
+async def start_jwks_refresh():
+    jwks_cache.start()
+
+
+@app.on_event("shutdown")
+async def stop_jwks_refresh():
+    await jwks_cache.stop()
+
+
+# Background worker for template extraction jobs (re-queues unfinished jobs)
+@app.on_event("startup")
+async def start_extraction_worker():
+    try:
+        await extraction_worker.start()
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Error starting template extraction worker: {str(e)}")
+
+
+@app.on_event("shutdown")
+async def stop_extraction_worker():
+    await extraction_worker.stop()
+
+
+# Background worker for workflow propagation (re-queues unprocessed step completions)
+@app.on_event("startup")
+async def start_workflow_worker():
+    try:
+        await workflow_worker.start()
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Error starting workflow worker: {str(e)}")
+
+
+@app.on_event("shutdown")
+async def stop_workflow_worker():
+    await workflow_worker.stop()
@@ -1,5 +1,5 @@
-from typing import Dict, Any, List, Optional, Union
-from pydantic import BaseModel
+from typing import Dict, Any, List, Literal, Optional, Union
+from pydantic import BaseModel, Field
 from enum import Enum
 
 class FieldType(str, Enum):
@@ -14,12 +14,16 @@ class DynamicField(BaseModel):
     field_name: str
     field_type: FieldType
     required: bool = False
+    indexed: bool = False  # gets a partial index for filtering and sorting; top-level scalar fields only
     default_value: Optional[Any] = None
     description: Optional[str] = None
+    items: Optional["DynamicField"] = None  # element definition for ARRAY fields
+    properties: Optional[Dict[str, "DynamicField"]] = None  # nested fields for OBJECT fields
 
 class EntitySchema(BaseModel):
     schema_name: str  # e.g., "Project", "Quote"
     fields: Dict[str, DynamicField]
+    relationships: Dict[str, str] = {}  # relationship type -> target schema_name
     description: Optional[str] = None
 
 class EntityInstance(BaseModel):
@@ -42,6 +46,37 @@ class WorkflowStep(BaseModel):
     next_steps: List[str] = []
     field_mappings: List[FieldMapping] = []  # Field mappings for this step
 
+class BulkEntityRequest(BaseModel):
+    workflow_id: str
+    step_name: str
+    entities: List[Dict[str, Any]]
+
+class BulkEntityResult(BaseModel):
+    inserted: int
+    propagated: int  # target entities created or updated by field mappings
+    errors: Dict[int, str] = {}  # request index -> reason the row was rejected
+
+class EntityFilter(BaseModel):
+    field: str  # data field, nested ones as dotted paths
+    op: Literal["eq", "ne", "gt", "gte", "lt", "lte", "in", "nin", "exists"] = "eq"
+    value: Any = None
+
+class EntityQuery(BaseModel):
+    schema_name: str
+    filters: List[EntityFilter] = []
+    sort_by: Optional[str] = None  # data field; defaults to creation order
+    descending: bool = False
+    limit: int = Field(50, ge=1, le=500)
+    cursor: Optional[str] = None  # next_cursor of the previous page
+
+class EntityPage(BaseModel):
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+class StepCompletion(BaseModel):
+    data: Dict[str, Any]
+    relationships: Dict[str, List[str]] = {}  # declared type -> entity ids
+
 class WorkflowDefinition(BaseModel):
     workflow_name: str
     company_id: str
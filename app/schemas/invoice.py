@@ -2,6 +2,7 @@ from pydantic import BaseModel, Field
 from typing import List, Optional, Union, Any, Dict
 from datetime import datetime
 from app.schemas.slate import FormField
+from app.schemas.pricing import DocumentTotals
 
 class LineItem(BaseModel):
     lineItem: str
@@ -22,7 +23,9 @@ class InvoiceSlateModel(BaseModel):
     terms: str
     issue_date: datetime
     cis_reversal: bool
+    # invoiceTotal and vatTotal are computed on write from the line items
     invoiceTotal: float
+    vatTotal: Optional[float] = None
     lineItems: List[LineItem]
 
     class Config:
@@ -75,6 +78,7 @@ class InvoiceDownloadModel(BaseModel):
     cis_reversal: bool
     invoiceTotal: float
     lineItems: List[LineItem]
+    totals: DocumentTotals
     projectName: str
     customer_name: str
     customer_address: str
@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from decimal import Decimal
+
+class DocumentTotals(BaseModel):
+    line_totals: List[Decimal]
+    net_total: Decimal
+    vat_total: Decimal
+    # VAT the customer pays; zero under the CIS domestic reverse charge
+    vat_payable: Decimal
+    grand_total: Decimal
+    reverse_charge: bool = False
+
+class TotalsCheck(BaseModel):
+    id: str
+    companyId: str
+    status: str
+    stored_total: Optional[Decimal] = None
+    totals: DocumentTotals
+    difference: Optional[Decimal] = None  # stored_total - grand_total
+    matches: bool
+
+class OrgTotalsReport(BaseModel):
+    owner_org: str
+    quotes: List[TotalsCheck]
+    invoices: List[TotalsCheck]
+    quotes_total: Decimal
+    invoices_total: Decimal
+    mismatches: int
@@ -2,6 +2,7 @@ from pydantic import BaseModel, Field
 from typing import List, Optional, Union, Any, Dict
 from datetime import datetime
 from app.schemas.slate import FormField
+from app.schemas.pricing import DocumentTotals
 
 class Quote(BaseModel):
     quoteId: str
@@ -28,7 +29,9 @@ class QuoteSlateModel(BaseModel):
     issue_date: datetime
     quote_number: Optional[str] = Field(default="")
     order_number: Optional[str] = Field(default="")
+    # quoteTotal and vatTotal are computed on write from the line items
     quoteTotal: float
+    vatTotal: Optional[float] = None
     lineItems: List[LineItem]
 
     class Config:
@@ -77,6 +80,7 @@ class QuoteDownloadModel(BaseModel):
     order_number: Optional[str] = Field(default="")
     quoteTotal: float
     lineItems: List[LineItem]
+    totals: DocumentTotals
     projectName: str
     customer_name: str
     customer_address: str
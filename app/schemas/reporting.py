@@ -0,0 +1,44 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class AmountGroup(BaseModel):
+    key: Optional[str] = None
+    count: int
+    total: float
+
+class AgingGroup(BaseModel):
+    companyId: Optional[str] = None
+    bucket: str
+    count: int
+    total: float
+
+class InvoiceReport(BaseModel):
+    owner_org: str
+    as_of: datetime
+    by_status: List[AmountGroup]
+    by_customer: List[AmountGroup]
+    by_month: List[AmountGroup]
+    outstanding_total: float
+    aging: List[AgingGroup]
+    aging_totals: List[AmountGroup]
+
+class QuoteReport(BaseModel):
+    owner_org: str
+    by_status: List[AmountGroup]
+    by_customer: List[AmountGroup]
+    by_month: List[AmountGroup]
+
+class ConversionGroup(BaseModel):
+    key: Optional[str] = None
+    quotes: int
+    converted: int
+    quoted_total: float
+    converted_total: float
+    conversion_rate: float
+
+class ConversionReport(BaseModel):
+    owner_org: str
+    overall: ConversionGroup
+    by_customer: List[ConversionGroup]
+    by_month: List[ConversionGroup]
@@ -81,3 +81,40 @@ class DraftSlateModel(BaseModel):
     title: str
     projectId: str
     status: str
+
+# Offline sync for field devices
+class SlateSync(BaseModel):
+    token: str  # pass as since on the next sync
+    reset: bool = False  # full snapshot (no or expired since): replace local copies
+    slates: List[Dict[str, Any]]
+    deleted_slates: List[str]
+    templates: List[Dict[str, Any]]
+    deleted_templates: List[str]
+
+class SlateFieldChanges(BaseModel):
+    database_id: str
+    base: datetime  # last_updated of the copy the device edited
+    data: Dict[str, Any] = {}  # changed fields only
+    status: Optional[bool] = None  # true submits the slate
+
+class SlateSyncBatch(BaseModel):
+    assignee: str
+    changes: List[SlateFieldChanges]
+
+class SlateSyncResult(BaseModel):
+    database_id: str
+    result: str  # applied | conflict | not_found | retry
+    last_updated: Optional[datetime] = None
+    applied: List[str] = []
+    conflicts: Dict[str, Any] = {}  # field -> server value, which was kept
+
+class TemplateExtractionJob(BaseModel):
+    job_id: str
+    owner_org: str
+    file_name: str
+    status: str  # queued | running | succeeded | failed
+    template_id: Optional[str] = None
+    error: Optional[str] = None
+    claimed_at: Optional[datetime] = None  # when a worker started running it
+    created_at: datetime
+    updated_at: datetime
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Any
 
 class PlatformUsers(BaseModel):
     email: str
@@ -10,4 +10,19 @@ class PlatformUsers(BaseModel):
 
 class UserData(BaseModel):
     is_premium_user: bool
-    premium_key: Optional[str] = None
\ No newline at end of file
+    premium_key: Optional[str] = None
+
+class UserContext(BaseModel):
+    email: str
+    auth0_id: Optional[str] = None
+    memberships: List[Dict[str, str]] = []
+    premium_key: Optional[str] = None  # org the user owns as Premium User
+    org: Optional[str] = None  # resolved org: premium org, else first membership
+    tier: Optional[str] = None
+
+class AuthenticatedUser(BaseModel):
+    sub: str  # Auth0 user id (auth0_id)
+    email: Optional[str] = None
+    owner_org: Optional[str] = None
+    tier: Optional[str] = None
+    claims: Dict[str, Any] = {}
@@ -2,27 +2,30 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic import ValidationError
 from bson import ObjectId
 from fastapi import HTTPException
-from typing import List, Dict
+from typing import List, Dict, Optional
 from app.schemas.company import Company, Payment, PricingItem
 from app.schemas.collections import PricingData
+from app.services.data_loader import OrgDataLoader
+from app.utils.model_utils import is_trusted, read_model, stamp
 from uuid import uuid4
 
 class Company_Service:
-    def __init__(self, client: AsyncIOMotorClient):
+    def __init__(self, client: AsyncIOMotorClient, loader: Optional[OrgDataLoader] = None):
         self.db = client.Forms
+        self.loader = loader or OrgDataLoader()
         self.company_details = self.db.get_collection("Company_Details")
         self.payment_details = self.db.get_collection("Payment_Details")
         self.pricing_details = self.db.get_collection("Pricing")
 
     async def get_company_details(self, owner: str) -> Company:
-        company_data = await self.company_details.find_one({"owner_org": owner})
+        company_data = await self.loader.load(self.company_details, owner)
         if company_data:
-            return Company(**company_data)
+            return read_model(Company, company_data, is_trusted(company_data))
         else:
             return Company(owner_org=owner, companyName="", companyAddress="", companyVat="", companyEmail="", companyTelephone="", companyId="")
 
     async def update_company_details(self, owner: str, company_data: Company) -> Company:
-        company_dict = company_data.model_dump()
+        company_dict = stamp(company_data.model_dump())
         company_dict["owner_org"] = owner  # Ensure the owner is set correctly
         try:
             # Check if an entry exists
@@ -43,13 +46,14 @@ class Company_Service:
                 if not result.inserted_id:
                     raise HTTPException(status_code=400, detail="Failed to create company details")
             
+            self.loader.invalidate(self.company_details, owner)
             return company_data
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Database operation failed: {str(e)}")
 
 
     async def get_payment_details(self, owner: str) -> Payment:
-            payment_data = await self.payment_details.find_one({"owner_org": owner})
+            payment_data = await self.loader.load(self.payment_details, owner)
             if payment_data:
                 return Payment(
                     owner_org=owner,
@@ -74,7 +78,7 @@ class Company_Service:
             # Check if an entry exists
             existing_entry = await self.payment_details.find_one({"owner_org": owner})
             
-            update_data = payment_data.model_dump()
+            update_data = stamp(payment_data.model_dump())
             update_data["owner_org"] = owner  # Ensure the owner is set correctly
             
             if existing_entry:
@@ -91,19 +95,22 @@ class Company_Service:
                 if not result.inserted_id:
                     raise HTTPException(status_code=400, detail="Failed to create payment details")
             
+            self.loader.invalidate(self.payment_details, owner)
             return payment_data
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Database operation failed: {str(e)}")
 
     async def get_pricing_data(self, owner: str) -> PricingData:
-        pricing_data = await self.pricing_details.find_one({"owner_org": owner})
+        pricing_data = await self.loader.load(self.pricing_details, owner)
         if pricing_data:
-            return PricingData(
+            # Pricing items stamped on write were validated then; older documents are validated here
+            trusted = is_trusted(pricing_data)
+            return PricingData.model_construct(
                 owner_org=owner,
-                items=[PricingItem(**item) for item in pricing_data.get("items", [])]
+                items=[read_model(PricingItem, item, trusted) for item in pricing_data.get("items", [])]
             )
         else:
-            return PricingData(
+            return PricingData.model_construct(
                 owner_org=owner,
                 items=[]
             )
@@ -112,15 +119,10 @@ class Company_Service:
     async def update_pricing_data(self, owner: str, pricing_data: PricingData) -> PricingData:
         try:
             # Ensure the owner_org matches the one from the URL
+            # (the request body itself was already validated by FastAPI)
             pricing_data.owner_org = owner
 
-            # Validate the incoming data
-            validated_data = PricingData(
-                owner_org=owner,
-                items=[item if isinstance(item, PricingItem) else PricingItem(**item) for item in pricing_data.items]
-            )
-
-            update_data = validated_data.model_dump()
+            update_data = stamp(pricing_data.model_dump())
             
             existing_entry = await self.pricing_details.find_one({"owner_org": owner})
             
@@ -136,7 +138,8 @@ class Company_Service:
                 if not result.inserted_id:
                     raise HTTPException(status_code=400, detail="Failed to create pricing details")
             
-            return validated_data
+            self.loader.invalidate(self.pricing_details, owner)
+            return pricing_data
         except ValidationError as e:
             raise HTTPException(status_code=422, detail=e.errors())
         except Exception as e:
@@ -2,49 +2,56 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic import ValidationError
 from bson import ObjectId
 from fastapi import HTTPException
-from typing import List, Dict
+from typing import List, Dict, Optional
 from app.schemas.crm import Customer, CustomerInfo, CustomerNamesList, CustomerList
 from app.schemas.collections import CRM_Data
+from app.services.data_loader import OrgDataLoader
+from app.utils.model_utils import is_trusted, read_model, stamp
 from uuid import uuid4
 
+# Item subfields (and their defaults) needed to build a CustomerInfo
+CUSTOMER_INFO_FIELDS = {
+    "companyId": "",
+    "customer_name": "",
+    "customer_address": "",
+    "vat_number": "",
+    "company_number": "",
+    "telephone": "",
+}
+
 class CRM_Service:
-    def __init__(self, client: AsyncIOMotorClient):
+    def __init__(self, client: AsyncIOMotorClient, loader: Optional[OrgDataLoader] = None):
         self.db = client.Forms
+        self.loader = loader or OrgDataLoader()
         self.crm_details = self.db.get_collection("CRM")
         self.prospect_details = self.db.get_collection("Prospects")
         self.quote_details = self.db.get_collection("Quotes")
         self.invoice_details = self.db.get_collection("Invoices")
 
     async def get_crm_data(self, owner: str) -> CRM_Data:
-        crm_data = await self.crm_details.find_one({"owner_org": owner})
+        crm_data = await self.loader.load(self.crm_details, owner)
         if crm_data:
-            return CRM_Data(
+            # Customers stamped on write were validated then; older documents are validated here
+            trusted = is_trusted(crm_data)
+            return CRM_Data.model_construct(
                 owner_org=owner,
-                items=[Customer(**item) for item in crm_data.get("items", [])]
+                items=[read_model(Customer, item, trusted) for item in crm_data.get("items", [])]
             )
         else:
-            return CRM_Data(
+            return CRM_Data.model_construct(
                 owner_org=owner,
                 items=[]
             )
         
 
     async def customer_list(self, owner: str) -> CustomerNamesList:
-        crm_data = await self.crm_details.find_one({"owner_org": owner})
-        if crm_data:
-            customers = [
-                CustomerInfo(companyId=item.get("companyId", ""), customer_name=item.get("customer_name", ""), customer_address=item.get("customer_address", ""), vat_number=item.get("vat_number", ""), company_number=item.get("company_number", ""), telephone=item.get("telephone", ""))
-                for item in crm_data.get("items", [])
-            ]
-            return CustomerNamesList(
-                owner_org=owner,
-                customers=customers
-            )
-        else:
-            return CustomerNamesList(
-                owner_org=owner,
-                customers=[]
-            )
+        # Only the CustomerInfo subfields are shaped and sent back by the server
+        items = await self.loader.load_items(self.crm_details, owner, CUSTOMER_INFO_FIELDS)
+        return CustomerNamesList.model_construct(
+            owner_org=owner,
+            # Projected items carry no schema marker, so they are always validated
+            customers=[CustomerInfo.model_validate(item) for item in items]
+        )
     
 
     async def update_crm_data(self, owner: str, crm_data: CRM_Data) -> CRM_Data:
@@ -52,20 +59,14 @@ class CRM_Service:
             # Ensure the owner_org matches the one from the URL
             crm_data.owner_org = owner
 
-            updated_items = []
+            # The request body was validated by FastAPI; only fill in server-side fields
             for item in crm_data.items:
                 if not item.companyId:
                     # Generate a new companyId for new customers (empty string)
                     item.companyId = str(uuid4())
                 # If companyId is not empty, it's an existing customer, so we keep the id
-                updated_items.append(item)
-
-            validated_data = CRM_Data(
-                owner_org=owner,
-                items=updated_items
-            )
 
-            update_data = validated_data.model_dump()
+            update_data = stamp(crm_data.model_dump())
 
             existing_entry = await self.crm_details.find_one({"owner_org": owner})
 
@@ -81,7 +82,8 @@ class CRM_Service:
                 if not result.inserted_id:
                     raise HTTPException(status_code=400, detail="Failed to create customer details")
 
-            return validated_data
+            self.loader.invalidate(self.crm_details, owner)
+            return crm_data
         except ValidationError as e:
             raise HTTPException(status_code=422, detail=e.errors())
         except Exception as e:
@@ -119,6 +121,7 @@ class CRM_Service:
                 raise HTTPException(status_code=404, detail="Customer not found")
             
             deletion_results["crm"] = result_crm.modified_count
+            self.loader.invalidate(self.crm_details, owner)
 
             # Delete related records from other collections
             collections = [
@@ -139,6 +142,7 @@ class CRM_Service:
                     }
                 )
                 deletion_results[key] = result.modified_count
+                self.loader.invalidate(collection, owner)
             print('deletion_results', deletion_results)
             return deletion_results
 
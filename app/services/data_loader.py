@@ -0,0 +1,97 @@
+# app/services/data_loader.py
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.utils.projections import find_org_items
+
+logger = logging.getLogger(__name__)
+
+
+class OrgDataLoader:
+    """
+    Request-scoped loader for the per-org documents ({"owner_org": ..., "items": [...]}).
+
+    Every read is memoized per collection and owner_org for the lifetime of the
+    loader, so services that call each other within one request hit MongoDB at
+    most once per collection. Lookups for the same collection issued in the
+    same event-loop tick are coalesced into a single $in query.
+
+    Returned documents are shared between callers and must not be mutated.
+    Services call invalidate() after writing an org document.
+    """
+
+    def __init__(self):
+        self._docs: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._items: Dict[Tuple[str, str, str, str], asyncio.Future] = {}
+        self._queued: Dict[str, Tuple[AsyncIOMotorCollection, Dict[str, asyncio.Future]]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def load(self, collection: AsyncIOMotorCollection, owner: str) -> Optional[Dict]:
+        """find_one({"owner_org": owner}) on `collection`, memoized and batched"""
+        key = (collection.name, owner)
+        future = self._docs.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._docs[key] = future
+            batch = self._queued.get(collection.name)
+            if batch is None:
+                batch = self._queued[collection.name] = (collection, {})
+                loop.call_soon(self._dispatch, collection.name)
+            batch[1][owner] = future
+        return await asyncio.shield(future)
+
+    async def load_items(
+        self,
+        collection: AsyncIOMotorCollection,
+        owner: str,
+        fields: Dict[str, Any],
+        item_filter: Optional[Dict] = None,
+    ) -> List[Dict]:
+        """Projected items read (see find_org_items), memoized per shape"""
+        key = (collection.name, owner, repr(fields), repr(item_filter))
+        future = self._items.get(key)
+        if future is None:
+            future = asyncio.ensure_future(find_org_items(collection, owner, fields, item_filter))
+            future.add_done_callback(lambda f: self._evict_failed(self._items, key, f))
+            self._items[key] = future
+        return await asyncio.shield(future)
+
+    def invalidate(self, collection: AsyncIOMotorCollection, owner: str) -> None:
+        """Drop everything memoized for an org document after it was written"""
+        self._docs.pop((collection.name, owner), None)
+        for key in [k for k in self._items if k[0] == collection.name and k[1] == owner]:
+            del self._items[key]
+
+    def _dispatch(self, collection_name: str) -> None:
+        collection, futures = self._queued.pop(collection_name)
+        task = asyncio.ensure_future(self._fetch(collection, futures))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, collection: AsyncIOMotorCollection, futures: Dict[str, asyncio.Future]) -> None:
+        try:
+            owners = list(futures)
+            if len(owners) == 1:
+                doc = await collection.find_one({"owner_org": owners[0]})
+                docs = {owners[0]: doc}
+            else:
+                found = await collection.find({"owner_org": {"$in": owners}}).to_list(None)
+                docs = {doc["owner_org"]: doc for doc in found}
+            for owner, future in futures.items():
+                if not future.done():
+                    future.set_result(docs.get(owner))
+        except Exception as e:
+            logger.error(f"Error loading {collection.name} documents: {str(e)}")
+            for owner, future in futures.items():
+                self._docs.pop((collection.name, owner), None)
+                if not future.done():
+                    future.set_exception(e)
+
+    @staticmethod
+    def _evict_failed(cache: Dict, key: Tuple, future: asyncio.Future) -> None:
+        # Failed reads are not memoized, so a later call can retry
+        if not future.cancelled() and future.exception() is not None and cache.get(key) is future:
+            del cache[key]
@@ -1,9 +1,29 @@
-from typing import Dict, Any, List, Optional
-from bson import ObjectId
+import base64
+import binascii
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+from bson import ObjectId, json_util
+from bson.errors import InvalidId
 from datetime import datetime
-from app.schemas.dynamic_entity import EntitySchema, FieldMapping, WorkflowDefinition
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from app.schemas.dynamic_entity import EntityQuery, EntitySchema, FieldMapping, FieldType, WorkflowDefinition
+from app.services.entity_registry import CompanyRegistry, entity_registry
+from app.services.index_service import Index_Service
+from app.utils.transformations import compile_transformation
 from motor.motor_asyncio import AsyncIOMotorClient
 
+logger = logging.getLogger(__name__)
+
+# Relationship type linking an entity created by a field mapping to its source entity
+SOURCE_RELATIONSHIP = "source"
+
+# EntityFilter.op -> MongoDB operator
+FILTER_OPERATORS = {
+    "eq": "$eq", "ne": "$ne", "gt": "$gt", "gte": "$gte", "lt": "$lt", "lte": "$lte",
+    "in": "$in", "nin": "$nin", "exists": "$exists",
+}
+
 
 class DynamicEntityService:
     def __init__(self, client: AsyncIOMotorClient):
@@ -11,40 +31,64 @@ class DynamicEntityService:
         self.entity_schemas = self.db.entity_schemas
         self.entities = self.db.entities
         self.workflows = self.db.workflows
+        self.registry = entity_registry
+        self.index_service = Index_Service(client)
 
     async def create_schema(self, company_id: str, schema: EntitySchema) -> Dict:
-        """Create a new entity schema for a company"""
+        """Create a new entity schema for a company; indexed fields get their partial index"""
+        indexed = [name for name, field in schema.fields.items() if field.indexed]
+        for name in indexed:
+            if "." in name or name.startswith("$"):
+                raise ValueError(f"Indexed field names cannot contain '.' or start with '$': {name}")
+            if schema.fields[name].field_type in (FieldType.ARRAY, FieldType.OBJECT):
+                raise ValueError(f"Only scalar fields can be indexed: {name}")
+
+        if indexed:
+            # Before the schema is stored, so a schema over the index quota is rejected whole
+            await self.index_service.ensure_entity_field_indexes(company_id, schema.schema_name, indexed)
+
         schema_doc = {
             "company_id": company_id,
             "schema_name": schema.schema_name,
-            "fields": schema.fields.dict(),
+            "fields": {name: field.model_dump() for name, field in schema.fields.items()},
             "relationships": schema.relationships,
             "created_at": datetime.now(),
             "updated_at": datetime.now()
         }
         result = await self.entity_schemas.insert_one(schema_doc)
+        self.registry.invalidate(company_id)
         return {"id": str(result.inserted_id), **schema_doc}
 
+    async def list_schemas(self, company_id: str) -> List[Dict]:
+        """All entity schemas of a company, by name (served from the registry)"""
+        registry = await self.registry.get(self.db, company_id)
+        return [
+            {"id": str(schema["_id"]), **schema}
+            for _, schema in sorted(registry.schemas.items())
+        ]
+
     async def create_workflow(self, workflow: WorkflowDefinition) -> Dict:
         """Create a new workflow with field mappings"""
         workflow_doc = workflow.dict()
         workflow_doc["created_at"] = datetime.now()
         workflow_doc["updated_at"] = datetime.now()
         
-        # Validate all schemas exist
+        # Validate all schemas exist, against one registry snapshot of the company
+        registry = await self.registry.get(self.db, workflow.company_id, schemas={
+            name
+            for step in workflow.steps.values()
+            for name in [step.schema_name] + [n for m in step.field_mappings for n in (m.source_schema, m.target_schema)]
+        })
         for step in workflow.steps.values():
-            schema = await self.entity_schemas.find_one({
-                "schema_name": step.schema_name,
-                "company_id": workflow.company_id
-            })
-            if not schema:
+            if not registry.schema(step.schema_name):
                 raise ValueError(f"Schema {step.schema_name} not found")
             
             # Validate field mappings
             for mapping in step.field_mappings:
-                await self._validate_field_mapping(workflow.company_id, mapping)
+                self._validate_field_mapping(registry, mapping)
         
         result = await self.workflows.insert_one(workflow_doc)
+        self.registry.invalidate(workflow.company_id)
         return {"id": str(result.inserted_id), **workflow_doc}
 
     async def create_entity(
@@ -52,132 +96,480 @@ class DynamicEntityService:
         company_id: str, 
         workflow_id: str,
         step_name: str,
-        data: Dict[str, Any]
+        data: Dict[str, Any],
+        relationships: Optional[Dict[str, List[str]]] = None,
+        instance_id: Optional[str] = None,
+        propagate: bool = True
     ) -> Dict:
-        """Create an entity and propagate mapped fields"""
-        # Get workflow
-        workflow = await self.workflows.find_one({"_id": ObjectId(workflow_id)})
-        if not workflow:
-            raise ValueError("Workflow not found")
-            
-        step = workflow["steps"].get(step_name)
-        if not step:
-            raise ValueError(f"Step {step_name} not found in workflow")
-            
-        # Get schema
-        schema = await self.entity_schemas.find_one({
-            "schema_name": step["schema_name"],
-            "company_id": company_id
-        })
-        
-        # Validate data against schema
-        self._validate_against_schema(schema["fields"], data)
+        """
+        Create an entity and propagate mapped fields.
+
+        Within a workflow instance, the step's draft (created earlier by field
+        mappings) is completed instead: the given data is merged over the
+        mapped values. The workflow runtime passes propagate=False and
+        propagates in the background.
+        """
+        registry, workflow, step = await self._resolve_step(company_id, workflow_id, step_name)
+        draft = None
+        if instance_id:
+            draft = await self.entities.find_one({
+                "company_id": company_id,
+                "instance_id": instance_id,
+                "step_name": step_name
+            })
+            if draft:
+                data = {**draft["data"], **data}
         
-        # Create entity
-        entity_doc = {
-            "company_id": company_id,
-            "workflow_id": workflow_id,
-            "step_name": step_name,
-            "schema_name": step["schema_name"],
-            "data": data,
-            "created_at": datetime.now(),
-            "updated_at": datetime.now()
-        }
+        # Validate data against the schema's compiled validator (applies defaults)
+        data = registry.validator(step["schema_name"]).validate(data)
+        edges = await self._relationship_edges(registry, company_id, step["schema_name"], relationships or {})
         
-        result = await self.entities.insert_one(entity_doc)
-        created_entity = {"id": str(result.inserted_id), **entity_doc}
+        if draft:
+            update: Dict[str, Any] = {"$set": {"data": data, "updated_at": datetime.now()}}
+            if edges:
+                update["$addToSet"] = {"relationships": {"$each": edges}}
+            created_entity = await self.entities.find_one_and_update(
+                {"_id": draft["_id"]}, update, return_document=ReturnDocument.AFTER
+            )
+            created_entity["id"] = str(created_entity["_id"])
+        else:
+            # Create entity
+            entity_doc = self._entity_doc(company_id, workflow_id, step_name, step["schema_name"], data, edges)
+            if instance_id:
+                entity_doc["instance_id"] = instance_id
+            result = await self.entities.insert_one(entity_doc)
+            created_entity = {"id": str(result.inserted_id), **entity_doc}
         
         # Apply field mappings to next steps if they exist
-        await self._propagate_mapped_fields(
-            company_id,
-            workflow_id,
-            step_name,
-            created_entity
-        )
+        if propagate:
+            await self.propagate_mapped_fields(
+                company_id,
+                workflow,
+                step_name,
+                [created_entity]
+            )
         
         return created_entity
 
+    async def bulk_create_entities(
+        self,
+        company_id: str,
+        workflow_id: str,
+        step_name: str,
+        payloads: List[Dict[str, Any]]
+    ) -> Dict:
+        """
+        Create many entities for one workflow step (spreadsheet migrations).
+
+        The batch is validated in one pass, inserted with a single unordered
+        insert_many and its field mappings are applied with a single
+        unordered bulk_write, so one bad row never blocks the rest. Returns
+        the counts and {input index: error} for the rows that were rejected.
+        """
+        registry, workflow, step = await self._resolve_step(company_id, workflow_id, step_name)
+        valid, errors = registry.validator(step["schema_name"]).validate_many(payloads)
+
+        # Map validated rows back to their position in the request
+        indexes = [index for index in range(len(payloads)) if index not in errors]
+        docs = [
+            self._entity_doc(company_id, workflow_id, step_name, step["schema_name"], data)
+            for data in valid
+        ]
+        created: List[Dict] = []
+        if docs:
+            failed = set()
+            try:
+                await self.entities.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                for write_error in e.details["writeErrors"]:
+                    failed.add(write_error["index"])
+                    errors[indexes[write_error["index"]]] = write_error["errmsg"]
+            # insert_many sets _id on every document before sending it
+            created = [{"id": str(doc["_id"]), **doc} for i, doc in enumerate(docs) if i not in failed]
+
+        propagated = await self.propagate_mapped_fields(company_id, workflow, step_name, created)
+        return {
+            "inserted": len(created),
+            "propagated": propagated,
+            "errors": dict(sorted(errors.items())),
+        }
+
     async def get_entity(self, company_id: str, entity_id: str) -> Optional[Dict]:
         """Retrieve an entity by ID"""
         entity = await self.entities.find_one({
-            "_id": ObjectId(entity_id),
+            "_id": self._object_id(entity_id),
             "company_id": company_id
         })
         if entity:
             entity["id"] = str(entity["_id"])
         return entity
 
+    async def query_entities(self, company_id: str, query: EntityQuery) -> Dict:
+        """
+        One page of a schema's entities matching the filters, with a cursor
+        for the next page.
+
+        Filter fields and values are checked against the schema (values are
+        coerced like entity data, so ISO dates compare as dates). Paging is
+        keyset-based on (sort field, _id): a page costs the same however deep
+        it is, and rows written between pages are neither skipped nor repeated.
+        """
+        registry = await self.registry.get(self.db, company_id, schemas=[query.schema_name])
+        validator = registry.validator(query.schema_name)
+        if validator is None:
+            raise ValueError(f"Schema {query.schema_name} not found")
+
+        conditions: List[Dict[str, Any]] = [{"company_id": company_id, "schema_name": query.schema_name}]
+        for entity_filter in query.filters:
+            if entity_filter.op == "exists":
+                validator.field(entity_filter.field)
+                value = bool(entity_filter.value)
+            elif entity_filter.op in ("in", "nin"):
+                if not isinstance(entity_filter.value, list):
+                    raise ValueError(f"{entity_filter.op} on {entity_filter.field} needs a list value")
+                value = [validator.validate_value(entity_filter.field, item) for item in entity_filter.value]
+            else:
+                value = validator.validate_value(entity_filter.field, entity_filter.value)
+            conditions.append({f"data.{entity_filter.field}": {FILTER_OPERATORS[entity_filter.op]: value}})
+
+        direction = -1 if query.descending else 1
+        sort_key = None
+        if query.sort_by:
+            if validator.field(query.sort_by)["field_type"] in (FieldType.ARRAY, FieldType.OBJECT):
+                raise ValueError(f"Cannot sort by {query.sort_by}")
+            sort_key = f"data.{query.sort_by}"
+        if query.cursor:
+            conditions.append(self._after_cursor(query, sort_key, direction))
+
+        sort = [(sort_key, direction), ("_id", direction)] if sort_key else [("_id", direction)]
+        docs = await self.entities.find({"$and": conditions}).sort(sort).limit(query.limit + 1).to_list(None)
+
+        next_cursor = None
+        if len(docs) > query.limit:
+            docs = docs[:query.limit]
+            last = docs[-1]
+            next_cursor = self._encode_cursor(query, self._data_value(last, query.sort_by), last["_id"])
+        return {
+            "items": [{"id": str(doc["_id"]), **doc} for doc in docs],
+            "next_cursor": next_cursor,
+        }
+
+    async def link_entities(self, company_id: str, entity_id: str, relationships: Dict[str, List[str]]) -> Dict:
+        """Add relationships (type -> entity ids) to an existing entity; existing links are kept"""
+        entity = await self.entities.find_one(
+            {"_id": self._object_id(entity_id), "company_id": company_id},
+            {"schema_name": 1}
+        )
+        if not entity:
+            raise ValueError("Entity not found")
+        registry = await self.registry.get(self.db, company_id, schemas=[entity["schema_name"]])
+        edges = await self._relationship_edges(registry, company_id, entity["schema_name"], relationships)
+        if edges:
+            await self.entities.update_one(
+                {"_id": entity["_id"]},
+                {"$addToSet": {"relationships": {"$each": edges}}, "$set": {"updated_at": datetime.now()}}
+            )
+        return await self.get_entity(company_id, entity_id)
+
+    async def traverse(
+        self,
+        company_id: str,
+        entity_id: str,
+        max_depth: int = 1,
+        relationship_types: Optional[List[str]] = None,
+        schema_names: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        Entities reachable from entity_id within max_depth hops, nearest first,
+        each tagged with its "depth".
+
+        Relationships are followed in both directions (a quote linked to its
+        project is found from the project too), optionally only those of the
+        given types. schema_names restricts the entities visited, so paths
+        through other schemas are not followed. Each hop is one query: the
+        frontier's link targets and the entities linking to the frontier are
+        fetched together with $in.
+        """
+        root = await self.entities.find_one(
+            {"_id": self._object_id(entity_id), "company_id": company_id},
+            {"relationships": 1}
+        )
+        if not root:
+            return []
+
+        types = set(relationship_types) if relationship_types else None
+        seen = {root["_id"]}
+        frontier = [root]
+        related: List[Dict] = []
+        for depth in range(1, max_depth + 1):
+            outgoing = list({
+                edge["entity_id"]
+                for doc in frontier for edge in doc.get("relationships", [])
+                if (types is None or edge["type"] in types) and edge["entity_id"] not in seen
+            })
+            incoming: Dict[str, Any] = {"entity_id": {"$in": [doc["_id"] for doc in frontier]}}
+            if types is not None:
+                incoming["type"] = {"$in": list(types)}
+            query: Dict[str, Any] = {
+                "company_id": company_id,
+                "$or": [{"_id": {"$in": outgoing}}, {"relationships": {"$elemMatch": incoming}}],
+            }
+            if schema_names:
+                query["schema_name"] = {"$in": schema_names}
+
+            frontier = []
+            async for doc in self.entities.find(query):
+                if doc["_id"] in seen:
+                    continue
+                seen.add(doc["_id"])
+                frontier.append(doc)
+                related.append({**doc, "id": str(doc["_id"]), "depth": depth})
+            if not frontier:
+                break
+        return related
+
     async def get_related_entities(
         self, 
         company_id: str, 
         entity_id: str, 
         relationship_type: Optional[str] = None
     ) -> List[Dict]:
-        """Get all entities related to the given entity"""
-        entity = await self.get_entity(company_id, entity_id)
-        if not entity:
-            return []
-        
-        relationships = entity["relationships"]
-        if relationship_type:
-            relationships = {k: v for k, v in relationships.items() 
-                           if k == relationship_type}
-        
-        related_entities = []
-        for rel_type, rel_id in relationships.items():
-            related = await self.get_entity(company_id, rel_id)
-            if related:
-                related_entities.append(related)
-        
-        return related_entities
+        """Get all entities directly related to the given entity"""
+        return await self.traverse(
+            company_id,
+            entity_id,
+            max_depth=1,
+            relationship_types=[relationship_type] if relationship_type else None
+        )
 
-    def _validate_against_schema(self, schema_fields: Dict, data: Dict):
-        """Validate entity data against its schema"""
-        for field_name, field_def in schema_fields.items():
-            if field_def["required"] and field_name not in data:
-                raise ValueError(f"Required field {field_name} is missing")
+    async def _resolve_step(self, company_id: str, workflow_id: str, step_name: str) -> Tuple[CompanyRegistry, Dict, Dict]:
+        """Registry snapshot, workflow and step for an entity write; no round trip when warm"""
+        registry = await self.registry.get(self.db, company_id, workflows=[workflow_id])
+        workflow = registry.workflow(workflow_id)
+        if not workflow:
+            raise ValueError("Workflow not found")
             
-            if field_name in data:
-                # Add type validation here based on field_def["field_type"]
-                pass
+        step = workflow["steps"].get(step_name)
+        if not step:
+            raise ValueError(f"Step {step_name} not found in workflow")
+            
+        registry = await self.registry.get(self.db, company_id, schemas=[step["schema_name"]])
+        if not registry.schema(step["schema_name"]):
+            raise ValueError(f"Schema {step['schema_name']} not found")
+        return registry, workflow, step
+
+    @staticmethod
+    def _data_value(doc: Dict, path: Optional[str]) -> Any:
+        value = doc.get("data")
+        for part in path.split(".") if path else ():
+            value = value.get(part) if isinstance(value, dict) else None
+        return value
+
+    @staticmethod
+    def _encode_cursor(query: EntityQuery, value: Any, last_id: ObjectId) -> str:
+        """Opaque cursor: the last row's sort key, bound to the sort it came from"""
+        payload = {"s": query.sort_by, "d": query.descending, "v": value, "id": last_id}
+        return base64.urlsafe_b64encode(json_util.dumps(payload).encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def _after_cursor(query: EntityQuery, sort_key: Optional[str], direction: int) -> Dict[str, Any]:
+        """Condition selecting the rows after the cursor in (sort key, _id) order"""
+        try:
+            payload = json_util.loads(base64.urlsafe_b64decode(query.cursor.encode("ascii")))
+            value, last_id = payload["v"], payload["id"]
+            same_sort = payload["s"] == query.sort_by and payload["d"] == query.descending
+        except (ValueError, KeyError, TypeError, binascii.Error):
+            raise ValueError("Invalid cursor")
+        if not same_sort:
+            raise ValueError("Cursor belongs to a different sort")
 
-    async def _propagate_mapped_fields(
+        after = "$gt" if direction == 1 else "$lt"
+        if sort_key is None:
+            return {"_id": {after: last_id}}
+        if value is None:
+            # Missing values sort first: ascending continues into the non-null
+            # values, descending has only the remaining nulls left
+            branches = [{sort_key: None, "_id": {after: last_id}}]
+            if direction == 1:
+                branches.append({sort_key: {"$ne": None}})
+            return {"$or": branches}
+        branches = [{sort_key: {after: value}}, {sort_key: value, "_id": {after: last_id}}]
+        if direction == -1:
+            # Comparisons never match null, which sorts last when descending
+            branches.append({sort_key: None})
+        return {"$or": branches}
+
+    @staticmethod
+    def _object_id(entity_id: str) -> ObjectId:
+        try:
+            return ObjectId(entity_id)
+        except (InvalidId, TypeError):
+            raise ValueError(f"Invalid entity id: {entity_id}")
+
+    async def _relationship_edges(
         self,
+        registry: CompanyRegistry,
+        company_id: str,
+        schema_name: str,
+        relationships: Dict[str, List[str]]
+    ) -> List[Dict]:
+        """
+        Stored form of relationships ({type: [entity ids]}) for an entity of
+        schema_name. Types must be declared on the schema and every target
+        must exist with the declared schema; targets are checked in one query.
+        """
+        declared = registry.schema(schema_name).get("relationships") or {}
+        edges = []
+        for rel_type, entity_ids in relationships.items():
+            if rel_type not in declared:
+                raise ValueError(f"Relationship {rel_type} is not declared on {schema_name}")
+            edges.extend({"type": rel_type, "entity_id": self._object_id(entity_id)} for entity_id in entity_ids)
+        if not edges:
+            return []
+
+        targets = {
+            doc["_id"]: doc["schema_name"]
+            async for doc in self.entities.find(
+                {"_id": {"$in": [edge["entity_id"] for edge in edges]}, "company_id": company_id},
+                {"schema_name": 1}
+            )
+        }
+        for edge in edges:
+            if targets.get(edge["entity_id"]) != declared[edge["type"]]:
+                raise ValueError(f"{edge['type']} must reference an existing {declared[edge['type']]} entity")
+        return edges
+
+    @staticmethod
+    def _entity_doc(
         company_id: str,
         workflow_id: str,
+        step_name: str,
+        schema_name: str,
+        data: Dict,
+        relationships: Optional[List[Dict]] = None
+    ) -> Dict:
+        now = datetime.now()
+        return {
+            "company_id": company_id,
+            "workflow_id": workflow_id,
+            "step_name": step_name,
+            "schema_name": schema_name,
+            "data": data,
+            # [{"type", "entity_id"}]; see traverse()
+            "relationships": relationships or [],
+            "created_at": now,
+            "updated_at": now
+        }
+
+    def _mapping_operations(
+        self,
+        registry: CompanyRegistry,
+        company_id: str,
+        workflow: Dict,
         current_step: str,
-        source_entity: Dict
-    ):
-        """Propagate mapped fields to next steps in workflow"""
-        workflow = await self.workflows.find_one({"_id": ObjectId(workflow_id)})
+        source_entities: List[Dict],
+        target_schemas: Optional[List[str]] = None
+    ) -> List[UpdateOne]:
+        """
+        One upsert per (source entity, target schema) carrying every mapped
+        field. The target is the entity of that schema created from the
+        source (matched on source_entity_id); it is created on first write
+        as a draft of the next step that uses the schema.
+
+        Each mapping is evaluated over the whole batch at once: its
+        transformation is compiled once and applied to every source value,
+        then the results are checked against the target field's type.
+        Values that are null or do not fit are not written.
+        """
+        workflow_id = str(workflow["_id"])
         step = workflow["steps"][current_step]
-        
+        target_steps = {
+            workflow["steps"][name]["schema_name"]: name
+            for name in step["next_steps"] if name in workflow["steps"]
+        }
+        now = datetime.now()
+
+        # entity index -> target schema -> {"data.<field>": value}
+        updates: Dict[int, Dict[str, Dict[str, Any]]] = {}
         for mapping in step["field_mappings"]:
-            if mapping["source_schema"] == source_entity["schema_name"]:
-                source_value = source_entity["data"].get(mapping["source_field"])
-                if source_value is not None:
-                    # Create or update target entity with mapped field
-                    await self._update_mapped_field(
-                        company_id,
-                        workflow_id,
-                        mapping["target_schema"],
-                        mapping["target_field"],
-                        source_value,
-                        mapping.get("transformation")
-                    )
-
-    async def _validate_field_mapping(self, company_id: str, mapping: FieldMapping):
-        """Validate that source and target fields exist in their respective schemas"""
-        source_schema = await self.entity_schemas.find_one({
-            "schema_name": mapping.source_schema,
-            "company_id": company_id
-        })
-        target_schema = await self.entity_schemas.find_one({
-            "schema_name": mapping.target_schema,
-            "company_id": company_id
+            if target_schemas is not None and mapping["target_schema"] not in target_schemas:
+                continue
+            target = registry.validator(mapping["target_schema"])
+            if target is None:
+                continue
+            rows = [i for i, entity in enumerate(source_entities) if entity["schema_name"] == mapping["source_schema"]]
+            values = [source_entities[i]["data"].get(mapping["source_field"]) for i in rows]
+            if mapping.get("transformation"):
+                values = compile_transformation(mapping["transformation"]).apply_many(
+                    values, [source_entities[i]["data"] for i in rows]
+                )
+            rejected, error = 0, None
+            for i, value in zip(rows, values):
+                if value is None:
+                    continue
+                try:
+                    value = target.validate_field(mapping["target_field"], value)
+                except ValueError as e:
+                    rejected, error = rejected + 1, e
+                    continue
+                updates.setdefault(i, {}).setdefault(mapping["target_schema"], {})[f"data.{mapping['target_field']}"] = value
+            if rejected:
+                logger.warning(f"{rejected} values not mapped into {mapping['target_schema']}, e.g. {str(error)}")
+
+        operations = []
+        for i, entity in enumerate(source_entities):
+            for target_schema, fields in updates.get(i, {}).items():
+                operations.append(UpdateOne(
+                    {
+                        "company_id": company_id,
+                        "workflow_id": workflow_id,
+                        "schema_name": target_schema,
+                        "source_entity_id": entity["id"],
+                    },
+                    {
+                        "$set": {**fields, "updated_at": now},
+                        "$setOnInsert": {
+                            "step_name": target_steps.get(target_schema),
+                            "instance_id": entity.get("instance_id"),
+                            "relationships": [{"type": SOURCE_RELATIONSHIP, "entity_id": ObjectId(entity["id"])}],
+                            "created_at": now,
+                        },
+                    },
+                    upsert=True
+                ))
+        return operations
+
+    async def propagate_mapped_fields(
+        self,
+        company_id: str,
+        workflow: Dict,
+        current_step: str,
+        source_entities: List[Dict],
+        target_schemas: Optional[List[str]] = None
+    ) -> int:
+        """
+        Propagate mapped fields to next steps in workflow, optionally only the
+        mappings into target_schemas. Idempotent: replaying it rewrites the
+        same values. Returns the number of target entities written.
+        """
+        registry = await self.registry.get(self.db, company_id, schemas={
+            mapping["target_schema"] for mapping in workflow["steps"][current_step]["field_mappings"]
         })
+        operations = self._mapping_operations(registry, company_id, workflow, current_step, source_entities, target_schemas)
+        if not operations:
+            return 0
+        result = await self.entities.bulk_write(operations, ordered=False)
+        return result.upserted_count + result.modified_count
+
+    def _validate_field_mapping(self, registry: CompanyRegistry, mapping: FieldMapping):
+        """Validate that source and target fields exist in their respective schemas"""
+        source_schema = registry.schema(mapping.source_schema)
+        target_schema = registry.schema(mapping.target_schema)
         
         if not source_schema or mapping.source_field not in source_schema["fields"]:
             raise ValueError(f"Invalid source field: {mapping.source_field}")
         if not target_schema or mapping.target_field not in target_schema["fields"]:
-            raise ValueError(f"Invalid target field: {mapping.target_field}") 
\ No newline at end of file
+            raise ValueError(f"Invalid target field: {mapping.target_field}")
+        if mapping.transformation:
+            # Parsed (and cached) now so a bad expression fails the workflow, not propagation
+            compile_transformation(mapping.transformation) 
\ No newline at end of file
@@ -0,0 +1,170 @@
+# app/services/entity_registry.py
+
+import asyncio
+import time
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.config import settings
+from app.utils.entity_validator import EntityValidator
+
+
+@dataclass(frozen=True)
+class CompanyRegistry:
+    """Snapshot of a company's entity schemas (by schema_name) and workflows (by id)"""
+    company_id: str
+    version: int
+    schemas: Dict[str, Dict] = field(default_factory=dict)
+    workflows: Dict[str, Dict] = field(default_factory=dict)
+    # Compiled lazily; they live and expire with the snapshot
+    validators: Dict[str, EntityValidator] = field(default_factory=dict)
+
+    def schema(self, schema_name: str) -> Optional[Dict]:
+        return self.schemas.get(schema_name)
+
+    def validator(self, schema_name: str) -> Optional[EntityValidator]:
+        validator = self.validators.get(schema_name)
+        if validator is None and schema_name in self.schemas:
+            validator = EntityValidator(schema_name, self.schemas[schema_name]["fields"])
+            self.validators[schema_name] = validator
+        return validator
+
+    def workflow(self, workflow_id: str) -> Optional[Dict]:
+        return self.workflows.get(workflow_id)
+
+
+class EntityRegistry:
+    """
+    Per-worker cache of entity schemas and workflows, one snapshot per company_id.
+
+    A cold company is loaded with one query per collection (several companies
+    at once with $in); afterwards metadata reads cost no round trip. Every
+    snapshot carries a version that is bumped by invalidate(), which the
+    service calls after every write to a schema or workflow. A load that
+    was in flight when the version changed is discarded rather than cached.
+    Writes made through other workers are picked up when a caller asks for
+    a schema or workflow the cached snapshot lacks (one reload before it is
+    reported missing, rate limited to one per `min_reload_seconds` per
+    company so requests naming unknown schemas cannot force a reload each)
+    and otherwise within the TTL.
+
+    Snapshots are shared and must not be mutated (apart from the validator
+    cache they fill themselves).
+    """
+
+    def __init__(self, ttl_seconds: int, min_reload_seconds: float = 5):
+        self.ttl_seconds = ttl_seconds
+        self.min_reload_seconds = min_reload_seconds
+        # company_id -> (monotonic time loaded, snapshot)
+        self._snapshots: Dict[str, Tuple[float, CompanyRegistry]] = {}
+        self._versions: Dict[str, int] = {}
+        self._loading: Dict[str, asyncio.Future] = {}
+
+    def version(self, company_id: str) -> int:
+        return self._versions.get(company_id, 0)
+
+    def _cached(self, company_id: str) -> Optional[CompanyRegistry]:
+        entry = self._snapshots.get(company_id)
+        if entry is None:
+            return None
+        loaded_at, snapshot = entry
+        if time.monotonic() - loaded_at > self.ttl_seconds or snapshot.version != self.version(company_id):
+            del self._snapshots[company_id]
+            return None
+        return snapshot
+
+    async def get(
+        self,
+        db: AsyncIOMotorDatabase,
+        company_id: str,
+        schemas: Iterable[str] = (),
+        workflows: Iterable[str] = (),
+    ) -> CompanyRegistry:
+        """
+        The company's snapshot. If a cached snapshot lacks any of the named
+        schemas or workflow ids, they may have been created through another
+        worker: unless it was loaded less than min_reload_seconds ago, the
+        snapshot is reloaded once, and the caller reports whatever is still
+        missing.
+        """
+        snapshot = self._cached(company_id)
+        if snapshot is not None:
+            if all(name in snapshot.schemas for name in schemas) and all(
+                workflow_id in snapshot.workflows for workflow_id in workflows
+            ):
+                return snapshot
+            if time.monotonic() - self._snapshots[company_id][0] < self.min_reload_seconds:
+                return snapshot
+            # Nothing was written through this worker, so only its snapshot goes
+            del self._snapshots[company_id]
+        return (await self.get_many(db, [company_id]))[company_id]
+
+    async def get_many(self, db: AsyncIOMotorDatabase, company_ids: Iterable[str]) -> Dict[str, CompanyRegistry]:
+        """Snapshots for several companies; the cold ones are loaded together"""
+        result, waiting, cold = {}, {}, []
+        for company_id in dict.fromkeys(company_ids):
+            snapshot = self._cached(company_id)
+            if snapshot is not None:
+                result[company_id] = snapshot
+            elif company_id in self._loading:
+                waiting[company_id] = self._loading[company_id]
+            else:
+                cold.append(company_id)
+
+        if cold:
+            future = asyncio.ensure_future(self._load(db, cold))
+            for company_id in cold:
+                self._loading[company_id] = future
+            try:
+                loaded = await asyncio.shield(future)
+            finally:
+                for company_id in cold:
+                    if self._loading.get(company_id) is future:
+                        del self._loading[company_id]
+            result.update({company_id: loaded[company_id] for company_id in cold})
+
+        for company_id, future in waiting.items():
+            result[company_id] = (await asyncio.shield(future))[company_id]
+        return result
+
+    async def _load(self, db: AsyncIOMotorDatabase, company_ids: List[str]) -> Dict[str, CompanyRegistry]:
+        versions = {company_id: self.version(company_id) for company_id in company_ids}
+        query = {"company_id": {"$in": company_ids}}
+        schema_docs, workflow_docs = await asyncio.gather(
+            db.entity_schemas.find(query).to_list(None),
+            db.workflows.find(query).to_list(None),
+        )
+
+        schemas: Dict[str, Dict[str, Dict]] = {company_id: {} for company_id in company_ids}
+        for doc in schema_docs:
+            # The latest definition wins if a schema name was created twice
+            current = schemas[doc["company_id"]].get(doc["schema_name"])
+            if current is None or doc.get("updated_at", datetime.min) >= current.get("updated_at", datetime.min):
+                schemas[doc["company_id"]][doc["schema_name"]] = doc
+        workflows: Dict[str, Dict[str, Dict]] = {company_id: {} for company_id in company_ids}
+        for doc in workflow_docs:
+            workflows[doc["company_id"]][str(doc["_id"])] = doc
+
+        loaded_at = time.monotonic()
+        loaded = {}
+        for company_id in company_ids:
+            snapshot = CompanyRegistry(company_id, versions[company_id], schemas[company_id], workflows[company_id])
+            loaded[company_id] = snapshot
+            # Only cache if nothing was written while loading
+            if self.version(company_id) == versions[company_id]:
+                self._snapshots[company_id] = (loaded_at, snapshot)
+        return loaded
+
+    def invalidate(self, company_id: str) -> None:
+        self._versions[company_id] = self.version(company_id) + 1
+        self._snapshots.pop(company_id, None)
+        # Later callers must not join a load that started before the write
+        self._loading.pop(company_id, None)
+
+    def clear(self) -> None:
+        for company_id in list(self._snapshots):
+            self.invalidate(company_id)
+
+
+entity_registry = EntityRegistry(settings.ENTITY_REGISTRY_TTL_SECONDS, settings.ENTITY_REGISTRY_MIN_RELOAD_SECONDS)
@@ -0,0 +1,256 @@
+# app/services/event_bus.py
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure, PyMongoError
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Collections the bus can watch
+WATCHED_COLLECTIONS = ("Quotes", "Invoices", "Assigned_Slates", "Projects", "CRM", "Users")
+OPERATIONS = ("insert", "update", "replace", "delete")
+
+# Server error raised when a resume token is no longer in the oplog
+CHANGE_STREAM_HISTORY_LOST = 286
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """One change to a watched collection"""
+    token: Any  # resume token
+    collection: str
+    operation: str  # insert | update | replace | delete
+    document_id: Any
+    document: Optional[Dict] = None  # after the change; None for deletes
+    before: Optional[Dict] = None  # before the change, if pre-images are enabled on the collection
+    updated_fields: Optional[Dict] = None
+
+    @classmethod
+    def from_change(cls, change: Dict) -> "ChangeEvent":
+        return cls(
+            token=change["_id"],
+            collection=change["ns"]["coll"],
+            operation=change["operationType"],
+            document_id=change["documentKey"]["_id"],
+            document=change.get("fullDocument"),
+            before=change.get("fullDocumentBeforeChange"),
+            updated_fields=(change.get("updateDescription") or {}).get("updatedFields"),
+        )
+
+
+Handler = Callable[[ChangeEvent], Awaitable[None]]
+
+
+@dataclass
+class ConsumerGroup:
+    """
+    A named subscriber. Every group receives every matching event once
+    (at least once across restarts), with its own persisted position.
+    """
+    name: str
+    collections: Sequence[str]
+    handler: Handler
+    operations: Sequence[str] = OPERATIONS
+    needs_before: bool = False  # handler reads ChangeEvent.before (e.g. on deletes)
+
+
+class MongoChangeSource:
+    """Change streams on the Forms database (needs a replica set)"""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+
+    async def enable_pre_images(self, collection: str) -> None:
+        """
+        Pre-images make deleted documents visible to consumers (MongoDB 6.0+).
+        A consumer that needs them would silently miss deletes without them,
+        so the worker refuses to start.
+        """
+        try:
+            await self.db.command({"collMod": collection, "changeStreamPreAndPostImages": {"enabled": True}})
+        except PyMongoError as e:
+            raise RuntimeError(f"Could not enable change stream pre-images on {collection}: {str(e)}") from e
+
+    async def watch(self, collections: Sequence[str], operations: Sequence[str], resume_after: Any = None) -> AsyncIterator[ChangeEvent]:
+        pipeline = [{"$match": {"ns.coll": {"$in": list(collections)}, "operationType": {"$in": list(operations)}}}]
+        async with self.db.watch(
+            pipeline,
+            full_document="updateLookup",
+            full_document_before_change="whenAvailable",
+            resume_after=resume_after,
+        ) as stream:
+            async for change in stream:
+                yield ChangeEvent.from_change(change)
+
+
+class InMemoryChangeSource:
+    """
+    Stand-in for a replica set's change streams, for tests and local runs
+    on a standalone server. Services (or tests) publish() changes; watchers
+    receive them in order and can resume after any token, like the real thing.
+    """
+
+    def __init__(self):
+        self._log: List[ChangeEvent] = []
+        self._changed = asyncio.Condition()
+
+    async def enable_pre_images(self, collection: str) -> None:
+        pass
+
+    async def publish(
+        self,
+        collection: str,
+        operation: str,
+        document_id: Any,
+        document: Optional[Dict] = None,
+        before: Optional[Dict] = None,
+        updated_fields: Optional[Dict] = None,
+    ) -> ChangeEvent:
+        event = ChangeEvent(len(self._log) + 1, collection, operation, document_id, document, before, updated_fields)
+        async with self._changed:
+            self._log.append(event)
+            self._changed.notify_all()
+        return event
+
+    async def watch(self, collections: Sequence[str], operations: Sequence[str], resume_after: Any = None) -> AsyncIterator[ChangeEvent]:
+        position = resume_after or 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self._log) > position)
+                pending = self._log[position:]
+            for event in pending:
+                position = event.token
+                if event.collection in collections and event.operation in operations:
+                    yield event
+
+
+class EventBus:
+    """
+    Runs consumer groups over a change source.
+
+    Each group tails its own stream from its last checkpoint (the
+    "Event_Bus_Offsets" collection), so write paths only write and the
+    derived data catches up asynchronously. Handlers must be idempotent:
+    delivery is at least once, since the checkpoint is saved at most every
+    EVENT_BUS_CHECKPOINT_SECONDS. A handler that keeps failing after
+    EVENT_BUS_MAX_ATTEMPTS tries has the event parked in
+    "Event_Bus_Dead_Letters" and the group moves on. If a checkpoint has
+    fallen out of the oplog, the group restarts from the current position
+    and logs an error.
+    """
+
+    def __init__(self, source, db: AsyncIOMotorDatabase):
+        self.source = source
+        self.offsets = db.get_collection("Event_Bus_Offsets")
+        self.dead_letters = db.get_collection("Event_Bus_Dead_Letters")
+        self.groups: Dict[str, ConsumerGroup] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def subscribe(self, name: str, collections: Sequence[str], operations: Sequence[str] = OPERATIONS, needs_before: bool = False):
+        """Decorator registering a handler as consumer group `name`"""
+        unknown = set(collections) - set(WATCHED_COLLECTIONS)
+        if unknown:
+            raise ValueError(f"Collections not watched by the event bus: {sorted(unknown)}")
+
+        def register(handler: Handler) -> Handler:
+            self.groups[name] = ConsumerGroup(name, tuple(collections), handler, tuple(operations), needs_before)
+            return handler
+        return register
+
+    async def start(self) -> None:
+        for collection in {c for group in self.groups.values() if group.needs_before for c in group.collections}:
+            await self.source.enable_pre_images(collection)
+        self._tasks = [asyncio.create_task(self._run(group), name=f"event-bus-{group.name}") for group in self.groups.values()]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _load_token(self, group: str) -> Any:
+        doc = await self.offsets.find_one({"_id": group})
+        return doc["token"] if doc else None
+
+    async def _save_token(self, group: str, token: Any) -> None:
+        await self.offsets.update_one(
+            {"_id": group}, {"$set": {"token": token, "updated_at": datetime.utcnow()}}, upsert=True
+        )
+
+    async def _run(self, group: ConsumerGroup) -> None:
+        token = await self._load_token(group.name)
+        saved, saved_at = token, time.monotonic()
+        while True:
+            try:
+                async for event in self.source.watch(group.collections, group.operations, resume_after=token):
+                    await self._deliver(group, event)
+                    token = event.token
+                    if time.monotonic() - saved_at >= settings.EVENT_BUS_CHECKPOINT_SECONDS:
+                        await self._save_token(group.name, token)
+                        saved, saved_at = token, time.monotonic()
+            except asyncio.CancelledError:
+                if token != saved:
+                    await asyncio.shield(self._save_token(group.name, token))
+                raise
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAM_HISTORY_LOST:
+                    logger.error(f"Event bus group {group.name} lost its position; events were missed, resuming from now")
+                    token = None
+                else:
+                    logger.error(f"Event bus group {group.name} stream failed: {str(e)}")
+            except PyMongoError as e:
+                logger.error(f"Event bus group {group.name} stream failed: {str(e)}")
+            await asyncio.sleep(settings.EVENT_BUS_RETRY_SECONDS)
+
+    async def _deliver(self, group: ConsumerGroup, event: ChangeEvent) -> None:
+        for attempt in range(1, settings.EVENT_BUS_MAX_ATTEMPTS + 1):
+            try:
+                await group.handler(event)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt == settings.EVENT_BUS_MAX_ATTEMPTS:
+                    logger.error(f"Event bus group {group.name} gave up on {event.collection} {event.operation} {event.document_id}: {str(e)}")
+                    await self.dead_letters.insert_one({
+                        "group": group.name,
+                        "collection": event.collection,
+                        "operation": event.operation,
+                        "document_id": event.document_id,
+                        "error": str(e),
+                        "created_at": datetime.utcnow(),
+                    })
+                    return
+                await asyncio.sleep(settings.EVENT_BUS_RETRY_SECONDS * 2 ** (attempt - 1))
+
+
+# Worker process: python -m app.services.event_bus
+if __name__ == "__main__":
+    import signal
+    from app.services.event_consumers import register_consumers
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def main():
+        client = AsyncIOMotorClient(settings.MONGODB_URL)
+        bus = EventBus(MongoChangeSource(client.Forms), client.Forms)
+        register_consumers(bus, client)
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stopping.set)
+        await bus.start()
+        logger.info(f"Event bus running consumer groups: {sorted(bus.groups)}")
+        try:
+            await stopping.wait()
+        finally:
+            await bus.stop()
+            client.close()
+
+    asyncio.run(main())
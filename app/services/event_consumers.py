@@ -0,0 +1,63 @@
+# app/services/event_consumers.py
+
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.services.event_bus import ChangeEvent, EventBus
+
+logger = logging.getLogger(__name__)
+
+
+class Org_Metrics_Service:
+    """Today's OrganizationMetrics row for an org, recomputed from its Assigned_Slates"""
+
+    def __init__(self, client: AsyncIOMotorClient):
+        self.db = client.Forms
+        self.assigned_slates = self.db.get_collection("Assigned_Slates")
+        self.org_metrics = self.db.get_collection("OrganizationMetrics")
+
+    async def refresh(self, owner_org: str, now: Optional[datetime] = None) -> Dict:
+        now = now or datetime.utcnow()
+        overdue = {"$and": [{"$eq": ["$status", False]}, {"$lt": ["$due_date", now]}]}
+        pipeline = [
+            {"$match": {"owner_org": owner_org}},
+            {"$group": {
+                "_id": None,
+                "total_slates": {"$sum": 1},
+                "active_slates": {"$sum": {"$cond": [{"$eq": ["$status", False]}, 1, 0]}},
+                "overdue_slates": {"$sum": {"$cond": [overdue, 1, 0]}},
+                "overdue_ms": {"$sum": {"$cond": [overdue, {"$subtract": [now, "$due_date"]}, 0]}},
+            }},
+        ]
+        counts = (await self.assigned_slates.aggregate(pipeline).to_list(1) or [{}])[0]
+        active, overdue_count = counts.get("active_slates", 0), counts.get("overdue_slates", 0)
+        metrics = {
+            "owner_org": owner_org,
+            "date": now.replace(hour=0, minute=0, second=0, microsecond=0),
+            "total_slates": counts.get("total_slates", 0),
+            "overdue_slates": overdue_count,
+            # Mean days past due of the overdue slates
+            "average_overdue": int(counts.get("overdue_ms", 0) / overdue_count / 86400000) if overdue_count else 0,
+            # Share of active slates that are on time
+            "project_health": round(100 * (active - overdue_count) / active) if active else 100,
+        }
+        await self.org_metrics.update_one(
+            {"owner_org": owner_org, "date": metrics["date"]}, {"$set": metrics}, upsert=True
+        )
+        return metrics
+
+
+def register_consumers(bus: EventBus, client: AsyncIOMotorClient) -> None:
+    """
+    Secondary effects of writes, such as derived metrics. Anything a caller
+    relies on once its request returns (e.g. deleting a project's slates)
+    stays in the request path.
+    """
+    metrics = Org_Metrics_Service(client)
+
+    @bus.subscribe("org_metrics", ["Assigned_Slates"], needs_before=True)
+    async def refresh_org_metrics(event: ChangeEvent) -> None:
+        slate = event.document or event.before
+        if slate and slate.get("owner_org"):
+            await metrics.refresh(slate["owner_org"])
@@ -0,0 +1,120 @@
+# app/services/extraction_cache.py
+
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+logger = logging.getLogger(__name__)
+
+
+def extraction_cache_key(document_sha256: str, model: str, prompt: str, system_prompt: Optional[str] = None) -> str:
+    """SHA-256 over the PDF digest, model version and prompts"""
+    digest = hashlib.sha256()
+    for part in (document_sha256, model, system_prompt or "", prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Content-addressed cache of LLM extraction results.
+
+    The same standard forms are uploaded by many orgs, so results are keyed
+    by content (see extraction_cache_key), not by org or job. MongoDB holds
+    the shared results (the "LLM_Cache" collection, expired by a TTL index);
+    a bounded LRU in memory answers repeat hits without a round trip.
+    Concurrent misses on one key share a single computation.
+
+    Hit and miss counters are per worker process.
+    """
+
+    def __init__(self, collection: AsyncIOMotorCollection, memory_entries: int = 512):
+        self.collection = collection
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, result: str) -> None:
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[str]:
+        result = self._memory.get(key)
+        if result is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return result
+        try:
+            doc = await self.collection.find_one({"_id": key}, {"result": 1})
+        except Exception as e:
+            # The cache is an optimisation: a failed read is treated as a miss
+            logger.error(f"Error reading extraction cache: {str(e)}")
+            doc = None
+        if doc is not None:
+            self._remember(key, doc["result"])
+            self.db_hits += 1
+            return doc["result"]
+        return None
+
+    async def put(self, key: str, result: str, model: str) -> None:
+        self._remember(key, result)
+        try:
+            await self.collection.update_one(
+                {"_id": key},
+                {"$set": {"result": result, "model": model, "created_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"Error writing extraction cache: {str(e)}")
+
+    async def get_or_compute(self, key: str, model: str, compute: Callable[[], Awaitable[str]]) -> str:
+        result = await self.get(key)
+        if result is not None:
+            return result
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            # Another task is already computing this key
+            self.memory_hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            result = await compute()
+            await self.put(key, result, model)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            # Waiters get the error; the failure itself is not cached
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            del self._pending[key]
+
+    def stats(self) -> Dict[str, float]:
+        hits = self.memory_hits + self.db_hits
+        lookups = hits + self.misses
+        return {
+            "lookups": lookups,
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
@@ -0,0 +1,320 @@
+# app/services/index_service.py
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Options compared when checking an existing index against its declaration
+_COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+
+def _owner_org_index() -> IndexModel:
+    return IndexModel([("owner_org", ASCENDING)], name="owner_org_1")
+
+
+# Indexes created at runtime for dynamic entity fields marked indexed; not in the registry
+ENTITY_FIELD_INDEX_PREFIX = "entity_field_"
+
+
+def entity_field_index(company_id: str, schema_name: str, field_name: str) -> IndexModel:
+    """
+    Index for filtering and keyset-sorting one company's entities of a
+    schema on a data field. Partial on company_id and schema_name, so it
+    only holds those entities and every query on the schema (which always
+    has both) can use it.
+    """
+    return IndexModel(
+        [(f"data.{field_name}", ASCENDING), ("_id", ASCENDING)],
+        name=f"{ENTITY_FIELD_INDEX_PREFIX}{company_id}.{schema_name}.{field_name}",
+        partialFilterExpression={"company_id": company_id, "schema_name": schema_name},
+    )
+
+
+# Declarative registry: collection name -> indexes it must have.
+# Add an entry here whenever a service introduces a new query shape.
+INDEX_REGISTRY: Dict[str, List[IndexModel]] = {
+    # Per-org documents ({owner_org, items: [...]})
+    "Company_Details": [_owner_org_index()],
+    "Payment_Details": [_owner_org_index()],
+    "Pricing": [_owner_org_index()],
+    "CRM": [_owner_org_index()],
+    "Prospects": [_owner_org_index()],
+    "Quotes": [_owner_org_index()],
+    "Invoices": [_owner_org_index()],
+    # Users
+    "Users": [
+        IndexModel([("email", ASCENDING)], name="email_1"),
+        IndexModel([("auth0_id", ASCENDING)], name="auth0_id_1"),
+        # Multikey index serving team membership lookups
+        IndexModel([("org_memberships.org", ASCENDING)], name="org_memberships.org_1"),
+    ],
+    # Slates
+    "Assigned_Slates": [
+        IndexModel([("assignee", ASCENDING), ("status", ASCENDING)], name="assignee_1_status_1"),
+        IndexModel([("owner_org", ASCENDING), ("status", ASCENDING)], name="owner_org_1_status_1"),
+        # Project deletion cascade
+        IndexModel([("owner", ASCENDING), ("project", ASCENDING)], name="owner_1_project_1"),
+        # Offline sync: an assignee's slates changed since a token
+        IndexModel([("assignee", ASCENDING), ("last_updated", ASCENDING)], name="assignee_1_last_updated_1"),
+    ],
+    "Templates": [
+        IndexModel([("owner_org", ASCENDING), ("status", ASCENDING)], name="owner_org_1_status_1"),
+        IndexModel([("owner_org", ASCENDING), ("last_updated", ASCENDING)], name="owner_org_1_last_updated_1"),
+    ],
+    # Deleted slates and templates, kept for offline sync and expired by deleted_at
+    "Slate_Tombstones": [
+        IndexModel([("kind", ASCENDING), ("assignee", ASCENDING), ("deleted_at", ASCENDING)], name="kind_1_assignee_1_deleted_at_1"),
+        IndexModel([("kind", ASCENDING), ("owner_org", ASCENDING), ("deleted_at", ASCENDING)], name="kind_1_owner_org_1_deleted_at_1"),
+        IndexModel(
+            [("deleted_at", ASCENDING)],
+            name="deleted_at_1",
+            expireAfterSeconds=settings.SLATE_SYNC_TOMBSTONE_DAYS * 86400,
+        ),
+    ],
+    "Template_Extraction_Jobs": [
+        IndexModel([("status", ASCENDING)], name="status_1"),
+    ],
+    # Content-addressed LLM extraction results, expired by created_at
+    "LLM_Cache": [
+        IndexModel(
+            [("created_at", ASCENDING)],
+            name="created_at_1",
+            expireAfterSeconds=settings.EXTRACTION_CACHE_TTL_DAYS * 86400,
+        ),
+    ],
+    # Projects and dashboard
+    "Projects": [
+        IndexModel([("owner", ASCENDING)], name="owner_1"),
+        IndexModel([("projectId", ASCENDING)], name="projectId_1"),
+    ],
+    "OrganizationMetrics": [
+        IndexModel([("owner_org", ASCENDING), ("date", DESCENDING)], name="owner_org_1_date_-1"),
+    ],
+    # Dynamic entities
+    "entity_schemas": [
+        IndexModel([("schema_name", ASCENDING), ("company_id", ASCENDING)], name="schema_name_1_company_id_1"),
+        # Bulk registry loads ({"company_id": {"$in": [...]}})
+        IndexModel([("company_id", ASCENDING)], name="company_id_1"),
+    ],
+    "workflows": [
+        IndexModel([("company_id", ASCENDING)], name="company_id_1"),
+    ],
+    "entities": [
+        # Field-mapping upserts target the entity created from a source entity
+        IndexModel(
+            [("company_id", ASCENDING), ("workflow_id", ASCENDING), ("schema_name", ASCENDING), ("source_entity_id", ASCENDING)],
+            name="company_id_1_workflow_id_1_schema_name_1_source_entity_id_1",
+        ),
+        # Entity listing in creation order (keyset on _id)
+        IndexModel([("company_id", ASCENDING), ("schema_name", ASCENDING), ("_id", ASCENDING)], name="company_id_1_schema_name_1__id_1"),
+        # Traversal: entities linking to a frontier of ids
+        IndexModel([("company_id", ASCENDING), ("relationships.entity_id", ASCENDING)], name="company_id_1_relationships.entity_id_1"),
+        # A workflow instance's draft for a step
+        IndexModel([("company_id", ASCENDING), ("instance_id", ASCENDING), ("step_name", ASCENDING)], name="company_id_1_instance_id_1_step_name_1"),
+    ],
+    "workflow_events": [
+        # Idempotency: one event per (instance, type, key); also the per-instance log
+        IndexModel([("instance_id", ASCENDING), ("type", ASCENDING), ("key", ASCENDING)], name="instance_id_1_type_1_key_1", unique=True),
+        IndexModel([("type", ASCENDING), ("processed", ASCENDING)], name="type_1_processed_1"),
+    ],
+    # Event bus: Event_Bus_Offsets is only read by _id (the consumer group), which the default index serves.
+    # Events a consumer group gave up on, triaged per group, newest first
+    "Event_Bus_Dead_Letters": [
+        IndexModel([("group", ASCENDING), ("created_at", DESCENDING)], name="group_1_created_at_-1"),
+    ],
+}
+
+# Query shapes issued by the services, used by the slow-query audit.
+# (collection, filter, sort); the values are placeholders, only the shape matters.
+QUERY_SHAPES: List[Tuple[str, Dict[str, Any], Optional[Dict[str, int]]]] = [
+    *[(name, {"owner_org": "audit"}, None)
+      for name in ("Company_Details", "Payment_Details", "Pricing", "CRM", "Prospects", "Quotes", "Invoices")],
+    ("Users", {"email": "audit@sitesteer.ai"}, None),
+    ("Users", {"auth0_id": "audit"}, None),
+    ("Users", {"org_memberships.org": "audit"}, None),
+    ("Assigned_Slates", {"assignee": "audit@sitesteer.ai", "status": True}, None),
+    ("Assigned_Slates", {"owner_org": "audit", "status": True}, None),
+    ("Assigned_Slates", {"owner_org": "audit"}, None),
+    ("Assigned_Slates", {"owner": "audit", "project": "audit"}, None),
+    ("Templates", {"owner_org": "audit", "status": True}, None),
+    ("Assigned_Slates", {"assignee": "audit@sitesteer.ai", "last_updated": {"$gte": "audit"}}, None),
+    ("Templates", {"owner_org": "audit", "last_updated": {"$gte": "audit"}}, None),
+    ("Slate_Tombstones", {"kind": "slate", "assignee": "audit@sitesteer.ai", "deleted_at": {"$gte": "audit"}}, None),
+    ("Slate_Tombstones", {"kind": "template", "owner_org": "audit", "deleted_at": {"$gte": "audit"}}, None),
+    ("Template_Extraction_Jobs", {"status": {"$in": ["queued", "running"]}}, None),
+    ("Projects", {"owner": "audit"}, None),
+    ("Projects", {"projectId": "audit"}, None),
+    ("OrganizationMetrics", {"owner_org": "audit"}, {"date": -1}),
+    ("OrganizationMetrics", {"owner_org": "audit", "date": "audit"}, None),
+    ("entity_schemas", {"schema_name": "audit", "company_id": "audit"}, None),
+    ("entity_schemas", {"company_id": {"$in": ["audit"]}}, None),
+    ("workflows", {"company_id": {"$in": ["audit"]}}, None),
+    ("entities", {"company_id": "audit", "workflow_id": "audit", "schema_name": "audit", "source_entity_id": "audit"}, None),
+    ("entities", {"company_id": "audit", "relationships.entity_id": {"$in": ["audit"]}}, None),
+    ("entities", {"company_id": "audit", "schema_name": "audit"}, {"_id": 1}),
+    ("entities", {"company_id": "audit", "instance_id": "audit", "step_name": "audit"}, None),
+    ("workflow_events", {"instance_id": "audit", "company_id": "audit"}, {"_id": 1}),
+    ("workflow_events", {"type": "step_completed", "processed": False, "entity_id": {"$ne": None}}, None),
+    ("Event_Bus_Offsets", {"_id": "audit"}, None),
+    ("Event_Bus_Dead_Letters", {"group": "audit"}, {"created_at": -1}),
+]
+
+
+def _declared_spec(index: IndexModel) -> Dict[str, Any]:
+    document = index.document
+    spec = {"key": list(document["key"].items())}
+    for option in _COMPARED_OPTIONS:
+        if option in document:
+            spec[option] = document[option]
+    return spec
+
+
+def _existing_spec(info: Dict[str, Any]) -> Dict[str, Any]:
+    spec = {"key": [(field, direction) for field, direction in info["key"]]}
+    for option in _COMPARED_OPTIONS:
+        if option in info:
+            spec[option] = info[option]
+    return spec
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    """Flatten the stage names of an explain() winning plan"""
+    stages = [plan.get("stage", "")]
+    for child_key in ("inputStage", "queryPlan"):
+        if child_key in plan:
+            stages.extend(_plan_stages(plan[child_key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+class Index_Service:
+    def __init__(self, client: AsyncIOMotorClient):
+        self.db = client.Forms
+
+    async def index_drift(self) -> Dict[str, Dict[str, List[str]]]:
+        """
+        Compare the declared registry with the indexes that exist.
+        Returns, per collection, the index names that are missing, declared
+        differently from what exists ("changed") or not declared at all ("extra").
+        """
+        drift = {}
+        for collection_name, indexes in INDEX_REGISTRY.items():
+            existing = await self.db.get_collection(collection_name).index_information()
+            existing.pop("_id_", None)
+            declared = {index.document["name"]: _declared_spec(index) for index in indexes}
+
+            missing = [name for name in declared if name not in existing]
+            changed = [
+                name for name, spec in declared.items()
+                if name in existing and _existing_spec(existing[name]) != spec
+            ]
+            extra = [
+                name for name in existing
+                if name not in declared and not name.startswith(ENTITY_FIELD_INDEX_PREFIX)
+            ]
+            if missing or changed or extra:
+                drift[collection_name] = {"missing": missing, "changed": changed, "extra": extra}
+        return drift
+
+    async def ensure_indexes(self) -> Dict[str, List[str]]:
+        """
+        Create every missing declared index. Idempotent: existing indexes are
+        left alone, and "changed" ones are only reported, never dropped.
+        Returns the names created per collection.
+        """
+        drift = await self.index_drift()
+        created = {}
+        for collection_name, report in drift.items():
+            if report["changed"]:
+                logger.warning(f"Index drift on {collection_name}, not recreated automatically: {report['changed']}")
+            if report["extra"]:
+                logger.info(f"Undeclared indexes on {collection_name}: {report['extra']}")
+            to_create = [
+                index for index in INDEX_REGISTRY[collection_name]
+                if index.document["name"] in report["missing"]
+            ]
+            if to_create:
+                created[collection_name] = await self.db.get_collection(collection_name).create_indexes(to_create)
+                logger.info(f"Created indexes on {collection_name}: {created[collection_name]}")
+        return created
+
+    async def ensure_entity_field_indexes(self, company_id: str, schema_name: str, field_names: List[str]) -> List[str]:
+        """
+        Create the partial indexes for a schema's indexed fields. A company
+        gets at most ENTITY_MAX_FIELD_INDEXES_PER_COMPANY of them and the
+        collection at most ENTITY_MAX_FIELD_INDEXES, so user-defined schemas
+        cannot exhaust its index limit; past either, nothing is created and
+        ValueError is raised. Returns the names created.
+        """
+        entities = self.db.get_collection("entities")
+        existing = await entities.index_information()
+        field_indexes = [name for name in existing if name.startswith(ENTITY_FIELD_INDEX_PREFIX)]
+        company_prefix = f"{ENTITY_FIELD_INDEX_PREFIX}{company_id}."
+        company_indexes = sum(1 for name in field_indexes if name.startswith(company_prefix))
+        to_create = [
+            index for index in (entity_field_index(company_id, schema_name, name) for name in field_names)
+            if index.document["name"] not in existing
+        ]
+        if not to_create:
+            return []
+        if company_indexes + len(to_create) > settings.ENTITY_MAX_FIELD_INDEXES_PER_COMPANY:
+            raise ValueError(
+                f"Too many indexed fields: a company can have "
+                f"{settings.ENTITY_MAX_FIELD_INDEXES_PER_COMPANY}, {company_indexes} are in use"
+            )
+        if len(field_indexes) + len(to_create) > settings.ENTITY_MAX_FIELD_INDEXES:
+            raise ValueError("Indexed field limit reached; create the schema without indexed fields")
+        created = await entities.create_indexes(to_create)
+        logger.info(f"Created entity field indexes: {created}")
+        return created
+
+    async def audit_queries(self) -> List[Dict[str, Any]]:
+        """
+        Slow-query audit: explain() every registered query shape and report
+        the winning plan. Shapes answered by a COLLSCAN are flagged.
+        """
+        report = []
+        for collection_name, query_filter, sort in QUERY_SHAPES:
+            find = {"find": collection_name, "filter": query_filter}
+            if sort:
+                find["sort"] = sort
+            explain = await self.db.command({"explain": find, "verbosity": "queryPlanner"})
+            stages = _plan_stages(explain["queryPlanner"]["winningPlan"])
+            report.append({
+                "collection": collection_name,
+                "filter": query_filter,
+                "sort": sort,
+                "stages": stages,
+                "collection_scan": "COLLSCAN" in stages,
+            })
+        return report
+
+
+# CLI: python -m app.services.index_service [ensure|drift|audit]
+if __name__ == "__main__":
+    import asyncio
+    import json
+    import sys
+
+    async def main(command: str):
+        client = AsyncIOMotorClient(settings.MONGODB_URL)
+        try:
+            service = Index_Service(client)
+            if command == "ensure":
+                result = await service.ensure_indexes()
+            elif command == "drift":
+                result = await service.index_drift()
+            elif command == "audit":
+                result = await service.audit_queries()
+            else:
+                raise SystemExit(f"Unknown command {command!r}, expected ensure, drift or audit")
+            print(json.dumps(result, indent=2, default=str))
+        finally:
+            client.close()
+
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else "drift"))
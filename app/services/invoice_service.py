@@ -2,34 +2,41 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic import ValidationError
 from bson import ObjectId
 from fastapi import HTTPException
-from typing import List, Dict
+from typing import List, Dict, Optional
 from app.schemas.invoice import InvoiceSlateModel, InvoiceDownloadModel
 from app.schemas.collections import Invoice_Complete_Data
 from app.services.company_service import Company_Service
 from app.services.prospect_service import Prospect_Service
 from app.services.crm_service import CRM_Service
+from app.services.data_loader import OrgDataLoader
+from app.services.pricing_service import Pricing_Service
+from app.utils.model_utils import is_trusted, read_model, stamp
 from uuid import uuid4
 from datetime import datetime
 
 class Invoice_Service:
-    def __init__(self, client: AsyncIOMotorClient):
+    def __init__(self, client: AsyncIOMotorClient, loader: Optional[OrgDataLoader] = None):
         self.db = client.Forms
+        self.loader = loader or OrgDataLoader()
         self.invoice_details = self.db.get_collection("Invoices")
-        self.company_service = Company_Service(client)  # Initialize Company_Service
-        self.prospect_service = Prospect_Service(client)  # Initialize Prospect_Service
-        self.crm_service = CRM_Service(client)  # Initialize CRM_Service
+        self.company_service = Company_Service(client, self.loader)  # Initialize Company_Service
+        self.prospect_service = Prospect_Service(client, self.loader)  # Initialize Prospect_Service
+        self.crm_service = CRM_Service(client, self.loader)  # Initialize CRM_Service
+        self.pricing_service = Pricing_Service(client, self.loader)  # Initialize Pricing_Service
 
 
     # service function for returning a list of all invoices associated to an owner_org
     async def get_invoice_data(self, owner: str) -> Invoice_Complete_Data:
-        Invoices = await self.invoice_details.find_one({"owner_org": owner})
+        Invoices = await self.loader.load(self.invoice_details, owner)
         if Invoices:
-            return Invoice_Complete_Data(
+            # Invoices stamped on write were validated then; older documents are validated here
+            trusted = is_trusted(Invoices)
+            return Invoice_Complete_Data.model_construct(
                 owner_org=owner,
-                items=[InvoiceSlateModel(**item) for item in Invoices.get("items", [])]
+                items=[read_model(InvoiceSlateModel, item, trusted) for item in Invoices.get("items", [])]
             )
         else:
-            return Invoice_Complete_Data(
+            return Invoice_Complete_Data.model_construct(
                 owner_org=owner,
                 items=[]
             )
@@ -37,13 +44,13 @@ class Invoice_Service:
     # service function for returning a single invoice associated to an owner_org
     async def get_single_invoice_data(self, owner: str, invoiceId: str) -> InvoiceSlateModel:
         # Query for the document containing the owner's invoices
-        owner_invoices = await self.invoice_details.find_one({"owner_org": owner})
+        owner_invoices = await self.loader.load(self.invoice_details, owner)
         
         if owner_invoices:
             # Search for the specific invoice in the items list
             for invoice in owner_invoices.get("items", []):
                 if invoice.get("invoiceId") == invoiceId:
-                    return InvoiceSlateModel(**invoice)
+                    return read_model(InvoiceSlateModel, invoice, is_trusted(owner_invoices))
             
             # If the loop completes without finding the invoice, it doesn't exist
             raise HTTPException(status_code=404, detail=f"Quote with ID {invoiceId} not found")
@@ -55,20 +62,16 @@ class Invoice_Service:
     # function for both updating the invoice data of an existing invoice or adding a new one
     async def update_invoice_data(self, owner: str, invoices: Invoice_Complete_Data) -> Invoice_Complete_Data:
         try:
+            # The request body was validated by FastAPI; only fill in server-side fields
             invoices.owner_org = owner
-            updated_items = []
             for item in invoices.items:
                 if not item.invoiceId:
                     item.invoiceId = str(uuid4())
-                item.last_updated = datetime.timezone.utc()
-                updated_items.append(item)
+                item.last_updated = datetime.utcnow()
+            # Totals are priced here with the org's VAT rates, never taken from the client
+            await self.pricing_service.price_documents(owner, invoices.items, "invoiceTotal", "cis_reversal")
 
-            validated_data = Invoice_Complete_Data(
-                owner_org=owner,
-                items=updated_items
-            )
-
-            update_data = validated_data.model_dump()
+            update_data = stamp(invoices.model_dump())
 
             result = await self.invoice_details.replace_one(
                 {"owner_org": owner},
@@ -79,7 +82,9 @@ class Invoice_Service:
             if result.modified_count == 0 and result.upserted_id is None:
                 raise HTTPException(status_code=400, detail="Failed to update invoice details")
 
-            return validated_data
+            self.loader.invalidate(self.invoice_details, owner)
+
+            return invoices
         except ValidationError as e:
             raise HTTPException(status_code=422, detail=e.errors())
         except Exception as e:
@@ -95,6 +100,7 @@ class Invoice_Service:
 
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Invoice not found or already archived")
+        self.loader.invalidate(self.invoice_details, owner)
 
         # Fetch and return the updated document
         updated_doc = await self.invoice_details.find_one({"owner_org": owner})
@@ -132,6 +138,7 @@ class Invoice_Service:
                 raise HTTPException(status_code=404, detail="Invoice not found")
             
             deletion_results["invoices"] = result_invoices.modified_count
+            self.loader.invalidate(self.invoice_details, owner)
             return deletion_results
 
         except HTTPException:
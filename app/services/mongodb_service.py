@@ -3,6 +3,8 @@ from bson import ObjectId
 from fastapi import HTTPException
 from typing import List, Dict
 from uuid import uuid4
+from app.services.user_context_cache import user_context_cache
+from app.utils.memberships import to_memberships, PREMIUM_TIER
 
 class MongoDB_Service:
     def __init__(self, client: AsyncIOMotorClient):
@@ -38,22 +40,26 @@ class MongoDB_Service:
                     {"email": user_fields["email"]},
                     {"$set": update_fields}
                 )
+                user_context_cache.invalidate(email=user_fields["email"], auth0_id=user_fields["auth0_id"])
                 return {"message": "User updated successfully"}
 
             else:
                 org = str(uuid4())
                 # Create new user with initial organization_id
+                organization_id = [{
+                    org : PREMIUM_TIER
+                }]
                 new_user = {
                     "name": "",
                     "email": user_fields["email"],
                     "organization": org,
-                    "organization_id": [{
-                        org : "Premium User"
-                    }],
+                    "organization_id": organization_id,
+                    "org_memberships": to_memberships(organization_id),
                     "auth0_id": user_fields["auth0_id"]
                 }
                 
                 await self.platform_users.insert_one(new_user)
+                user_context_cache.invalidate(email=user_fields["email"], auth0_id=user_fields["auth0_id"])
                 return {"message": "User added successfully"}
 
         except Exception as e:
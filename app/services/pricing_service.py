@@ -0,0 +1,218 @@
+# app/services/pricing_service.py
+
+import asyncio
+from decimal import Decimal, ROUND_HALF_UP
+from itertools import accumulate
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.config import settings
+from app.schemas.pricing import DocumentTotals, OrgTotalsReport, TotalsCheck
+from app.services.data_loader import OrgDataLoader
+
+CENT = Decimal("0.01")
+HUNDRED = Decimal(100)
+
+# (line items, CIS reverse charge) for one quote or invoice
+PricedDocument = Tuple[Sequence[Any], bool]
+
+
+def to_decimal(value: Any) -> Decimal:
+    """Exact Decimal for stored numbers: floats go through str() so 0.1 stays 0.1"""
+    if isinstance(value, Decimal):
+        return value
+    if value is None or value == "":
+        return Decimal(0)
+    return Decimal(str(value))
+
+
+def _money(value: Decimal) -> Decimal:
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _get(item: Any, name: str) -> Any:
+    # Line items are LineItem models (request bodies) or dicts (trusted DB reads)
+    return item.get(name) if isinstance(item, Mapping) else getattr(item, name)
+
+
+def _category_key(name: Optional[str]) -> str:
+    return (name or "").strip().lower()
+
+
+def vat_rates_from_pricing(pricing_items: Iterable[Any]) -> Dict[str, Decimal]:
+    """Line item name -> VAT percentage, from the org's PricingItem categories"""
+    return {
+        _category_key(_get(item, "category")): to_decimal(_get(item, "vatPercentage"))
+        for item in pricing_items
+    }
+
+
+def line_totals(line_items: Sequence[Any]) -> List[Decimal]:
+    """quantity * pricePerUnit per line, rounded to the penny"""
+    return [
+        _money(to_decimal(_get(item, "quantity")) * to_decimal(_get(item, "pricePerUnit")))
+        for item in line_items
+    ]
+
+
+def compute_batch_totals(
+    documents: Sequence[PricedDocument],
+    vat_rates: Optional[Mapping[str, Decimal]] = None,
+    default_vat: Optional[Decimal] = None,
+) -> List[DocumentTotals]:
+    """
+    Totals for many documents at once.
+
+    Every line item of every document is flattened into columns (quantity,
+    price, VAT rate); line and VAT amounts are computed column-wise and summed
+    back per document through the offsets, instead of walking each document's
+    models. VAT is rounded per line, as it is printed.
+
+    A line's VAT rate is the vatPercentage of the pricing category with the
+    same name, else `default_vat`. Under the CIS domestic reverse charge the
+    VAT is reported but not payable, so the grand total is the net total.
+    """
+    vat_rates = vat_rates or {}
+    default_vat = to_decimal(settings.DEFAULT_VAT_PERCENTAGE if default_vat is None else default_vat)
+
+    items = [item for line_items, _ in documents for item in line_items]
+    offsets = [0, *accumulate(len(line_items) for line_items, _ in documents)]
+
+    quantities = [to_decimal(_get(item, "quantity")) for item in items]
+    prices = [to_decimal(_get(item, "pricePerUnit")) for item in items]
+    rates = [vat_rates.get(_category_key(_get(item, "lineItem")), default_vat) for item in items]
+
+    nets = [_money(q * p) for q, p in zip(quantities, prices)]
+    vats = [_money(net * rate / HUNDRED) for net, rate in zip(nets, rates)]
+
+    totals = []
+    for (_, reverse_charge), start, end in zip(documents, offsets, offsets[1:]):
+        net_total = sum(nets[start:end], Decimal("0.00"))
+        vat_total = sum(vats[start:end], Decimal("0.00"))
+        vat_payable = Decimal("0.00") if reverse_charge else vat_total
+        # Computed here, so construct without re-validating
+        totals.append(DocumentTotals.model_construct(
+            line_totals=nets[start:end],
+            net_total=net_total,
+            vat_total=vat_total,
+            vat_payable=vat_payable,
+            grand_total=net_total + vat_payable,
+            reverse_charge=reverse_charge,
+        ))
+    return totals
+
+
+def compute_totals(
+    line_items: Sequence[Any],
+    vat_rates: Optional[Mapping[str, Decimal]] = None,
+    reverse_charge: bool = False,
+) -> DocumentTotals:
+    """Totals for one quote or invoice"""
+    return compute_batch_totals([(line_items, reverse_charge)], vat_rates)[0]
+
+
+def stored_totals(
+    line_items: Sequence[Any],
+    vat_total: Any,
+    reverse_charge: bool = False,
+) -> DocumentTotals:
+    """Totals of a quote or invoice priced on write, rebuilt from its stored VAT total"""
+    nets = line_totals(line_items)
+    net_total = sum(nets, Decimal("0.00"))
+    vat_total = _money(to_decimal(vat_total))
+    vat_payable = Decimal("0.00") if reverse_charge else vat_total
+    return DocumentTotals.model_construct(
+        line_totals=nets,
+        net_total=net_total,
+        vat_total=vat_total,
+        vat_payable=vat_payable,
+        grand_total=net_total + vat_payable,
+        reverse_charge=reverse_charge,
+    )
+
+
+class Pricing_Service:
+    def __init__(self, client: AsyncIOMotorClient, loader: Optional[OrgDataLoader] = None):
+        self.db = client.Forms
+        self.loader = loader or OrgDataLoader()
+        self.pricing_details = self.db.get_collection("Pricing")
+        self.quote_details = self.db.get_collection("Quotes")
+        self.invoice_details = self.db.get_collection("Invoices")
+
+    async def get_vat_rates(self, owner: str) -> Dict[str, Decimal]:
+        pricing = await self.loader.load(self.pricing_details, owner)
+        return vat_rates_from_pricing(pricing.get("items", []) if pricing else [])
+
+    async def price_documents(
+        self,
+        owner: str,
+        items: Sequence[Any],
+        total_field: str,
+        reverse_charge_field: Optional[str] = None,
+    ) -> None:
+        """
+        Set the VAT and grand totals of quote or invoice items about to be
+        written, using the org's VAT rates; client-supplied totals are
+        overwritten.
+        """
+        vat_rates = await self.get_vat_rates(owner)
+        documents = [
+            (item.lineItems, bool(reverse_charge_field and getattr(item, reverse_charge_field)))
+            for item in items
+        ]
+        for item, totals in zip(items, compute_batch_totals(documents, vat_rates)):
+            # Stored as floats like the rest of the document; both are whole pennies
+            setattr(item, total_field, float(totals.grand_total))
+            item.vatTotal = float(totals.vat_total)
+
+    async def document_totals(self, owner: str, item: Any, reverse_charge: bool = False) -> DocumentTotals:
+        """Totals to print for a stored quote or invoice item"""
+        if item.vatTotal is not None:
+            return stored_totals(item.lineItems, item.vatTotal, reverse_charge)
+        # Written before totals were computed on write
+        return compute_totals(item.lineItems, await self.get_vat_rates(owner), reverse_charge)
+
+    @staticmethod
+    def _checks(items: List[Dict], totals: List[DocumentTotals], id_field: str, total_field: str) -> List[TotalsCheck]:
+        checks = []
+        for item, document_totals in zip(items, totals):
+            stored = item.get(total_field)
+            stored_total = _money(to_decimal(stored)) if stored is not None else None
+            difference = stored_total - document_totals.grand_total if stored_total is not None else None
+            checks.append(TotalsCheck(
+                id=item.get(id_field, ""),
+                companyId=item.get("companyId", ""),
+                status=item.get("status", ""),
+                stored_total=stored_total,
+                totals=document_totals,
+                difference=difference,
+                matches=difference is not None and abs(difference) <= CENT,
+            ))
+        return checks
+
+    async def totals_report(self, owner: str) -> OrgTotalsReport:
+        """
+        Recompute every quote and invoice of an org in one batch and compare
+        with the stored quoteTotal / invoiceTotal (taken as the grand total).
+        """
+        vat_rates, quotes, invoices = await asyncio.gather(
+            self.get_vat_rates(owner),
+            self.loader.load(self.quote_details, owner),
+            self.loader.load(self.invoice_details, owner),
+        )
+        quote_items = quotes.get("items", []) if quotes else []
+        invoice_items = invoices.get("items", []) if invoices else []
+
+        documents = [(item.get("lineItems") or [], False) for item in quote_items]
+        documents += [(item.get("lineItems") or [], bool(item.get("cis_reversal"))) for item in invoice_items]
+        totals = compute_batch_totals(documents, vat_rates)
+
+        quote_checks = self._checks(quote_items, totals[:len(quote_items)], "quoteId", "quoteTotal")
+        invoice_checks = self._checks(invoice_items, totals[len(quote_items):], "invoiceId", "invoiceTotal")
+        return OrgTotalsReport(
+            owner_org=owner,
+            quotes=quote_checks,
+            invoices=invoice_checks,
+            quotes_total=sum((c.totals.grand_total for c in quote_checks), Decimal("0.00")),
+            invoices_total=sum((c.totals.grand_total for c in invoice_checks), Decimal("0.00")),
+            mismatches=sum(not c.matches for c in quote_checks + invoice_checks),
+        )
@@ -6,13 +6,14 @@ from fastapi import HTTPException
 from typing import List, Dict
 from app.schemas.project import Projects
 from app.schemas.collections import ProjectsCollection
+from app.services.slates_service import Slates_Service
 import uuid
 
 class Project_Service:
     def __init__(self, client: AsyncIOMotorClient):
         self.db = client.Forms
         self.projects = self.db.get_collection("Projects")
-        self.assigned_slates = self.db.get_collection("Assigned_Slates")
+        self.slates_service = Slates_Service(client)
 
     async def create_project(self, project: Projects) -> Dict[str, str]:
         project_dict = project.model_dump(by_alias=True)
@@ -28,12 +29,10 @@ class Project_Service:
         return ProjectsCollection(user_projects=user_projects)
 
     async def delete_project(self, project_id: str, projectName: str, projectOwner: str) -> Dict[str, str]:
-        query = {"owner": projectOwner, "project": projectName}
         delete_result = await self.projects.delete_one({"_id": ObjectId(project_id)})
         if delete_result.deleted_count == 1:
-            slates2delete = await self.assigned_slates.find(query).to_list(None)
-            for slate in slates2delete:
-                await self.assigned_slates.delete_one({"_id": slate["_id"]})
+            # In the request, so the slates are gone once it returns
+            await self.slates_service.delete_assigned_slates({"owner": projectOwner, "project": projectName})
             return {"message": "Project and related slates deleted"}
         else:
             raise HTTPException(status_code=404, detail="Project not found")
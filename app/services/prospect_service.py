@@ -1,129 +1,137 @@
+import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic import ValidationError
 from bson import ObjectId
 from fastapi import HTTPException
-from typing import List, Dict
+from typing import List, Dict, Optional
 from app.schemas.crm import CustomerInfo, CustomerNamesList
 from app.schemas.prospect import Prospect, MergedProspect, ProspectsNamesList, ProspectInfo
 from app.schemas.collections import Prospect_Data, MergedProspectData
-from app.services.crm_service import CRM_Service
+from app.services.crm_service import CRM_Service, CUSTOMER_INFO_FIELDS
+from app.services.data_loader import OrgDataLoader
+from app.utils.model_utils import is_trusted, read_model, stamp
 from uuid import uuid4
 
+# Item subfields (and their defaults) needed to build a ProspectInfo
+PROSPECT_INFO_FIELDS = {
+    "projectId": "",
+    "projectName": "",
+    "site_address": "",
+}
+
+# Item subfields (and their defaults) needed to build a MergedProspect
+MERGED_PROSPECT_FIELDS = {
+    "companyId": "",
+    **PROSPECT_INFO_FIELDS,
+    "status": None,
+}
+
 class Prospect_Service:
-    def __init__(self, client: AsyncIOMotorClient):
+    def __init__(self, client: AsyncIOMotorClient, loader: Optional[OrgDataLoader] = None):
         self.db = client.Forms
+        self.loader = loader or OrgDataLoader()
         self.prospect_details = self.db.get_collection("Prospects")
         self.crm_details = self.db.get_collection("CRM")
         self.quote_details = self.db.get_collection("Quotes")
         self.invoice_details = self.db.get_collection("Invoices")
-        self.crm_service = CRM_Service(client)
+        self.crm_service = CRM_Service(client, self.loader)
 
 
     async def get_prospect_data(self, owner: str) -> Prospect_Data:
-        Prospects = await self.prospect_details.find_one({"owner_org": owner})
+        Prospects = await self.loader.load(self.prospect_details, owner)
         if Prospects:
-            return Prospect_Data(
+            # Prospects stamped on write were validated then; older documents are validated here
+            trusted = is_trusted(Prospects)
+            return Prospect_Data.model_construct(
                 owner_org=owner,
-                items=[Prospect(**item) for item in Prospects.get("items", [])]
+                items=[read_model(Prospect, item, trusted) for item in Prospects.get("items", [])]
             )
         else:
-            return Prospect_Data(
+            return Prospect_Data.model_construct(
                 owner_org=owner,
                 items=[]
             )
         
 
-    async def get_merged_prospect_data(self, owner: str) -> MergedProspectData:
-        prospects = await self.get_prospect_data(owner)
-        customers = await self.crm_service.customer_list(owner)  # Assuming you have access to crm_service
-
-        # Create lookup dictionaries
-        lookups = {
-            'customer_name': {c.companyId: c.customer_name for c in customers.customers},
-            'customer_address': {c.companyId: c.customer_address for c in customers.customers},
-            'vat_number': {c.companyId: c.vat_number for c in customers.customers},
-            'company_number': {c.companyId: c.company_number for c in customers.customers},
-            'telephone': {c.companyId: c.telephone for c in customers.customers}
-        }
+    async def _merge_prospects(
+        self,
+        owner: str,
+        exclude_statuses: Optional[List[str]] = None,
+        companyId: Optional[str] = None
+    ) -> List[MergedProspect]:
+        """
+        Merge engine behind every merged prospect read.
 
-        merged_items = [
-            MergedProspect(
-                companyId=prospect.companyId,
-                projectId=prospect.projectId,
-                projectName=prospect.projectName,
-                site_address=prospect.site_address,
-                status=prospect.status,
-                companyName=lookups['customer_name'].get(prospect.companyId, "Unknown"),
-                company_address=lookups['customer_address'].get(prospect.companyId, "Unknown"),
-                company_number=lookups['company_number'].get(prospect.companyId, "Unknown"),
-                vat_number=lookups['vat_number'].get(prospect.companyId, "Unknown"),
-                telephone=lookups['telephone'].get(prospect.companyId, "Unknown"),
+        Prospects and CRM customers are fetched concurrently as projected reads,
+        with the status / company filters applied by the database, and joined
+        through a single companyId -> customer index.
+        """
+        prospect_conditions = []
+        if exclude_statuses:
+            prospect_conditions.extend(
+                {"$ne": ["$$item.status", status]} for status in exclude_statuses
             )
-            for prospect in prospects.items
-        ]
+        customer_filter = None
+        if companyId is not None:
+            customer_filter = {"$eq": ["$$item.companyId", companyId]}
+            prospect_conditions.append(customer_filter)
+        prospect_filter = {"$and": prospect_conditions} if prospect_conditions else None
 
-        return MergedProspectData(
-            owner_org=owner,
-            items=merged_items
+        prospect_items, customer_items = await asyncio.gather(
+            self.loader.load_items(self.prospect_details, owner, MERGED_PROSPECT_FIELDS, prospect_filter),
+            self.loader.load_items(self.crm_details, owner, CUSTOMER_INFO_FIELDS, customer_filter),
         )
-    
-    async def get_active_merged_prospect_data(self, owner: str) -> MergedProspectData:
-        # Get all prospects first
-        prospects = await self.get_prospect_data(owner)
-        customers = await self.crm_service.customer_list(owner)
 
-        # Filter out archived prospects
-        active_prospects = [prospect for prospect in prospects.items if prospect.status != "Archived"]
+        customers = {customer["companyId"]: customer for customer in customer_items}
+        unknown = {field: "Unknown" for field in CUSTOMER_INFO_FIELDS}
 
-        # Create lookup dictionaries
-        lookups = {
-            'customer_name': {c.companyId: c.customer_name for c in customers.customers},
-            'customer_address': {c.companyId: c.customer_address for c in customers.customers},
-            'vat_number': {c.companyId: c.vat_number for c in customers.customers},
-            'company_number': {c.companyId: c.company_number for c in customers.customers},
-            'telephone': {c.companyId: c.telephone for c in customers.customers}
-        }
-
-        merged_items = [
-            MergedProspect(
-                companyId=prospect.companyId,
-                projectId=prospect.projectId,
-                projectName=prospect.projectName,
-                site_address=prospect.site_address,
-                status=prospect.status,
-                companyName=lookups['customer_name'].get(prospect.companyId, "Unknown"),
-                company_address=lookups['customer_address'].get(prospect.companyId, "Unknown"),
-                company_number=lookups['company_number'].get(prospect.companyId, "Unknown"),
-                vat_number=lookups['vat_number'].get(prospect.companyId, "Unknown"),
-                telephone=lookups['telephone'].get(prospect.companyId, "Unknown"),
-            )
-            for prospect in active_prospects  # Use the filtered prospects here
-        ]
+        # Projected items carry no schema marker, so the merged models are validated
+        merged_items = []
+        for prospect in prospect_items:
+            customer = customers.get(prospect["companyId"], unknown)
+            merged_items.append(MergedProspect.model_validate(dict(
+                **prospect,
+                companyName=customer["customer_name"],
+                company_address=customer["customer_address"],
+                company_number=customer["company_number"],
+                vat_number=customer["vat_number"],
+                telephone=customer["telephone"],
+            )))
+        return merged_items
 
-        return MergedProspectData(
+    async def get_merged_prospect_data(self, owner: str) -> MergedProspectData:
+        return MergedProspectData.model_construct(
+            owner_org=owner,
+            items=await self._merge_prospects(owner)
+        )
+    
+    async def get_active_merged_prospect_data(self, owner: str) -> MergedProspectData:
+        # Archived prospects are filtered out by the database
+        return MergedProspectData.model_construct(
             owner_org=owner,
-            items=merged_items
+            items=await self._merge_prospects(owner, exclude_statuses=["Archived"])
         )
 
+    # Merged prospect for a single customer, used by the quote and invoice downloads
+    async def get_merged_prospect(self, owner: str, companyId: str, projectId: Optional[str] = None) -> Optional[MergedProspect]:
+        merged_items = await self._merge_prospects(owner, companyId=companyId)
+        if not merged_items:
+            return None
+        # Prefer the prospect of the document's own project, else the customer's first one
+        return next((p for p in merged_items if p.projectId == projectId), merged_items[0])
+
     # Function to update a prospect  
     async def update_prospect_data(self, owner: str, Prospects: Prospect_Data) -> MergedProspectData:
         try:
             # Ensure the owner_org matches the one from the URL
             Prospects.owner_org = owner
 
-            # Process items and generate new IDs where needed
-            updated_items = []
+            # The request body was validated by FastAPI; only generate new IDs where needed
             for item in Prospects.items:
                 if not item.projectId:
                     item.projectId = str(uuid4())
-                updated_items.append(item)
 
-            validated_data = Prospect_Data(
-                owner_org=owner,
-                items=updated_items
-            )
-
-            update_data = validated_data.model_dump()
+            update_data = stamp(Prospects.model_dump())
 
             # Update or insert the data
             existing_entry = await self.prospect_details.find_one({"owner_org": owner})
@@ -140,7 +148,8 @@ class Prospect_Service:
                     raise HTTPException(status_code=400, detail="Failed to create prospect details")
 
             # After successful update, return merged data
-            merged_data = await self.merge_prospect_data(owner)
+            self.loader.invalidate(self.prospect_details, owner)
+            merged_data = await self.get_merged_prospect_data(owner)
             return merged_data
 
         except ValidationError as e:
@@ -151,53 +160,38 @@ class Prospect_Service:
 
     # Function returning the list of customers that have a prospect
     async def customer_list(self, owner: str) -> CustomerNamesList:
-        crm_data = await self.crm_details.find_one({"owner_org": owner})
-        prospect_data = await self.prospect_details.find_one({"owner_org": owner})
-        
-        if crm_data and prospect_data:
-            # Create a lookup dictionary for company names from CRM data
-            company_lookup = {
-                item.get("companyId", ""): item.get("name", "")
-                for item in crm_data.get("items", [])
-            }
-            
-            # Process prospect data and match with company names
-            customers = []
-            seen_company_ids = set()  # To avoid duplicates
-            for item in prospect_data.get("items", []):
-                company_id = item.get("companyId", "")
-                if company_id and company_id not in seen_company_ids:
-                    company_name = company_lookup.get(company_id, "Unknown")
-                    customers.append(CustomerInfo(companyId=company_id, name=company_name))
-                    seen_company_ids.add(company_id)
-            
-            return CustomerNamesList(
-                owner_org=owner,
-                customers=customers
-            )
-        else:
-            return CustomerNamesList(
-                owner_org=owner,
-                customers=[]
-            )
+        # Only prospect companyIds and the CustomerInfo subfields are read
+        crm_items, prospect_items = await asyncio.gather(
+            self.loader.load_items(self.crm_details, owner, CUSTOMER_INFO_FIELDS),
+            self.loader.load_items(self.prospect_details, owner, {"companyId": ""}),
+        )
+
+        # Create a lookup dictionary for customer details from CRM data
+        company_lookup = {item["companyId"]: item for item in crm_items}
+
+        # Process prospect data and match with customer details
+        customers = []
+        seen_company_ids = set()  # To avoid duplicates
+        for item in prospect_items:
+            company_id = item["companyId"]
+            if company_id and company_id not in seen_company_ids:
+                customer = company_lookup.get(company_id, {**CUSTOMER_INFO_FIELDS, "customer_name": "Unknown"})
+                customers.append(CustomerInfo.model_validate({**customer, "companyId": company_id}))
+                seen_company_ids.add(company_id)
+
+        return CustomerNamesList.model_construct(
+            owner_org=owner,
+            customers=customers
+        )
         
     # Function returning list of prospectid and name 
     async def prospect_list(self, owner: str) -> ProspectsNamesList:
-        prospect_data = await self.prospect_details.find_one({"owner_org": owner})
-        if prospect_data:
-            prospects = [
-                ProspectInfo(projectId=item.get("projectId", ""), projectName=item.get("projectName", ""), site_address=item.get("site_address", ""))
-                for item in prospect_data.get("items", [])
-            ]
-            return ProspectsNamesList(
-                owner_org=owner,
-                prospects=prospects
-            )
-        else:
-            return ProspectsNamesList(
-                owner_org=owner,
-                prospects=[]
-            )
+        # Only the ProspectInfo subfields are shaped and sent back by the server
+        items = await self.loader.load_items(self.prospect_details, owner, PROSPECT_INFO_FIELDS)
+        return ProspectsNamesList.model_construct(
+            owner_org=owner,
+            prospects=[ProspectInfo.model_validate(item) for item in items]
+        )
 
     # Function to archive a prospect   
     async def archive_prospect(self, owner: str, projectId: str) -> None:
@@ -208,6 +202,7 @@ class Prospect_Service:
 
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Prospect not found or already archived")
+        self.loader.invalidate(self.prospect_details, owner)
 
         # Fetch and return the updated document
         updated_doc = await self.prospect_details.find_one({"owner_org": owner})
@@ -247,6 +242,7 @@ class Prospect_Service:
                 raise HTTPException(status_code=404, detail="Prospect not found")
             
             deletion_results["prospects"] = result_prospects.modified_count
+            self.loader.invalidate(self.prospect_details, owner)
 
             # Delete related records from other collections
             collections = [
@@ -267,6 +263,7 @@ class Prospect_Service:
                     }
                 )
                 deletion_results[key] = result.modified_count
+                self.loader.invalidate(collection, owner)
             print('deletion_results', deletion_results)
             return deletion_results
 
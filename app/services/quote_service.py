@@ -7,30 +7,37 @@ from app.schemas.quote import QuoteSlateModel, QuoteDownloadModel
 from app.schemas.collections import Quote_Data, Quote_Complete_Data
 from app.services.prospect_service import Prospect_Service
 from app.services.crm_service import CRM_Service
+from app.services.data_loader import OrgDataLoader
+from app.services.pricing_service import Pricing_Service
+from app.utils.model_utils import is_trusted, read_model, stamp
 from uuid import uuid4
 from datetime import datetime
 from typing import Optional, List
 from enum import Enum
 
 class Quote_Service:
-    def __init__(self, client: AsyncIOMotorClient):
+    def __init__(self, client: AsyncIOMotorClient, loader: Optional[OrgDataLoader] = None):
         self.db = client.Forms
+        self.loader = loader or OrgDataLoader()
         self.quote_details = self.db.get_collection("Quotes")
         self.invoice_details = self.db.get_collection("Invoices")
-        self.prospect_service = Prospect_Service(client)  # Initialize Prospect_Service
-        self.crm_service = CRM_Service(client)  # Initialize CRM_Service
+        self.prospect_service = Prospect_Service(client, self.loader)  # Initialize Prospect_Service
+        self.crm_service = CRM_Service(client, self.loader)  # Initialize CRM_Service
+        self.pricing_service = Pricing_Service(client, self.loader)  # Initialize Pricing_Service
 
 
     # service function for returning a list of all quotes associated to an owner_org
     async def get_quote_data(self, owner: str) -> Quote_Complete_Data:
-        Quotes = await self.quote_details.find_one({"owner_org": owner})
+        Quotes = await self.loader.load(self.quote_details, owner)
         if Quotes:
-            return Quote_Complete_Data(
+            # Quotes stamped on write were validated then; older documents are validated here
+            trusted = is_trusted(Quotes)
+            return Quote_Complete_Data.model_construct(
                 owner_org=owner,
-                items=[QuoteSlateModel(**item) for item in Quotes.get("items", [])]
+                items=[read_model(QuoteSlateModel, item, trusted) for item in Quotes.get("items", [])]
             )
         else:
-            return Quote_Complete_Data(
+            return Quote_Complete_Data.model_construct(
                 owner_org=owner,
                 items=[]
             )
@@ -67,7 +74,7 @@ class Quote_Service:
             if quote.status not in exclude_statuses
         ]
 
-        return Quote_Complete_Data(
+        return Quote_Complete_Data.model_construct(
             owner_org=owner,
             items=filtered_quotes
         )
@@ -75,13 +82,13 @@ class Quote_Service:
     # service function for returning a single quote associated to an owner_org
     async def get_single_quote_data(self, owner: str, quoteId: str) -> QuoteSlateModel:
         # Query for the document containing the owner's quotes
-        owner_quotes = await self.quote_details.find_one({"owner_org": owner})
+        owner_quotes = await self.loader.load(self.quote_details, owner)
         
         if owner_quotes:
             # Search for the specific quote in the items list
             for quote in owner_quotes.get("items", []):
                 if quote.get("quoteId") == quoteId:
-                    return QuoteSlateModel(**quote)
+                    return read_model(QuoteSlateModel, quote, is_trusted(owner_quotes))
             
             # If the loop completes without finding the quote, it doesn't exist
             raise HTTPException(status_code=404, detail=f"Quote with ID {quoteId} not found")
@@ -93,20 +100,16 @@ class Quote_Service:
     # function for both updating the quote data of an existing quote or adding a new one
     async def update_quote_data(self, owner: str, quotes: Quote_Complete_Data) -> Quote_Complete_Data:
         try:
+            # The request body was validated by FastAPI; only fill in server-side fields
             quotes.owner_org = owner
-            updated_items = []
             for item in quotes.items:
                 if not item.quoteId:
                     item.quoteId = str(uuid4())
                 item.last_updated = datetime.utcnow()
-                updated_items.append(item)
+            # Totals are priced here with the org's VAT rates, never taken from the client
+            await self.pricing_service.price_documents(owner, quotes.items, "quoteTotal")
 
-            validated_data = Quote_Complete_Data(
-                owner_org=owner,
-                items=updated_items
-            )
-
-            update_data = validated_data.model_dump()
+            update_data = stamp(quotes.model_dump())
 
             result = await self.quote_details.replace_one(
                 {"owner_org": owner},
@@ -117,7 +120,9 @@ class Quote_Service:
             if result.modified_count == 0 and result.upserted_id is None:
                 raise HTTPException(status_code=400, detail="Failed to update quote details")
 
-            return validated_data
+            self.loader.invalidate(self.quote_details, owner)
+
+            return quotes
         except ValidationError as e:
             raise HTTPException(status_code=422, detail=e.errors())
         except Exception as e:
@@ -133,6 +138,7 @@ class Quote_Service:
 
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Quote not found or already archived")
+        self.loader.invalidate(self.quote_details, owner)
 
         # Fetch and return the updated document
         updated_doc = await self.quote_details.find_one({"owner_org": owner})
@@ -171,6 +177,7 @@ class Quote_Service:
                 raise HTTPException(status_code=404, detail="Quote not found")
             
             deletion_results["quotes"] = result_quotes.modified_count
+            self.loader.invalidate(self.quote_details, owner)
 
             # Delete related records from other collections
             collections = [
@@ -190,6 +197,7 @@ class Quote_Service:
                     }
                 )
                 deletion_results[key] = result.modified_count
+                self.loader.invalidate(collection, owner)
             print('deletion_results', deletion_results)
             return deletion_results
 
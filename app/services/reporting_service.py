@@ -0,0 +1,188 @@
+# app/services/reporting_service.py
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.schemas.reporting import AgingGroup, AmountGroup, ConversionGroup, ConversionReport, InvoiceReport, QuoteReport
+
+# Invoices in these statuses are not awaiting payment
+NOT_OUTSTANDING_STATUSES = ["Draft", "Paid", "Archived"]
+
+# (label, upper bound in days since issue); the last bucket is open-ended
+AGING_BUCKETS = [("0-30", 30), ("31-60", 60), ("61-90", 90)]
+AGING_OVERFLOW = "90+"
+
+MS_PER_DAY = 24 * 60 * 60 * 1000
+
+
+def _amount_groups(key_expr: Any, total_field: str) -> List[Dict]:
+    """$group on key_expr counting items and summing $items.<total_field>, largest first"""
+    return [
+        {"$group": {
+            "_id": key_expr,
+            "count": {"$sum": 1},
+            "total": {"$sum": {"$ifNull": [f"$items.{total_field}", 0]}},
+        }},
+        {"$project": {"_id": 0, "key": "$_id", "count": 1, "total": {"$round": ["$total", 2]}}},
+        {"$sort": {"total": -1, "key": 1}},
+    ]
+
+
+def _month(date_field: str) -> Dict:
+    return {"$dateToString": {"format": "%Y-%m", "date": f"$items.{date_field}"}}
+
+
+def _aging_bucket(as_of: datetime) -> Dict:
+    age_days = {"$divide": [{"$subtract": [as_of, "$items.issue_date"]}, MS_PER_DAY]}
+    return {"$switch": {
+        "branches": [{"case": {"$lte": [age_days, bound]}, "then": label} for label, bound in AGING_BUCKETS],
+        "default": AGING_OVERFLOW,
+    }}
+
+
+def _org_items(owner: str) -> List[Dict]:
+    # owner_org_1 serves the $match; every report reads a single org document
+    return [
+        {"$match": {"owner_org": owner}},
+        {"$unwind": "$items"},
+    ]
+
+
+class Reporting_Service:
+    """
+    Financial reports computed by MongoDB. Each report is one aggregation over
+    the org's document: items are $unwind-ed, then the groupings run side by
+    side in a $facet, so only the grouped rows cross the wire.
+    """
+
+    def __init__(self, client: AsyncIOMotorClient):
+        self.db = client.Forms
+        self.quote_details = self.db.get_collection("Quotes")
+        self.invoice_details = self.db.get_collection("Invoices")
+
+    @staticmethod
+    async def _facets(collection, pipeline: List[Dict]) -> Dict[str, List[Dict]]:
+        docs = await collection.aggregate(pipeline).to_list(1)
+        return docs[0] if docs else {}
+
+    async def invoice_report(self, owner: str, as_of: Optional[datetime] = None) -> InvoiceReport:
+        """Invoiced amounts by status, customer and month, and the outstanding balance by customer and age"""
+        as_of = as_of or datetime.utcnow()
+        outstanding = [
+            {"$match": {"items.status": {"$nin": NOT_OUTSTANDING_STATUSES}}},
+            {"$addFields": {"bucket": _aging_bucket(as_of)}},
+        ]
+        pipeline = _org_items(owner) + [
+            {"$facet": {
+                "by_status": _amount_groups("$items.status", "invoiceTotal"),
+                "by_customer": _amount_groups("$items.companyId", "invoiceTotal"),
+                "by_month": _amount_groups(_month("issue_date"), "invoiceTotal"),
+                "aging": outstanding + [
+                    {"$group": {
+                        "_id": {"companyId": "$items.companyId", "bucket": "$bucket"},
+                        "count": {"$sum": 1},
+                        "total": {"$sum": {"$ifNull": ["$items.invoiceTotal", 0]}},
+                    }},
+                    {"$project": {
+                        "_id": 0,
+                        "companyId": "$_id.companyId",
+                        "bucket": "$_id.bucket",
+                        "count": 1,
+                        "total": {"$round": ["$total", 2]},
+                    }},
+                    {"$sort": {"companyId": 1, "bucket": 1}},
+                ],
+                "aging_totals": outstanding + _amount_groups("$bucket", "invoiceTotal"),
+            }},
+        ]
+        facets = await self._facets(self.invoice_details, pipeline)
+        aging_totals = [AmountGroup(**group) for group in facets.get("aging_totals", [])]
+        return InvoiceReport(
+            owner_org=owner,
+            as_of=as_of,
+            by_status=facets.get("by_status", []),
+            by_customer=facets.get("by_customer", []),
+            by_month=sorted(facets.get("by_month", []), key=lambda group: group["key"] or ""),
+            outstanding_total=round(sum(group.total for group in aging_totals), 2),
+            aging=[AgingGroup(**group) for group in facets.get("aging", [])],
+            aging_totals=aging_totals,
+        )
+
+    async def quote_report(self, owner: str) -> QuoteReport:
+        """Quoted amounts by status, customer and month"""
+        pipeline = _org_items(owner) + [
+            {"$facet": {
+                "by_status": _amount_groups("$items.status", "quoteTotal"),
+                "by_customer": _amount_groups("$items.companyId", "quoteTotal"),
+                "by_month": _amount_groups(_month("issue_date"), "quoteTotal"),
+            }},
+        ]
+        facets = await self._facets(self.quote_details, pipeline)
+        return QuoteReport(
+            owner_org=owner,
+            by_status=facets.get("by_status", []),
+            by_customer=facets.get("by_customer", []),
+            by_month=sorted(facets.get("by_month", []), key=lambda group: group["key"] or ""),
+        )
+
+    async def conversion_report(self, owner: str) -> ConversionReport:
+        """
+        Share of quotes (count and value) that went on to be invoiced, overall,
+        by customer and by quote month. A quote is converted when an invoice
+        of the org carries its quoteId.
+        """
+        def conversion_groups(key_expr: Any) -> List[Dict]:
+            return [
+                {"$group": {
+                    "_id": key_expr,
+                    "quotes": {"$sum": 1},
+                    "converted": {"$sum": {"$cond": ["$converted", 1, 0]}},
+                    "quoted_total": {"$sum": {"$ifNull": ["$items.quoteTotal", 0]}},
+                    "converted_total": {"$sum": {"$cond": ["$converted", {"$ifNull": ["$items.quoteTotal", 0]}, 0]}},
+                }},
+                {"$project": {
+                    "_id": 0,
+                    "key": "$_id",
+                    "quotes": 1,
+                    "converted": 1,
+                    "quoted_total": {"$round": ["$quoted_total", 2]},
+                    "converted_total": {"$round": ["$converted_total", 2]},
+                    "conversion_rate": {"$round": [
+                        {"$cond": [{"$gt": ["$quotes", 0]}, {"$divide": ["$converted", "$quotes"]}, 0]}, 4
+                    ]},
+                }},
+                {"$sort": {"key": 1}},
+            ]
+
+        pipeline = [
+            {"$match": {"owner_org": owner}},
+            # The org's invoiced quoteIds, read once through owner_org_1 on Invoices
+            {"$lookup": {
+                "from": "Invoices",
+                "localField": "owner_org",
+                "foreignField": "owner_org",
+                "pipeline": [{"$project": {"_id": 0, "quoteIds": {"$ifNull": ["$items.quoteId", []]}}}],
+                "as": "invoices",
+            }},
+            {"$project": {
+                "items": 1,
+                "invoiced": {"$ifNull": [{"$arrayElemAt": ["$invoices.quoteIds", 0]}, []]},
+            }},
+            {"$unwind": "$items"},
+            {"$addFields": {"converted": {"$in": ["$items.quoteId", "$invoiced"]}}},
+            {"$facet": {
+                "overall": conversion_groups(None),
+                "by_customer": conversion_groups("$items.companyId"),
+                "by_month": conversion_groups(_month("issue_date")),
+            }},
+        ]
+        facets = await self._facets(self.quote_details, pipeline)
+        overall = facets.get("overall") or [{
+            "key": None, "quotes": 0, "converted": 0, "quoted_total": 0.0, "converted_total": 0.0, "conversion_rate": 0.0,
+        }]
+        return ConversionReport(
+            owner_org=owner,
+            overall=ConversionGroup(**overall[0]),
+            by_customer=facets.get("by_customer", []),
+            by_month=facets.get("by_month", []),
+        )
@@ -0,0 +1,142 @@
+# app/services/slate_stream.py
+
+import asyncio
+import itertools
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional, Set
+import orjson
+from bson import ObjectId
+from app.config import settings
+
+# Delta types pushed to clients
+ASSIGNED = "assigned"
+SUBMITTED = "submitted"
+UPDATED = "updated"
+# Sent instead of the deltas a slow client missed: it should refetch its slates
+RESYNC = "resync"
+
+# Slate fields sent to org (dashboard) subscribers; assignees get the whole slate
+SUMMARY_FIELDS = ("title", "projectId", "description", "due_date", "assigned_date", "assignee", "owner_org", "last_updated", "status")
+
+
+def assignee_topic(assignee: str) -> str:
+    return f"assignee:{assignee}"
+
+
+def org_topic(owner_org: str) -> str:
+    return f"org:{owner_org}"
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Type {type(obj).__name__} is not JSON serializable")
+
+
+def _frame(event: str, payload: Dict[str, Any], event_id: Optional[int] = None) -> bytes:
+    """One Server-Sent Events message"""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    data = orjson.dumps(payload, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    return f"{head}event: {event}\n".encode() + b"data: " + data + b"\n\n"
+
+
+class Subscription:
+    """
+    One connected client. Frames wait in a bounded queue; if the client
+    falls behind and the queue fills up, its backlog is dropped and
+    replaced by a single resync frame, so a slow connection costs a fixed
+    amount of memory and never slows down publishers.
+    """
+
+    def __init__(self, topics: Iterable[str], queue_size: int):
+        self.topics = frozenset(topics)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def offer(self, frame: bytes) -> None:
+        try:
+            self._queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.dropped += self._queue.qsize()
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(_frame(RESYNC, {"dropped": self.dropped}))
+
+    async def next(self, timeout: float) -> Optional[bytes]:
+        """Next frame, or None if nothing arrived within timeout"""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class SlateEventHub:
+    """
+    In-process fan-out of slate changes to streaming clients, by topic
+    (assignee:<email>, org:<owner_org>).
+
+    Slates_Service publishes after each write. A delta is encoded once and
+    the same bytes are queued for every subscriber of its topics, so
+    publishing is O(subscribers) with no I/O. The hub is per worker process:
+    a client only sees writes made through the worker it is connected to
+    plus whatever it refetches on resync or reconnect.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._ids = itertools.count(1)
+
+    @contextmanager
+    def subscribe(self, topics: Iterable[str]) -> Iterator[Subscription]:
+        subscription = Subscription(topics, self.queue_size)
+        for topic in subscription.topics:
+            self._subscribers.setdefault(topic, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+    def subscriber_count(self) -> int:
+        return len({subscription for subscribers in self._subscribers.values() for subscription in subscribers})
+
+    def publish(self, topics: Iterable[str], event: str, payload: Dict[str, Any]) -> int:
+        """Queue a delta for every subscriber of any of the topics; returns how many"""
+        targets = {subscription for topic in topics for subscription in self._subscribers.get(topic, ())}
+        if not targets:
+            return 0
+        frame = _frame(event, payload, next(self._ids))
+        for subscription in targets:
+            subscription.offer(frame)
+        return len(targets)
+
+    def publish_slate(self, event: str, slate: Dict[str, Any], changes: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Push a slate change: the assignee gets the slate (or just the changed
+        fields), the org gets the dashboard summary fields. A client
+        subscribed to both gets the assignee copy only. Returns the number
+        of subscribers reached.
+        """
+        body = changes if changes is not None else slate
+        slate_id = str(slate.get("_id") or slate.get("database_id"))
+        assignee_targets = set(self._subscribers.get(assignee_topic(slate.get("assignee", "")), ()))
+        org_targets = set(self._subscribers.get(org_topic(slate.get("owner_org", "")), ())) - assignee_targets
+        if assignee_targets:
+            payload = {key: value for key, value in body.items() if key != "_id"}
+            frame = _frame(event, {**payload, "database_id": slate_id}, next(self._ids))
+            for subscription in assignee_targets:
+                subscription.offer(frame)
+        if org_targets:
+            payload = {key: value for key, value in body.items() if key in SUMMARY_FIELDS}
+            frame = _frame(event, {**payload, "database_id": slate_id}, next(self._ids))
+            for subscription in org_targets:
+                subscription.offer(frame)
+        return len(assignee_targets) + len(org_targets)
+
+
+slate_hub = SlateEventHub(settings.SLATE_STREAM_QUEUE_SIZE)
@@ -1,18 +1,37 @@
 # app/services/slates_service.py
 
+import asyncio
+import base64
+import binascii
+from datetime import datetime, timedelta
 from motor.motor_asyncio import AsyncIOMotorClient
-from bson import ObjectId
+from bson import ObjectId, json_util
+from bson.errors import InvalidId
 from fastapi import HTTPException
-from typing import List, Dict
+from typing import Any, List, Dict
 from typing import Optional
-from app.schemas.slate import CreateTemplateModel, AssignSlateModel, SlateTemplateModel, SubmitSlateModel
+from app.config import settings
+from app.schemas.slate import CreateTemplateModel, AssignSlateModel, SlateTemplateModel, SubmitSlateModel, SlateSync, SlateFieldChanges, SlateSyncResult
 from app.schemas.collections import TemplateCollection, AssignedSlatesCollection
+from app.services.slate_stream import slate_hub, ASSIGNED, SUBMITTED, UPDATED
+
+# Tombstone kinds in Slate_Tombstones
+SLATE = "slate"
+TEMPLATE = "template"
+
+
+def _now() -> datetime:
+    """Server time at MongoDB's millisecond precision, so stored stamps compare equal to what clients echo back"""
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
 
 class Slates_Service:
     def __init__(self, client: AsyncIOMotorClient):
         self.db = client.Forms
         self.assigned_slates = self.db.get_collection("Assigned_Slates")
         self.templates = self.db.get_collection("Templates")
+        self.tombstones = self.db.get_collection("Slate_Tombstones")
 
     async def list_forms(self, owner_org: str, status: bool) -> TemplateCollection:
         query = {"owner_org": owner_org, "status": status}
@@ -62,25 +81,43 @@ class Slates_Service:
 
     async def create_slate(self, slate: CreateTemplateModel) -> Dict[str, str]:
         slate_dict = slate.model_dump(by_alias=True)
+        slate_dict["last_updated"] = _now()
         insert_result = await self.templates.insert_one(slate_dict)
         return {"message": "Form data submitted successfully", "id": str(insert_result.inserted_id)}
 
     async def assign_slate(self, slate: AssignSlateModel) -> Dict[str, str]:
         slate_dict = slate.model_dump(by_alias=True)
+        slate_dict["last_updated"] = _now()
         insert_result = await self.assigned_slates.insert_one(slate_dict)
+        slate_hub.publish_slate(ASSIGNED, slate_dict)
         return {"message": "Slate successfully assigned", "id": str(insert_result.inserted_id)}
 
     async def update_slate(self, form_id: str, json_data: Dict) -> Dict[str, any]:
+        slate = await self.assigned_slates.find_one(
+            {"_id": ObjectId(form_id)}, {"assignee": 1, "owner_org": 1, "data": 1}
+        )
+        if not slate:
+            raise HTTPException(status_code=404, detail="Form not found or not modified")
+        # Whole-slate submits: stamp the fields whose value changed, for offline sync merges
+        now = _now()
+        update = {**json_data, "last_updated": now}
+        if isinstance(json_data.get("data"), dict):
+            current = slate.get("data") or {}
+            for field, value in json_data["data"].items():
+                if current.get(field) != value:
+                    update[f"data_modified.{field}"] = now
         update_result = await self.assigned_slates.update_one(
             {"_id": ObjectId(form_id)},
-            {"$set": json_data}
+            {"$set": update}
         )
         if update_result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Form not found or not modified")
+        slate_hub.publish_slate(SUBMITTED if json_data.get("status") is True else UPDATED, slate, json_data)
         return {"message": "Form updated successfully", "data": json_data}
 
     async def update_slate_template(self, template_id: str, slate: CreateTemplateModel) -> Dict[str, str]:
         slate_dict = slate.model_dump(by_alias=True)
+        slate_dict["last_updated"] = _now()
         update_result = await self.templates.update_one({"_id": ObjectId(template_id)}, {"$set": slate_dict})
         if update_result.modified_count == 1:
             return {"message": "Slate template updated successfully"}
@@ -88,12 +125,29 @@ class Slates_Service:
             raise HTTPException(status_code=404, detail="Slate template not found")
 
     async def delete_slate_template(self, slate_id: str) -> Dict[str, str]:
-        delete_result = await self.templates.delete_one({"_id": ObjectId(slate_id)})
-        if delete_result.deleted_count == 1:
+        template = await self.templates.find_one_and_delete({"_id": ObjectId(slate_id)}, projection={"owner_org": 1})
+        if template:
+            await self.tombstones.insert_one(
+                {"kind": TEMPLATE, "id": slate_id, "owner_org": template.get("owner_org"), "deleted_at": _now()}
+            )
             return {"message": "Slate template deleted successfully"}
         else:
             raise HTTPException(status_code=404, detail="Slate template not found")
 
+    async def delete_assigned_slates(self, query: Dict) -> int:
+        """Delete the matching assigned slates, leaving tombstones for offline sync; returns how many"""
+        slates = await self.assigned_slates.find(query, {"assignee": 1}).to_list(None)
+        if not slates:
+            return 0
+        # Tombstones first, so offline devices learn about the deletion even if the delete is retried
+        now = _now()
+        await self.tombstones.insert_many([
+            {"kind": SLATE, "id": str(slate["_id"]), "assignee": slate.get("assignee"), "deleted_at": now}
+            for slate in slates
+        ])
+        result = await self.assigned_slates.delete_many({"_id": {"$in": [slate["_id"] for slate in slates]}})
+        return result.deleted_count
+
     async def list_org_slates(self, owner_org: str) -> AssignedSlatesCollection:
         query = {"owner_org": owner_org}
         slates = await self.assigned_slates.find(query).to_list(None)
@@ -101,4 +155,138 @@ class Slates_Service:
             slate["database_id"] = str(slate["_id"])
         return AssignedSlatesCollection(slates=slates)
 
+    # --- Offline sync ----------------------------------------------------------
+
+    @staticmethod
+    def _encode_sync_token(moment: datetime) -> str:
+        return base64.urlsafe_b64encode(json_util.dumps({"t": moment}).encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def _decode_sync_token(token: str) -> datetime:
+        try:
+            moment = json_util.loads(base64.urlsafe_b64decode(token.encode("ascii")))["t"]
+        except (ValueError, KeyError, TypeError, binascii.Error):
+            raise ValueError("Invalid sync token")
+        if not isinstance(moment, datetime):
+            raise ValueError("Invalid sync token")
+        return moment.replace(tzinfo=None)
+
+    @staticmethod
+    def _sync_doc(doc: Dict) -> Dict:
+        doc["database_id"] = str(doc.pop("_id"))
+        return doc
+
+    async def sync(self, assignee: str, owner_org: str, since: Optional[str] = None) -> SlateSync:
+        """
+        Slates assigned to `assignee` and the org's templates that changed
+        since a previous sync, plus the ids of the ones deleted since.
+
+        Changes are found by the server-stamped last_updated. Each sync reads
+        from a few seconds (SLATE_SYNC_OVERLAP_SECONDS) before the previous
+        token, so a write that committed late is not missed. The cost is
+        that a few documents may be sent twice, which clients treat as
+        upserts. Without a token, or with one older than the tombstone
+        retention, the response is a full snapshot with reset set.
+        """
+        now = _now()
+        moment = self._decode_sync_token(since) if since else None
+        reset = moment is None or moment < now - timedelta(days=settings.SLATE_SYNC_TOMBSTONE_DAYS)
+        slate_query: Dict[str, Any] = {"assignee": assignee}
+        template_query: Dict[str, Any] = {"owner_org": owner_org}
+        if not reset:
+            changed_since = moment - timedelta(seconds=settings.SLATE_SYNC_OVERLAP_SECONDS)
+            slate_query["last_updated"] = {"$gte": changed_since}
+            template_query["last_updated"] = {"$gte": changed_since}
+            tombstone_query = {"$or": [
+                {"kind": SLATE, "assignee": assignee, "deleted_at": {"$gte": changed_since}},
+                {"kind": TEMPLATE, "owner_org": owner_org, "deleted_at": {"$gte": changed_since}},
+            ]}
+
+        # Per-field stamps are server bookkeeping; devices echo last_updated as their base instead
+        reads = [
+            self.assigned_slates.find(slate_query, {"data_modified": 0}).to_list(None),
+            self.templates.find(template_query).to_list(None),
+        ]
+        if not reset:
+            reads.append(self.tombstones.find(tombstone_query, {"kind": 1, "id": 1}).to_list(None))
+        slates, templates, *deleted = await asyncio.gather(*reads)
+        tombstones = deleted[0] if deleted else []
+        return SlateSync(
+            token=self._encode_sync_token(now),
+            reset=reset,
+            slates=[self._sync_doc(doc) for doc in slates],
+            deleted_slates=[doc["id"] for doc in tombstones if doc["kind"] == SLATE],
+            templates=[self._sync_doc(doc) for doc in templates],
+            deleted_templates=[doc["id"] for doc in tombstones if doc["kind"] == TEMPLATE],
+        )
+
+    async def sync_submit(self, assignee: str, changes: List[SlateFieldChanges]) -> List[SlateSyncResult]:
+        """
+        Apply a device's queued edits: only the fields it changed, merged
+        field by field into the stored slate.
+
+        A field conflicts when another write changed it after the device's
+        base and the values differ. The server keeps its value and returns
+        it, and the device's other fields are still applied. Each slate is
+        written with a guard on the last_updated that was merged against. If
+        another write lands in between, nothing is written and the result is
+        "retry".
+        """
+        if len(changes) > settings.SLATE_SYNC_MAX_CHANGES:
+            raise ValueError(f"At most {settings.SLATE_SYNC_MAX_CHANGES} slates can be synced per request")
+        object_ids = {}
+        for change in changes:
+            try:
+                object_ids[change.database_id] = ObjectId(change.database_id)
+            except (InvalidId, TypeError):
+                pass
+            for field in change.data:
+                if not field or "." in field or field.startswith("$"):
+                    raise ValueError(f"Invalid field name: {field!r}")
+        docs = await self.assigned_slates.find(
+            {"_id": {"$in": list(object_ids.values())}, "assignee": assignee},
+            {"assignee": 1, "owner_org": 1, "status": 1, "data": 1, "data_modified": 1, "last_updated": 1},
+        ).to_list(None)
+        by_id = {str(doc["_id"]): doc for doc in docs}
+        return list(await asyncio.gather(*[self._merge(by_id.get(change.database_id), change) for change in changes]))
+
+    async def _merge(self, doc: Optional[Dict], change: SlateFieldChanges) -> SlateSyncResult:
+        if doc is None:
+            return SlateSyncResult(database_id=change.database_id, result="not_found")
+        current, stamps = doc.get("data") or {}, doc.get("data_modified") or {}
+        base = change.base.replace(tzinfo=None)
+        applied, conflicts = {}, {}
+        for field, value in change.data.items():
+            if current.get(field) == value:
+                continue
+            stamp = stamps.get(field)
+            if stamp is not None and stamp > base:
+                conflicts[field] = current.get(field)
+            else:
+                applied[field] = value
+        submit = change.status is not None and change.status != doc.get("status")
+        result = "conflict" if conflicts else "applied"
+        if not applied and not submit:
+            return SlateSyncResult(database_id=change.database_id, result=result, last_updated=doc.get("last_updated"), conflicts=conflicts)
+
+        now = _now()
+        update: Dict[str, Any] = {"last_updated": now}
+        for field, value in applied.items():
+            update[f"data.{field}"] = value
+            update[f"data_modified.{field}"] = now
+        if submit:
+            update["status"] = change.status
+        update_result = await self.assigned_slates.update_one(
+            {"_id": doc["_id"], "last_updated": doc.get("last_updated")}, {"$set": update}
+        )
+        if update_result.matched_count == 0:
+            return SlateSyncResult(database_id=change.database_id, result="retry", last_updated=doc.get("last_updated"))
+        slate_hub.publish_slate(
+            SUBMITTED if submit and change.status else UPDATED, doc,
+            {key: value for key, value in update.items() if not key.startswith("data_modified.")}
+        )
+        return SlateSyncResult(
+            database_id=change.database_id, result=result, last_updated=now, applied=list(applied), conflicts=conflicts
+        )
+
     # Add more methods as needed for other slate operations
\ No newline at end of file
@@ -1,25 +1,41 @@
+from datetime import datetime, timedelta
 from motor.motor_asyncio import AsyncIOMotorClient
 from fastapi import HTTPException
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 from typing import List, Dict, Optional
+from app.config import settings
+from app.services.user_context_cache import user_context_cache
+from app.services.user_service import User_Service
+from app.utils.memberships import to_memberships
 import logging
 import json
 
+# Marker document in "Migrations" for the org_memberships backfill
+MEMBERSHIPS_BACKFILL = "org_memberships_backfill"
+# Users the backfill still has to update
+MISSING_MEMBERSHIPS = {"org_memberships": {"$exists": False}}
+
 
 class Team_Service:
     def __init__(self, client: AsyncIOMotorClient):
         self.db = client.Forms
         self.platform_users = self.db.get_collection("Users")
+        self.migrations = self.db.get_collection("Migrations")
+        self.user_service = User_Service(client)
 
     async def list_team_users(self, owner: str):
-        org_admin = await self.platform_users.find_one({"email": owner})
+        # Cached resolution of the admin's premium key
+        org_admin = await self.user_service.get_user_context(email=owner)
         if not org_admin:
             return {"users": [], "premium_key": None}
 
-        premium_org_id = self._find_premium_org_id(org_admin["organization_id"])
+        premium_org_id = org_admin.premium_key
         if not premium_org_id:
             return {"users": [], "premium_key": None}
 
-        query = {"organization_id": {"$elemMatch": {premium_org_id: {"$exists": True}}}}
+        # Served by the multikey index on org_memberships.org
+        query = {"org_memberships.org": premium_org_id}
         users = await self.platform_users.find(query).to_list(None)
         
         for user in users:
@@ -28,13 +44,6 @@ class Team_Service:
 
         return {"users": users, "premium_key": premium_org_id}
 
-    def _find_premium_org_id(self, org_ids):
-        for org_id_dict in org_ids:
-            for key, value in org_id_dict.items():
-                if value == "Premium User":
-                    return key
-        return None
-
     def _format_org_ids(self, org_ids):
         return [
             {key: str(value[0]) if isinstance(value, list) else str(value)}
@@ -95,30 +104,35 @@ class Team_Service:
                     "email": user_fields["email"],
                     "organization": existing_user.get("organization", admin["organization"]),
                     "organization_id": organization_id,
+                    "org_memberships": to_memberships(organization_id),
                     "auth0_id": existing_user.get("auth0_id")
                 }
                 
-                # Update the user
+                # Update the user, then drop the cached context so the next read sees the write
                 await self.platform_users.update_one(
                     {"email": user_fields["email"]},
                     {"$set": update_fields}
                 )
+                user_context_cache.invalidate(email=user_fields["email"])
                 return {"message": "User updated successfully"}
 
             else:
                 
                 # Create new user with initial organization_id
+                organization_id = [{
+                    user_fields["premiumKey"]: user_fields["subscription_tier"]
+                }]
                 new_user = {
                     "name": user_fields["name"],
                     "email": user_fields["email"],
                     "organization": admin["organization"],
-                    "organization_id": [{
-                        user_fields["premiumKey"]: user_fields["subscription_tier"]
-                    }],
+                    "organization_id": organization_id,
+                    "org_memberships": to_memberships(organization_id),
                     "auth0_id": None
                 }
                 
                 await self.platform_users.insert_one(new_user)
+                user_context_cache.invalidate(email=user_fields["email"])
                 return {"message": "User added successfully"}
 
         except Exception as e:
@@ -167,13 +181,15 @@ class Team_Service:
             update_fields = {
                 "name": user_fields["name"],
                 "organization_id": organization_id,
+                "org_memberships": to_memberships(organization_id),
             }
             
-            # Update the user
+            # Update the user, then drop the cached context so the next read sees the write
             await self.platform_users.update_one(
                 {"email": user_fields["email"]},
                 {"$set": update_fields}
             )
+            user_context_cache.invalidate(email=user_fields["email"])
             return {"message": "User updated successfully"}
 
 
@@ -186,26 +202,22 @@ class Team_Service:
 
     async def remove_team_users(self, users: List[str], premiumKey: str):
         try:
-            updated_users = []
-            for email in users:
-                # Find the user by email
-                user = await self.platform_users.find_one({"email": email})
-                
-                if user:
-                    # Filter out the object that has premiumKey as its key
-                    updated_org_ids = [
-                        org for org in user.get("organization_id", [])
-                        if premiumKey not in org  # This checks if premiumKey is not a key in the dictionary
-                    ]
-                    
-                    # Update the user document with filtered organization_ids
-                    result = await self.platform_users.update_one(
-                        {"_id": user["_id"]},
-                        {"$set": {"organization_id": updated_org_ids}}
-                    )
-                    
-                    if result.modified_count > 0:
-                        updated_users.append(email)
+            # Members of the team among the requested users (indexed on email and org_memberships.org)
+            query = {"email": {"$in": users}, "org_memberships.org": premiumKey}
+            members = await self.platform_users.find(query, {"email": 1}).to_list(None)
+            updated_users = [member["email"] for member in members]
+
+            if updated_users:
+                # Remove the team entry from both membership representations in one write
+                await self.platform_users.update_many(
+                    {"_id": {"$in": [member["_id"] for member in members]}},
+                    {"$pull": {
+                        "organization_id": {premiumKey: {"$exists": True}},
+                        "org_memberships": {"org": premiumKey}
+                    }}
+                )
+                for email in updated_users:
+                    user_context_cache.invalidate(email=email)
             
             if not updated_users:
                 return {"message": "No users were found or updated"}
@@ -221,3 +233,81 @@ class Team_Service:
                 status_code=500,
                 detail=f"Error removing users from team: {str(e)}"
             )
+
+    async def _claim_migration(self, name: str) -> bool:
+        """
+        Take the lock on a migration. The marker is upserted, so a migration
+        locked by another worker fails the filter and hits the _id unique
+        index instead.
+        """
+        now = datetime.utcnow()
+        try:
+            await self.migrations.find_one_and_update(
+                {"_id": name, "$or": [{"locked_until": None}, {"locked_until": {"$lt": now}}]},
+                {"$set": {"locked_until": now + timedelta(seconds=settings.MIGRATION_LOCK_SECONDS), "started_at": now}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def backfill_memberships(self) -> Optional[int]:
+        """
+        Migration: derive org_memberships from organization_id for users that
+        do not have it yet. Runs on every startup, so users written without
+        org_memberships since the last run are picked up; when there are none
+        it is a single find_one. The "Migrations" marker is locked while a
+        worker runs it. Returns the number of users updated, or None if it is
+        running elsewhere.
+        """
+        if not await self.platform_users.find_one(MISSING_MEMBERSHIPS, {"_id": 1}):
+            return 0
+        if not await self._claim_migration(MEMBERSHIPS_BACKFILL):
+            return None
+        try:
+            updated = await self._backfill_memberships()
+        except Exception:
+            await self.migrations.update_one({"_id": MEMBERSHIPS_BACKFILL}, {"$set": {"locked_until": None}})
+            raise
+        await self.migrations.update_one(
+            {"_id": MEMBERSHIPS_BACKFILL},
+            {"$set": {"last_completed_at": datetime.utcnow(), "locked_until": None, "updated": updated}}
+        )
+        return updated
+
+    async def _backfill_memberships(self) -> int:
+        users = await self.platform_users.find(
+            MISSING_MEMBERSHIPS,
+            {"organization_id": 1}
+        ).to_list(None)
+        operations = [
+            UpdateOne(
+                {"_id": user["_id"]},
+                {"$set": {"org_memberships": to_memberships(user.get("organization_id"))}}
+            )
+            for user in users
+        ]
+        if operations:
+            await self.platform_users.bulk_write(operations, ordered=False)
+            logging.info(f"Backfilled org_memberships for {len(operations)} users")
+        return len(operations)
+
+
+# Migration CLI: python -m app.services.team_service
+if __name__ == "__main__":
+    import asyncio
+    from app.config import settings
+
+    async def main():
+        client = AsyncIOMotorClient(settings.MONGODB_URL)
+        try:
+            updated = await Team_Service(client).backfill_memberships()
+            if updated is None:
+                print("org_memberships backfill is running elsewhere")
+            else:
+                print(f"Backfilled org_memberships for {updated} users")
+        finally:
+            client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,273 @@
+# app/services/template_extraction_service.py
+
+import asyncio
+import json
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+import anthropic
+from bson import ObjectId
+from fastapi import HTTPException, UploadFile
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from app.config import settings
+from app.schemas.slate import CreateTemplateModel, FormField, TableColumn, TemplateExtractionJob
+from app.services.extraction_cache import ExtractionCache
+from app.services.slates_service import Slates_Service
+from app.utils.agent import Document, ExtractionPipeline, TEMPLATE_EXTRACTION_STEPS, starting_input
+from app.utils.file_handler import spaces_client
+from app.utils.validate_form import FormStructure, form_schema_error
+
+logger = logging.getLogger(__name__)
+
+# formStructure element types -> slate field types / column data types
+ELEMENT_FIELD_TYPES = {
+    "table": "table",
+    "text": "text",
+    "date": "date",
+    "signature": "signature",
+    "integer": "number",
+    "float": "number",
+    "checkbox": "checkbox",
+}
+
+
+def _field_name(label: str, index: int) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "_", label.lower()).strip("_")
+    return f"{slug or 'field'}_{index}"
+
+
+def form_structure_to_template(form: FormStructure, owner_org: str) -> CreateTemplateModel:
+    """Convert a validated formStructure into an (inactive) slate template"""
+    fields = []
+    data = {}
+    for form_field in form.formFields:
+        label = form_field.name or f"Field {form_field.form_index}"
+        name = _field_name(label, form_field.form_index)
+        field_type = ELEMENT_FIELD_TYPES[form_field.elementType]
+        columns = None
+        if form_field.elementType == "table":
+            columns = [
+                TableColumn(
+                    name=_field_name(column.name, i),
+                    label=column.name,
+                    dataType=ELEMENT_FIELD_TYPES[column.elementType],
+                )
+                for i, column in enumerate(form_field.columns or [], 1)
+            ]
+        fields.append(FormField(name=name, field_type=field_type, label=label, columns=columns))
+        data[name] = [] if field_type in ("table", "checkbox") else ""
+
+    return CreateTemplateModel(
+        title=form.header.mainTitle.name,
+        description=form.header.subTitles.name or "",
+        owner_org=owner_org,
+        last_updated=datetime.utcnow(),
+        # Extracted templates stay inactive until reviewed in the slate builder
+        status=False,
+        fields=fields,
+        data=data,
+    )
+
+
+def parse_form_structure(text: str) -> Dict:
+    """
+    Parse the model's reply, tolerating code fences or text around the JSON
+    object and raw line breaks inside strings (multi-line subtitles).
+    """
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        raise ValueError("No JSON object in the extraction result")
+    return json.loads(text[start:end + 1], strict=False)
+
+
+class Template_Extraction_Service:
+    def __init__(self, client: AsyncIOMotorClient):
+        self.db = client.Forms
+        self.jobs = self.db.get_collection("Template_Extraction_Jobs")
+        self.slates_service = Slates_Service(client)
+
+    @staticmethod
+    def _to_job(doc: Dict) -> TemplateExtractionJob:
+        return TemplateExtractionJob(job_id=str(doc["_id"]), **{k: v for k, v in doc.items() if k not in ("_id", "storage_key")})
+
+    async def create_job(self, owner_org: str, upload: UploadFile) -> TemplateExtractionJob:
+        """Stream the uploaded PDF into storage and record a queued job"""
+        if upload.content_type not in ("application/pdf", "application/octet-stream"):
+            raise HTTPException(status_code=415, detail="Only PDF forms can be extracted")
+
+        job_id = ObjectId()
+        storage_key = f"template-extractions/{owner_org}/{job_id}.pdf"
+        try:
+            # upload_fileobj reads the spooled upload in chunks (multipart for large files)
+            await asyncio.to_thread(
+                spaces_client.upload_fileobj,
+                upload.file,
+                settings.DO_SPACE_NAME,
+                storage_key,
+                ExtraArgs={"ACL": "private", "ContentType": "application/pdf"},
+            )
+        except Exception as e:
+            logger.error(f"Error storing upload {upload.filename}: {str(e)}")
+            raise HTTPException(status_code=502, detail="Failed to store the uploaded form")
+
+        now = datetime.utcnow()
+        doc = {
+            "_id": job_id,
+            "owner_org": owner_org,
+            "file_name": upload.filename or "form.pdf",
+            "storage_key": storage_key,
+            "status": "queued",
+            "template_id": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        await self.jobs.insert_one(doc)
+        return self._to_job(doc)
+
+    async def get_job(self, owner_org: str, job_id: str) -> TemplateExtractionJob:
+        try:
+            object_id = ObjectId(job_id)
+        except Exception:
+            raise HTTPException(status_code=404, detail="Extraction job not found")
+        doc = await self.jobs.find_one({"_id": object_id, "owner_org": owner_org})
+        if not doc:
+            raise HTTPException(status_code=404, detail="Extraction job not found")
+        return self._to_job(doc)
+
+    async def queued_job_ids(self) -> List[str]:
+        """
+        Jobs waiting to run. Running jobs whose claim is older than
+        TEMPLATE_EXTRACTION_LEASE_SECONDS belonged to a worker that died and
+        are put back in the queue; newer ones may still be running elsewhere.
+        """
+        now = datetime.utcnow()
+        expired = now - timedelta(seconds=settings.TEMPLATE_EXTRACTION_LEASE_SECONDS)
+        await self.jobs.update_many(
+            {"status": "running", "$or": [{"claimed_at": {"$lt": expired}}, {"claimed_at": None}]},
+            {"$set": {"status": "queued", "claimed_at": None, "updated_at": now}}
+        )
+        docs = await self.jobs.find({"status": "queued"}, {"_id": 1}).to_list(None)
+        return [str(doc["_id"]) for doc in docs]
+
+    async def _claim(self, job_id: ObjectId) -> Optional[Dict]:
+        """Move a queued job to running; None if another worker got it first"""
+        now = datetime.utcnow()
+        return await self.jobs.find_one_and_update(
+            {"_id": job_id, "status": "queued"},
+            {"$set": {"status": "running", "claimed_at": now, "updated_at": now}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _set_status(self, job_id: ObjectId, claimed_at: datetime, status: str, **fields) -> None:
+        # Only the worker holding the claim records the outcome
+        await self.jobs.update_one(
+            {"_id": job_id, "status": "running", "claimed_at": claimed_at},
+            {"$set": {"status": status, "updated_at": datetime.utcnow(), **fields}}
+        )
+
+    async def run_job(self, job_id: str, pipeline: ExtractionPipeline) -> None:
+        """Extract, validate and save the template for one job; failures are recorded on the job"""
+        object_id = ObjectId(job_id)
+        doc = await self._claim(object_id)
+        if not doc:
+            return
+        claimed_at = doc["claimed_at"]
+        try:
+            content = await asyncio.to_thread(self._read_upload, doc["storage_key"])
+            document = Document.from_bytes(content, doc["file_name"])
+            result = await pipeline.chain(starting_input, TEMPLATE_EXTRACTION_STEPS, document)
+
+            schema = parse_form_structure(result)
+            error = form_schema_error(schema)
+            if error is not None:
+                raise ValueError(f"Extracted form structure failed validation: {error}")
+            template = form_structure_to_template(
+                FormStructure.model_validate(schema["formStructure"]), doc["owner_org"]
+            )
+            created = await self.slates_service.create_slate(template)
+            await self._set_status(object_id, claimed_at, "succeeded", template_id=created["id"])
+        except Exception as e:
+            logger.error(f"Template extraction job {job_id} failed: {str(e)}")
+            await self._set_status(object_id, claimed_at, "failed", error=str(e))
+
+    @staticmethod
+    def _read_upload(storage_key: str) -> bytes:
+        file_obj = spaces_client.get_object(Bucket=settings.DO_SPACE_NAME, Key=storage_key)
+        return file_obj["Body"].read()
+
+
+class TemplateExtractionWorker:
+    """
+    In-process background worker for template extraction jobs.
+
+    Job ids are queued by the upload endpoint and processed by `concurrency`
+    tasks with their own MongoDB client, so uploads return immediately. Job
+    state lives in MongoDB and each job is claimed atomically before it runs,
+    so several processes can share the queue. Jobs whose worker died are
+    re-queued on start() once their claim has expired.
+    """
+
+    def __init__(self, concurrency: int = 2):
+        self.concurrency = concurrency
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._client: Optional[AsyncIOMotorClient] = None
+        self._owns_client = False
+        self._pipeline: Optional[ExtractionPipeline] = None
+        self.cache: Optional[ExtractionCache] = None
+
+    async def start(self, client: Optional[AsyncIOMotorClient] = None, pipeline: Optional[ExtractionPipeline] = None) -> None:
+        self._owns_client = client is None
+        self._client = client or AsyncIOMotorClient(settings.MONGODB_URL)
+        self.cache = ExtractionCache(
+            self._client.Forms.get_collection("LLM_Cache"), settings.EXTRACTION_CACHE_MEMORY_ENTRIES
+        )
+        self._pipeline = pipeline or ExtractionPipeline(
+            anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY, max_retries=0),
+            cache=self.cache,
+        )
+        self._queue = asyncio.Queue()
+        for job_id in await Template_Extraction_Service(self._client).queued_job_ids():
+            self._queue.put_nowait(job_id)
+        for _ in range(self.concurrency):
+            self._tasks.add(asyncio.create_task(self._work()))
+
+    def cache_stats(self) -> Dict[str, float]:
+        if self.cache is None:
+            raise HTTPException(status_code=503, detail="Template extraction is not available")
+        return self.cache.stats()
+
+    def submit(self, job_id: str) -> None:
+        if self._queue is None:
+            raise HTTPException(status_code=503, detail="Template extraction is not available")
+        self._queue.put_nowait(job_id)
+
+    async def join(self) -> None:
+        """Wait until every queued job has been processed"""
+        await self._queue.join()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._queue = None
+        if self._owns_client:
+            self._client.close()
+
+    async def _work(self) -> None:
+        service = Template_Extraction_Service(self._client)
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await service.run_job(job_id, self._pipeline)
+            except Exception as e:
+                logger.error(f"Error running template extraction job {job_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+
+extraction_worker = TemplateExtractionWorker(settings.TEMPLATE_EXTRACTION_WORKERS)
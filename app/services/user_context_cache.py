@@ -0,0 +1,74 @@
+# app/services/user_context_cache.py
+
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from app.config import settings
+from app.schemas.user import UserContext
+
+
+class UserContextCache:
+    """
+    In-memory TTL cache of resolved user contexts, indexed by email and auth0_id.
+
+    The cache is per worker process: writes that change a user's memberships
+    invalidate it explicitly once they have committed, and the TTL bounds
+    staleness for writes made through other workers. At most `max_entries`
+    contexts are kept; expired entries are swept when the cache is full,
+    then the least recently used ones are evicted.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._by_email: "OrderedDict[str, Tuple[float, UserContext]]" = OrderedDict()
+        self._email_by_auth0_id: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_email)
+
+    def get(self, email: Optional[str] = None, auth0_id: Optional[str] = None) -> Optional[UserContext]:
+        if email is None and auth0_id is not None:
+            email = self._email_by_auth0_id.get(auth0_id)
+        if email is None:
+            return None
+        entry = self._by_email.get(email)
+        if entry is None:
+            return None
+        expires_at, context = entry
+        if expires_at < time.monotonic():
+            self.invalidate(email=email)
+            return None
+        self._by_email.move_to_end(email)
+        return context
+
+    def put(self, context: UserContext) -> None:
+        self.invalidate(email=context.email)
+        if len(self._by_email) >= self.max_entries:
+            self._evict()
+        self._by_email[context.email] = (time.monotonic() + self.ttl_seconds, context)
+        if context.auth0_id:
+            self._email_by_auth0_id[context.auth0_id] = context.email
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for email in [email for email, (expires_at, _) in self._by_email.items() if expires_at < now]:
+            self.invalidate(email=email)
+        while len(self._by_email) >= self.max_entries:
+            email = next(iter(self._by_email))
+            self.invalidate(email=email)
+
+    def invalidate(self, email: Optional[str] = None, auth0_id: Optional[str] = None) -> None:
+        if auth0_id is not None:
+            email = self._email_by_auth0_id.pop(auth0_id, None) or email
+        if email is not None:
+            entry = self._by_email.pop(email, None)
+            if entry and entry[1].auth0_id:
+                self._email_by_auth0_id.pop(entry[1].auth0_id, None)
+
+    def clear(self) -> None:
+        self._by_email.clear()
+        self._email_by_auth0_id.clear()
+
+
+user_context_cache = UserContextCache(settings.USER_CONTEXT_TTL_SECONDS, settings.USER_CONTEXT_CACHE_MAX_ENTRIES)
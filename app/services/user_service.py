@@ -3,10 +3,12 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
 from fastapi import HTTPException
 from typing import List, Dict, Optional
-from app.schemas.user import PlatformUsers, UserData
+from app.schemas.user import PlatformUsers, UserData, UserContext
 from app.schemas.early_bird import EarlyBird
 from app.schemas.collections import UsersCollection
 from uuid import uuid4
+from app.services.user_context_cache import user_context_cache
+from app.utils.memberships import to_memberships, find_premium_org, PREMIUM_TIER
 
 class User_Service:
     def __init__(self, client: AsyncIOMotorClient):
@@ -21,20 +23,40 @@ class User_Service:
         return None
 
 
+    async def get_user_context(self, email: Optional[str] = None, auth0_id: Optional[str] = None) -> Optional[UserContext]:
+        """Resolve a user's memberships, premium key and org, cached by email and auth0_id"""
+        context = user_context_cache.get(email=email, auth0_id=auth0_id)
+        if context:
+            return context
+
+        query = {"email": email} if email is not None else {"auth0_id": auth0_id}
+        user = await self.platform_users.find_one(
+            query,
+            {"email": 1, "auth0_id": 1, "organization_id": 1, "org_memberships": 1}
+        )
+        if not user:
+            return None
+
+        memberships = user.get("org_memberships")
+        if memberships is None:
+            memberships = to_memberships(user.get("organization_id"))
+        premium_key = find_premium_org(memberships)
+        resolved = next((m for m in memberships if m["org"] == premium_key), memberships[0] if memberships else None)
+        context = UserContext(
+            email=user["email"],
+            auth0_id=user.get("auth0_id"),
+            memberships=memberships,
+            premium_key=premium_key,
+            org=resolved["org"] if resolved else None,
+            tier=resolved["tier"] if resolved else None,
+        )
+        user_context_cache.put(context)
+        return context
+
     async def get_user_data(self, email: str) -> UserData:
-        user = await self.platform_users.find_one({"email": email})
-        if user:
-            user_org_ids = user["organization_id"]
-            premium_org_id = None
-            for org_id_dict in user_org_ids:
-                for key, value in org_id_dict.items():
-                    if value == "Premium User":
-                        premium_org_id = key
-                        break
-                if premium_org_id:
-                    break
-            if premium_org_id:
-                return UserData(is_premium_user=True, premium_key=premium_org_id)
+        context = await self.get_user_context(email=email)
+        if context and context.premium_key:
+            return UserData(is_premium_user=True, premium_key=context.premium_key)
         return UserData(is_premium_user=False)
 
 
@@ -50,27 +72,32 @@ class User_Service:
             user["organization"] = user_profile.organization
             user["email"] = user_profile.email
             await self.platform_users.replace_one({"auth0_id": user_profile.auth0_id}, user)
+            user_context_cache.invalidate(email=user_profile.email, auth0_id=user_profile.auth0_id)
             return {"message": "User profile updated successfully"}
         else:
             new_user = {
                 "name": user_profile.name,
                 "organization": user_profile.organization,
                 "email": user_profile.email,
-                "auth0_id": user_profile.auth0_id
+                "auth0_id": user_profile.auth0_id,
+                "org_memberships": []
             }
             await self.platform_users.insert_one(new_user)
             return {"message": "User profile created successfully"}
 
     async def register_user(self, user_profile: Dict) -> Dict[str, str]:
+        organization_id = [ {str(uuid4()) : PREMIUM_TIER} ]
         new_user = {
             "email": user_profile["email"],
             "auth0_id": user_profile["auth0_id"],
             'database_id': None,
             "name": None,
             "organization": None,
-            "organization_id": [ {str(uuid4()) : "Premium User"} ],
+            "organization_id": organization_id,
+            "org_memberships": to_memberships(organization_id),
         }
         await self.platform_users.insert_one(new_user)
+        user_context_cache.invalidate(email=new_user["email"], auth0_id=new_user["auth0_id"])
         return {"message": "User registered successfully"}
 
     async def login_user(self) -> Dict[str, str]:
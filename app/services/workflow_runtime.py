@@ -0,0 +1,376 @@
+# app/services/workflow_runtime.py
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+from bson import ObjectId
+from bson.errors import InvalidId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.config import settings
+from app.services.dynamic_entity_service import DynamicEntityService
+
+logger = logging.getLogger(__name__)
+
+# Step states of a workflow instance
+PENDING = "pending"
+ACTIVE = "active"
+COMPLETED = "completed"
+
+# Event types in the workflow event log
+INSTANCE_STARTED = "instance_started"
+STEP_COMPLETED = "step_completed"
+
+
+class WorkflowRuntimeService:
+    """
+    Runs instances of a WorkflowDefinition.
+
+    An instance ("workflow_instances") tracks the state of every step:
+    pending -> active -> completed. The initial step starts active;
+    completing a step activates all of its next_steps, and the instance is
+    completed once no step is active.
+
+    Every transition is recorded in "workflow_events", which is unique on
+    (instance_id, type, key). Completing a step twice, e.g. a client retry,
+    hits that constraint and returns the first result. Instance updates are
+    conditional on the state they move from, so a completion that stopped
+    halfway is finished by the retry, the worker or replay(); one that
+    stopped before recording its entity is discarded after
+    WORKFLOW_COMPLETION_LEASE_SECONDS and the step can be completed again.
+    Field-mapping
+    propagation is not done in the request: the step_completed event is
+    handed to the workflow worker, which fans out to the next steps
+    concurrently and marks the event processed. Steps that are already
+    completed are not written to. Unprocessed events are picked up again on
+    restart, and replay() re-applies a whole instance.
+    """
+
+    def __init__(self, client: AsyncIOMotorClient):
+        self.db = client.Forms
+        self.instances = self.db.workflow_instances
+        self.events = self.db.workflow_events
+        self.entity_service = DynamicEntityService(client)
+        self.registry = self.entity_service.registry
+
+    @staticmethod
+    def _object_id(instance_id: str) -> ObjectId:
+        try:
+            return ObjectId(instance_id)
+        except (InvalidId, TypeError):
+            raise ValueError(f"Invalid workflow instance id: {instance_id}")
+
+    @staticmethod
+    def _to_instance(doc: Dict) -> Dict:
+        return {"id": str(doc["_id"]), **doc}
+
+    async def _record(self, instance_id: ObjectId, company_id: str, event_type: str, key: str, **fields) -> Dict:
+        """Append an event; raises DuplicateKeyError if (instance, type, key) was recorded before"""
+        event = {
+            "instance_id": instance_id,
+            "company_id": company_id,
+            "type": event_type,
+            "key": key,
+            "processed": False,
+            "created_at": datetime.now(),
+            **fields,
+        }
+        await self.events.insert_one(event)
+        return event
+
+    async def start_instance(self, company_id: str, workflow_id: str) -> Dict:
+        registry = await self.registry.get(self.db, company_id, workflows=[workflow_id])
+        workflow = registry.workflow(workflow_id)
+        if not workflow:
+            raise ValueError("Workflow not found")
+
+        now = datetime.now()
+        instance = {
+            "company_id": company_id,
+            "workflow_id": workflow_id,
+            "status": ACTIVE,
+            "steps": {
+                name: {
+                    "status": ACTIVE if name == workflow["initial_step"] else PENDING,
+                    "entity_id": None,
+                    "completed_at": None,
+                }
+                for name in workflow["steps"]
+            },
+            "created_at": now,
+            "updated_at": now,
+        }
+        await self.instances.insert_one(instance)
+        await self._record(instance["_id"], company_id, INSTANCE_STARTED, workflow_id, processed=True)
+        return self._to_instance(instance)
+
+    async def get_instance(self, company_id: str, instance_id: str) -> Optional[Dict]:
+        doc = await self.instances.find_one({"_id": self._object_id(instance_id), "company_id": company_id})
+        return self._to_instance(doc) if doc else None
+
+    async def list_events(self, company_id: str, instance_id: str) -> List[Dict]:
+        """The instance's event log, oldest first"""
+        docs = await self.events.find(
+            {"instance_id": self._object_id(instance_id), "company_id": company_id}
+        ).sort("_id", 1).to_list(None)
+        return [{"id": str(doc["_id"]), **doc} for doc in docs]
+
+    async def complete_step(
+        self,
+        company_id: str,
+        instance_id: str,
+        step_name: str,
+        data: Dict[str, Any],
+        relationships: Optional[Dict[str, List[str]]] = None
+    ) -> Dict:
+        """
+        Create (or complete the draft of) the step's entity and advance the
+        instance. Returns {"instance", "entity", "event_id", "duplicate"};
+        the caller submits event_id to the workflow worker.
+        """
+        instance = await self.get_instance(company_id, instance_id)
+        if not instance:
+            raise ValueError("Workflow instance not found")
+        state = instance["steps"].get(step_name)
+        if state is None:
+            raise ValueError(f"Step {step_name} not found in workflow")
+
+        if state["status"] == COMPLETED:
+            return await self._first_completion(instance, step_name)
+        if state["status"] != ACTIVE:
+            raise ValueError(f"Step {step_name} is not active")
+
+        try:
+            event = await self._record(
+                instance["_id"], company_id, STEP_COMPLETED, step_name,
+                step_name=step_name, entity_id=None, data=data, relationships=relationships or {},
+            )
+        except DuplicateKeyError:
+            # A concurrent request got there first, or an earlier one stopped before creating the entity
+            if await self._discard_stale_completion(instance["_id"], step_name):
+                return await self.complete_step(company_id, instance_id, step_name, data, relationships)
+            return await self._first_completion(instance, step_name)
+
+        try:
+            entity = await self.entity_service.create_entity(
+                company_id, instance["workflow_id"], step_name, data, relationships,
+                instance_id=instance["id"], propagate=False
+            )
+        except Exception:
+            # Leave no trace so the step can be retried with corrected data
+            await self.events.delete_one({"_id": event["_id"]})
+            raise
+        await self.events.update_one({"_id": event["_id"]}, {"$set": {"entity_id": entity["id"]}})
+
+        instance = await self._advance(instance, step_name, entity["id"])
+        return {"instance": instance, "entity": entity, "event_id": str(event["_id"]), "duplicate": False}
+
+    async def _first_completion(self, instance: Dict, step_name: str) -> Dict:
+        """Result of a repeated completion: the entity recorded by the first one"""
+        event = await self.events.find_one({"instance_id": instance["_id"], "type": STEP_COMPLETED, "key": step_name})
+        if not event or not event.get("entity_id"):
+            raise ValueError(f"Step {step_name} is already being completed")
+        # The first completion may have stopped before advancing the instance
+        instance = await self._advance(instance, step_name, event["entity_id"])
+        return {
+            "instance": instance,
+            "entity": await self.entity_service.get_entity(instance["company_id"], event["entity_id"]),
+            "event_id": str(event["_id"]),
+            "duplicate": True,
+        }
+
+    async def _discard_stale_completion(self, instance_id: ObjectId, step_name: str) -> bool:
+        """
+        Delete the step's completion event if it never recorded an entity
+        within WORKFLOW_COMPLETION_LEASE_SECONDS (the request died). Completing
+        the step again merges into the entity it may have written.
+        """
+        expired = datetime.now() - timedelta(seconds=settings.WORKFLOW_COMPLETION_LEASE_SECONDS)
+        result = await self.events.delete_one({
+            "instance_id": instance_id,
+            "type": STEP_COMPLETED,
+            "key": step_name,
+            "entity_id": None,
+            "created_at": {"$lt": expired},
+        })
+        return result.deleted_count == 1
+
+    async def _transition(self, instance_id: ObjectId, expected: Dict, update: Dict) -> Dict:
+        """Apply update if the instance is still in the expected state; the current document either way"""
+        doc = await self.instances.find_one_and_update(
+            {"_id": instance_id, **expected}, {"$set": update}, return_document=ReturnDocument.AFTER
+        )
+        return doc or await self.instances.find_one({"_id": instance_id})
+
+    async def _advance(self, instance: Dict, step_name: str, entity_id: str) -> Dict:
+        """
+        Complete the step, activate its pending next steps, then complete the
+        instance once nothing is left to do. Each write only applies to the
+        state it moves from, so running this again after a partial failure,
+        or concurrently, finishes the transition without undoing anything.
+        """
+        registry = await self.registry.get(self.db, instance["company_id"], workflows=[instance["workflow_id"]])
+        workflow = registry.workflow(instance["workflow_id"])
+        now = datetime.now()
+        doc = instance
+        if doc["steps"][step_name]["status"] != COMPLETED:
+            doc = await self._transition(instance["_id"], {f"steps.{step_name}.status": ACTIVE}, {
+                f"steps.{step_name}.status": COMPLETED,
+                f"steps.{step_name}.entity_id": entity_id,
+                f"steps.{step_name}.completed_at": now,
+                "updated_at": now,
+            })
+        for next_step in workflow["steps"][step_name]["next_steps"]:
+            if doc["steps"].get(next_step, {}).get("status") == PENDING:
+                doc = await self._transition(
+                    instance["_id"],
+                    {f"steps.{step_name}.status": COMPLETED, f"steps.{next_step}.status": PENDING},
+                    {f"steps.{next_step}.status": ACTIVE, "updated_at": now},
+                )
+
+        if doc["status"] != COMPLETED and all(step["status"] != ACTIVE for step in doc["steps"].values()):
+            # Not while a completed step's next steps are still to be activated
+            expected: Dict[str, Any] = {"status": ACTIVE}
+            expected.update({f"steps.{name}.status": {"$ne": ACTIVE} for name in doc["steps"]})
+            unactivated = [
+                {f"steps.{name}.status": COMPLETED, f"steps.{next_step}.status": PENDING}
+                for name, step in workflow["steps"].items() if name in doc["steps"]
+                for next_step in step["next_steps"] if next_step in doc["steps"]
+            ]
+            if unactivated:
+                expected["$nor"] = unactivated
+            doc = await self._transition(instance["_id"], expected, {"status": COMPLETED, "updated_at": now})
+        return self._to_instance(doc)
+
+    async def process_event(self, event_id: str) -> int:
+        """
+        Propagate a step_completed event's field mappings, one concurrent
+        bulk write per target schema (i.e. per next step). Safe to run more
+        than once. Returns the number of target entities written.
+        """
+        event = await self.events.find_one({"_id": ObjectId(event_id)})
+        if not event or event["type"] != STEP_COMPLETED or not event.get("entity_id"):
+            return 0
+        # Finish the transition if the completing request stopped before advancing the instance
+        instance = await self.instances.find_one({"_id": event["instance_id"]})
+        if instance and event["step_name"] in instance["steps"]:
+            await self._advance(instance, event["step_name"], event["entity_id"])
+        written = await self._propagate(event)
+        await self.events.update_one(
+            {"_id": event["_id"]},
+            {"$set": {"processed": True, "processed_at": datetime.now(), "written": written}}
+        )
+        return written
+
+    async def _propagate(self, event: Dict) -> int:
+        company_id = event["company_id"]
+        instance = await self.instances.find_one({"_id": event["instance_id"]}, {"workflow_id": 1, "steps": 1})
+        registry = await self.registry.get(self.db, company_id, workflows=[instance["workflow_id"]] if instance else ())
+        workflow = registry.workflow(instance["workflow_id"]) if instance else None
+        entity = await self.entity_service.get_entity(company_id, event["entity_id"])
+        if not workflow or not entity:
+            return 0
+
+        # Steps already completed keep the values they were submitted with
+        completed_schemas = {
+            workflow["steps"][name]["schema_name"]
+            for name, state in instance["steps"].items()
+            if state["status"] == COMPLETED and name in workflow["steps"]
+        }
+        target_schemas = {
+            mapping["target_schema"]
+            for mapping in workflow["steps"][event["step_name"]]["field_mappings"]
+        } - completed_schemas
+        written = await asyncio.gather(*[
+            self.entity_service.propagate_mapped_fields(
+                company_id, workflow, event["step_name"], [entity], target_schemas=[schema_name]
+            )
+            for schema_name in target_schemas
+        ])
+        return sum(written)
+
+    async def replay(self, company_id: str, instance_id: str) -> int:
+        """
+        Re-apply every completed step's transition and propagation in order,
+        e.g. to rebuild the drafts of open steps or recover from a crash;
+        returns the events replayed. Completions that never recorded their
+        entity are discarded once stale.
+        """
+        events = []
+        for event in await self.list_events(company_id, instance_id):
+            if event["type"] != STEP_COMPLETED:
+                continue
+            if event.get("entity_id"):
+                events.append(event)
+            else:
+                await self._discard_stale_completion(event["instance_id"], event["step_name"])
+        for event in events:
+            await self.process_event(event["id"])
+        return len(events)
+
+    async def unprocessed_event_ids(self) -> List[str]:
+        """Step completions whose propagation had not run when the process stopped"""
+        docs = await self.events.find(
+            {"type": STEP_COMPLETED, "processed": False, "entity_id": {"$ne": None}}, {"_id": 1}
+        ).to_list(None)
+        return [str(doc["_id"]) for doc in docs]
+
+
+class WorkflowWorker:
+    """
+    In-process background worker running workflow event propagation, so
+    step completions return without waiting on the next steps' writes.
+    Unprocessed events are re-queued on start().
+    """
+
+    def __init__(self, concurrency: int = 2):
+        self.concurrency = concurrency
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._client: Optional[AsyncIOMotorClient] = None
+        self._owns_client = False
+
+    async def start(self, client: Optional[AsyncIOMotorClient] = None) -> None:
+        self._owns_client = client is None
+        self._client = client or AsyncIOMotorClient(settings.MONGODB_URL)
+        self._queue = asyncio.Queue()
+        for event_id in await WorkflowRuntimeService(self._client).unprocessed_event_ids():
+            self._queue.put_nowait(event_id)
+        for _ in range(self.concurrency):
+            self._tasks.add(asyncio.create_task(self._work()))
+
+    def submit(self, event_id: str) -> None:
+        if self._queue is None:
+            # Not running: the event stays unprocessed and is picked up on the next start
+            logger.warning(f"Workflow worker not running, event {event_id} deferred")
+            return
+        self._queue.put_nowait(event_id)
+
+    async def join(self) -> None:
+        """Wait until every queued event has been processed"""
+        await self._queue.join()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._queue = None
+        if self._owns_client:
+            self._client.close()
+
+    async def _work(self) -> None:
+        service = WorkflowRuntimeService(self._client)
+        while True:
+            event_id = await self._queue.get()
+            try:
+                await service.process_event(event_id)
+            except Exception as e:
+                logger.error(f"Error processing workflow event {event_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+
+workflow_worker = WorkflowWorker(settings.WORKFLOW_WORKERS)
@@ -1,10 +1,23 @@
+import asyncio
+import base64
+import hashlib
+import logging
+import random
 from concurrent.futures import ThreadPoolExecutor
-from typing import List, Dict, Callable, Tuple
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Dict, Callable, Optional, Tuple
+import anthropic
 from app.utils.llm_call import llm_call
+from app.services.extraction_cache import ExtractionCache, extraction_cache_key
+
+logger = logging.getLogger(__name__)
 
 # Define processing steps with their system prompts
 ProcessingStep = Tuple[str, str]  # (prompt, system_prompt)
 
+EXTRACTION_MODEL = "claude-3-5-sonnet-20241022"
+
 def chain(input: str, steps: List[ProcessingStep], pdf_path: str) -> str:
     """Chain multiple LLM calls sequentially, passing results between steps."""
     result = input
@@ -26,6 +39,150 @@ def parallel(steps: List[ProcessingStep], pdf_path: str, n_workers: int = 3) ->
             ) for prompt, system_prompt in steps
         ]
         return [f.result() for f in futures]
+
+
+@dataclass(frozen=True)
+class Document:
+    """A PDF read and base64-encoded once, shared by every step that analyses it"""
+    name: str
+    data: str  # base64
+    media_type: str = "application/pdf"
+    sha256: str = ""  # digest of the raw bytes, keys the extraction cache
+
+    @classmethod
+    def from_bytes(cls, content: bytes, name: str = "document.pdf") -> "Document":
+        return cls(
+            name=name,
+            data=base64.standard_b64encode(content).decode("utf-8"),
+            sha256=hashlib.sha256(content).hexdigest(),
+        )
+
+    @classmethod
+    async def from_path(cls, file_path: str) -> "Document":
+        content = await asyncio.to_thread(Path(file_path).read_bytes)
+        return cls.from_bytes(content, Path(file_path).name)
+
+    def content_block(self) -> Dict:
+        # cache_control marks the end of the cached prefix: later steps on the
+        # same document read it from the prompt cache instead of re-processing it
+        return {
+            "type": "document",
+            "source": {"type": "base64", "media_type": self.media_type, "data": self.data},
+            "cache_control": {"type": "ephemeral"},
+        }
+
+
+class ExtractionPipeline:
+    """
+    asyncio-native counterpart of chain() / parallel() on AsyncAnthropic.
+
+    - At most `max_concurrency` requests are in flight across everything the
+      pipeline runs.
+    - 429, 5xx and connection errors are retried up to `max_retries` times
+      with exponential backoff and jitter, honouring retry-after.
+    - The document block is sent first and marked for prompt caching. The
+      step's system prompt follows it as text, so every step on the same
+      document shares one cached prefix.
+    - With an ExtractionCache, results are reused across documents with the
+      same bytes, prompts and model, without calling the API.
+    """
+
+    def __init__(
+        self,
+        client: Optional[anthropic.AsyncAnthropic] = None,
+        model: str = EXTRACTION_MODEL,
+        max_tokens: int = 1024,
+        max_concurrency: int = 3,
+        max_retries: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        cache: Optional[ExtractionCache] = None,
+    ):
+        # Retries are handled here, so they share the concurrency budget
+        self.client = client or anthropic.AsyncAnthropic(max_retries=0)
+        self.model = model
+        self.max_tokens = max_tokens
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.cache = cache
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _message_params(self, prompt: str, document: Document, system_prompt: Optional[str]) -> Dict:
+        content = [document.content_block()]
+        if system_prompt:
+            content.append({"type": "text", "text": system_prompt})
+        content.append({"type": "text", "text": prompt})
+        return {
+            "model": self.model,
+            "max_tokens": self.max_tokens,
+            "messages": [{"role": "user", "content": content}],
+        }
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.max_delay)
+            except ValueError:
+                pass
+        return min(self.base_delay * 2 ** attempt, self.max_delay) * random.uniform(0.5, 1.0)
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, (anthropic.RateLimitError, anthropic.APIConnectionError)):
+            return True
+        return isinstance(error, anthropic.APIStatusError) and error.status_code >= 500
+
+    async def call(self, prompt: str, document: Document, system_prompt: Optional[str] = None) -> str:
+        """One Messages API call (or cache hit); returns the response text"""
+        if self.cache is None or not document.sha256:
+            return await self._create(prompt, document, system_prompt)
+        key = extraction_cache_key(document.sha256, self.model, prompt, system_prompt)
+        return await self.cache.get_or_compute(
+            key, self.model, lambda: self._create(prompt, document, system_prompt)
+        )
+
+    async def _create(self, prompt: str, document: Document, system_prompt: Optional[str]) -> str:
+        params = self._message_params(prompt, document, system_prompt)
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    message = await self.client.messages.create(**params)
+            except Exception as e:
+                if not self._is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt, e)
+                logger.warning(f"Retrying {document.name} after {type(e).__name__} in {delay:.2f}s")
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            usage = message.usage
+            logger.debug(
+                f"{document.name}: {usage.input_tokens} input tokens, "
+                f"cache read {getattr(usage, 'cache_read_input_tokens', 0)}, "
+                f"cache write {getattr(usage, 'cache_creation_input_tokens', 0)}"
+            )
+            return "".join(block.text for block in message.content if block.type == "text")
+
+    async def chain(self, input: str, steps: List[ProcessingStep], document: Document) -> str:
+        """Run steps in order on one document, passing each result to the next step"""
+        result = input
+        for prompt, system_prompt in steps:
+            result = await self.call(f"{prompt}\nInput: {result}", document, system_prompt)
+        return result
+
+    async def parallel(self, steps: List[ProcessingStep], document: Document) -> List[str]:
+        """Run independent steps on one document concurrently"""
+        return await asyncio.gather(*(
+            self.call(prompt, document, system_prompt) for prompt, system_prompt in steps
+        ))
+
+    async def chain_many(self, input: str, steps: List[ProcessingStep], documents: List[Document]) -> List[str]:
+        """Run the chain on several documents concurrently; the steps of each stay sequential"""
+        return await asyncio.gather(*(self.chain(input, steps, document) for document in documents))
     
 
 data_processing_test1: List[ProcessingStep] = [
@@ -221,14 +378,18 @@ data_processing_test: List[ProcessingStep] = [
 
 starting_input = ""
 
-formatted_result = chain(starting_input, data_processing_test,'pdfs/LIFTING OPERATIONS AND LIFTING EQUIPMENT - REPORT OF INSPECTION (SECTION A).pdf')
-# print(formatted_result)
+# Steps turning a paper form into a formStructure (see validate_form.FormStructure)
+TEMPLATE_EXTRACTION_STEPS = data_processing_test
 
 
-# impact_results = parallel(
-#     data_processing_test,'pdfs/Toolbox Talk.pdf'
-# )
+# Usage: python -m app.utils.agent <pdf> [<pdf> ...]   run the extraction chain against the API
+if __name__ == "__main__":
+    import sys
 
-# for result in impact_results:
-#     print(result)
+    async def run(pdf_paths: List[str]):
+        documents = await asyncio.gather(*(Document.from_path(path) for path in pdf_paths))
+        pipeline = ExtractionPipeline()
+        for path, result in zip(pdf_paths, await pipeline.chain_many(starting_input, data_processing_test, documents)):
+            print(f"\n{path}:\n{result}")
 
+    asyncio.run(run(sys.argv[1:] or ['pdfs/LIFTING OPERATIONS AND LIFTING EQUIPMENT - REPORT OF INSPECTION (SECTION A).pdf']))
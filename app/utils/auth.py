@@ -0,0 +1,166 @@
+# app/utils/auth.py
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+import httpx
+from jose import jwk, jwt
+from jose.exceptions import JWTError, JWKError
+from app.schemas.user import AuthenticatedUser
+
+logger = logging.getLogger(__name__)
+
+JWKSFetcher = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+class AuthError(Exception):
+    """Token could not be verified; mapped to a 401 by the auth dependency"""
+
+
+def http_jwks_fetcher(jwks_url: str, timeout: float = 5.0) -> JWKSFetcher:
+    async def fetch() -> Dict[str, Any]:
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            response = await client.get(jwks_url)
+            response.raise_for_status()
+            return response.json()
+    return fetch
+
+
+class JWKSCache:
+    """
+    In-memory cache of the signing keys published by the Auth0 tenant.
+
+    Keys are parsed once per JWKS fetch and looked up by `kid`, so verifying a
+    token costs no network call. A background task refreshes the set every
+    `refresh_seconds`; a token signed with an unknown `kid` (key rotation)
+    triggers an immediate refetch, rate limited to one per
+    `min_refetch_seconds` so forged kids cannot hammer the tenant.
+    If a refresh fails the last known keys stay in use.
+    """
+
+    def __init__(self, fetcher: JWKSFetcher, refresh_seconds: int = 3600, min_refetch_seconds: int = 30):
+        self._fetcher = fetcher
+        self.refresh_seconds = refresh_seconds
+        self.min_refetch_seconds = min_refetch_seconds
+        self._keys: Dict[str, Any] = {}
+        self._fetched_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def set_keys(self, jwks: Dict[str, Any]) -> None:
+        """Replace the key set with a JWKS document ({"keys": [...]})"""
+        keys = {}
+        for key_data in jwks.get("keys", []):
+            if key_data.get("use", "sig") != "sig" or "kid" not in key_data:
+                continue
+            try:
+                keys[key_data["kid"]] = jwk.construct(key_data, key_data.get("alg", "RS256"))
+            except JWKError as e:
+                logger.warning(f"Skipping unusable JWKS key {key_data.get('kid')}: {str(e)}")
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+
+    async def refresh(self, force: bool = False) -> bool:
+        """Fetch the JWKS; without `force` a fetch younger than min_refetch_seconds is reused"""
+        async with self._lock:
+            if (
+                not force
+                and self._fetched_at is not None
+                and time.monotonic() - self._fetched_at < self.min_refetch_seconds
+            ):
+                return False
+            try:
+                self.set_keys(await self._fetcher())
+                return True
+            except Exception as e:
+                logger.error(f"Error refreshing JWKS: {str(e)}")
+                return False
+
+    async def get_key(self, kid: str):
+        key = self._keys.get(kid)
+        if key is None:
+            # Unknown kid: the tenant may have rotated its signing key
+            await self.refresh()
+            key = self._keys.get(kid)
+        if key is None:
+            raise AuthError("Unknown signing key")
+        return key
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await self.refresh(force=True)
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self) -> None:
+        """Start the background refresh task (called on app startup)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class TokenVerifier:
+    """Verifies Auth0 access tokens locally against a JWKSCache"""
+
+    def __init__(
+        self,
+        jwks: JWKSCache,
+        issuer: str,
+        audience: str,
+        claims_namespace: str = "",
+        algorithms: tuple = ("RS256",),
+    ):
+        if not audience:
+            # Without an audience, tokens minted for any other API of the tenant would be accepted
+            raise ValueError("TokenVerifier needs the API audience")
+        self.jwks = jwks
+        self.issuer = issuer
+        self.audience = audience
+        self.claims_namespace = claims_namespace
+        self.algorithms = list(algorithms)
+
+    async def verify(self, token: str) -> AuthenticatedUser:
+        try:
+            header = jwt.get_unverified_header(token)
+        except JWTError as e:
+            raise AuthError(f"Malformed token: {str(e)}")
+        if header.get("alg") not in self.algorithms:
+            raise AuthError("Unsupported signing algorithm")
+        key = await self.jwks.get_key(header.get("kid"))
+
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=self.algorithms,
+                audience=self.audience,
+                issuer=self.issuer,
+                # python-jose skips the audience check when the claim is missing
+                options={"require_aud": True},
+            )
+        except JWTError as e:
+            raise AuthError(str(e))
+        return self.to_user(claims)
+
+    def to_user(self, claims: Dict[str, Any]) -> AuthenticatedUser:
+        # The org and tier are added to the token by an Auth0 action as
+        # namespaced custom claims, so no user lookup is needed per request
+        ns = self.claims_namespace
+        sub = claims.get("sub")
+        if not sub:
+            raise AuthError("Token has no subject")
+        return AuthenticatedUser(
+            sub=sub,
+            email=claims.get(f"{ns}email", claims.get("email")),
+            owner_org=claims.get(f"{ns}owner_org"),
+            tier=claims.get(f"{ns}tier"),
+            claims=claims,
+        )
@@ -0,0 +1,190 @@
+# app/utils/entity_validator.py
+
+import copy
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from typing_extensions import Required, TypedDict
+from pydantic import ConfigDict, StrictBool, StrictFloat, StrictInt, StrictStr, TypeAdapter, ValidationError
+from app.schemas.dynamic_entity import FieldType
+
+# FieldType -> annotation for scalar fields. Strict types: entity data comes
+# from JSON, so "12" is not a number and 1 is not a boolean.
+SCALAR_TYPES = {
+    FieldType.STRING: StrictStr,
+    FieldType.NUMBER: Union[StrictInt, StrictFloat],
+    FieldType.BOOLEAN: StrictBool,
+    # ISO strings are parsed to datetimes so they sort and compare in MongoDB
+    FieldType.DATE: datetime,
+}
+
+# Number of errors quoted in a validation message
+MAX_REPORTED_ERRORS = 5
+
+Filler = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+def _annotation(field_def: Dict) -> Any:
+    field_type = FieldType(field_def["field_type"])
+    if field_type in SCALAR_TYPES:
+        return SCALAR_TYPES[field_type]
+    if field_type == FieldType.ARRAY:
+        items = field_def.get("items")
+        return List[_annotation(items) if items else Any]
+    properties = field_def.get("properties")
+    if properties:
+        return compile_entity_type(properties)
+    return Dict[str, Any]
+
+
+def compile_entity_type(fields: Dict[str, Dict]) -> type:
+    """
+    TypedDict for a stored entity schema ({field_name: DynamicField dict}).
+
+    A TypedDict (rather than a model from create_model) validates straight
+    into plain dicts, which is what gets stored, and allows any field name.
+    Unknown fields are rejected; optional fields may be missing or null.
+    """
+    annotations = {
+        field_name: Required[_annotation(field_def)] if field_def.get("required") else Optional[_annotation(field_def)]
+        for field_name, field_def in fields.items()
+    }
+    entity_type = TypedDict("Entity", annotations, total=False)
+    entity_type.__pydantic_config__ = ConfigDict(extra="forbid")
+    return entity_type
+
+
+def _defaults_filler(fields: Dict[str, Dict]) -> Optional[Filler]:
+    """
+    Closure returning a copy of the data with default_value applied,
+    including in nested objects; None if there are none. Runs before
+    validation, so required fields can be defaulted and defaults are
+    type-checked like any other value.
+    """
+    defaults = {
+        field_name: field_def["default_value"]
+        for field_name, field_def in fields.items()
+        if field_def.get("default_value") is not None
+    }
+    nested: Dict[str, Filler] = {}
+    in_items: Dict[str, Filler] = {}
+    for field_name, field_def in fields.items():
+        if field_def.get("properties"):
+            filler = _defaults_filler(field_def["properties"])
+            if filler:
+                nested[field_name] = filler
+        items = field_def.get("items")
+        if items and items.get("properties"):
+            filler = _defaults_filler(items["properties"])
+            if filler:
+                in_items[field_name] = filler
+    if not (defaults or nested or in_items):
+        return None
+
+    def fill(data: Dict[str, Any]) -> Dict[str, Any]:
+        if not isinstance(data, dict):
+            # Left for validation to reject
+            return data
+        data = dict(data)
+        for field_name, value in defaults.items():
+            if data.get(field_name) is None:
+                data[field_name] = copy.deepcopy(value)
+        for field_name, filler in nested.items():
+            if isinstance(data.get(field_name), dict):
+                data[field_name] = filler(data[field_name])
+        for field_name, filler in in_items.items():
+            if isinstance(data.get(field_name), list):
+                data[field_name] = [filler(item) for item in data[field_name]]
+        return data
+
+    return fill
+
+
+def _format_errors(errors: List[Dict], skip: int = 0) -> str:
+    messages = [
+        f"{'.'.join(str(part) for part in error['loc'][skip:]) or 'data'}: {error['msg']}"
+        for error in errors[:MAX_REPORTED_ERRORS]
+    ]
+    if len(errors) > MAX_REPORTED_ERRORS:
+        messages.append(f"... {len(errors) - MAX_REPORTED_ERRORS} more")
+    return "; ".join(messages)
+
+
+class EntityValidator:
+    """Compiled validator for one entity schema; build once and reuse"""
+
+    def __init__(self, schema_name: str, fields: Dict[str, Dict]):
+        self.schema_name = schema_name
+        self.fields = fields
+        self._values: Dict[str, Tuple[Dict, TypeAdapter]] = {}
+        self._field_adapters: Dict[str, TypeAdapter] = {}
+        self._one = TypeAdapter(compile_entity_type(fields))
+        self._fill = _defaults_filler(fields)
+
+    def _validate(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        if self._fill:
+            data = self._fill(data)
+        return self._one.validate_python(data)
+
+    def validate(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Validated copy of the data with defaults applied; raises ValueError"""
+        try:
+            return self._validate(data)
+        except ValidationError as e:
+            raise ValueError(f"Invalid {self.schema_name} data: {_format_errors(e.errors())}")
+
+    def validate_many(self, payloads: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[int, str]]:
+        """
+        Validate a batch in one pass. Returns the valid payloads (in input
+        order, defaults applied) and {index: error message} for the rest.
+        """
+        valid: List[Dict[str, Any]] = []
+        errors: Dict[int, str] = {}
+        for index, payload in enumerate(payloads):
+            try:
+                valid.append(self._validate(payload))
+            except ValidationError as e:
+                errors[index] = _format_errors(e.errors())
+        return valid, errors
+
+    def field(self, path: str) -> Dict:
+        """Definition of a field, nested ones as dotted paths ("site.postcode"); raises ValueError"""
+        return self._value_adapter(path)[0]
+
+    def validate_value(self, path: str, value: Any) -> Any:
+        """
+        Validate a single value for a field, e.g. a query operand. Values for
+        array fields are checked against the element type, as MongoDB
+        matches them against elements.
+        """
+        adapter = self._value_adapter(path)[1]
+        try:
+            return adapter.validate_python(value)
+        except ValidationError as e:
+            raise ValueError(f"Invalid value for {path}: {_format_errors(e.errors())}")
+
+    def validate_field(self, path: str, value: Any) -> Any:
+        """Validate a whole field value (an array field takes the full list), e.g. a mapped value"""
+        adapter = self._field_adapters.get(path)
+        if adapter is None:
+            adapter = self._field_adapters[path] = TypeAdapter(_annotation(self.field(path)))
+        try:
+            return adapter.validate_python(value)
+        except ValidationError as e:
+            raise ValueError(f"Invalid value for {path}: {_format_errors(e.errors())}")
+
+    def _value_adapter(self, path: str) -> Tuple[Dict, TypeAdapter]:
+        cached = self._values.get(path)
+        if cached is None:
+            fields, field_def = self.fields, None
+            for part in path.split("."):
+                if not fields or part not in fields:
+                    raise ValueError(f"Unknown field {path} on {self.schema_name}")
+                field_def = fields[part]
+                fields = field_def.get("properties")
+            if FieldType(field_def["field_type"]) == FieldType.ARRAY:
+                items = field_def.get("items")
+                annotation = _annotation(items) if items else Any
+            else:
+                annotation = _annotation(field_def)
+            cached = self._values[path] = (field_def, TypeAdapter(annotation))
+        return cached
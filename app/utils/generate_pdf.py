@@ -7,6 +7,31 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_LEFT, TA_RIGHT, TA_CENTER
 from .pdf_config import styles, PAGE_WIDTH, PAGE_HEIGHT, MARGIN, TABLE_STYLE
 
+def _money(amount):
+    return f"£{'{:,.2f}'.format(amount)}"
+
+
+# function for building the subtotal, VAT and total rows from the computed totals
+def totals_table(totals, col_widths):
+    rows = [
+        ['', '', '', 'Subtotal:', _money(totals.net_total)],
+        ['', '', '', 'VAT:', _money(totals.vat_total)],
+    ]
+    if totals.reverse_charge:
+        # Under the CIS domestic reverse charge the customer accounts for the VAT
+        rows.append(['Reverse charge: customer to pay the VAT to HMRC', '', '', 'VAT payable:', _money(totals.vat_payable)])
+    rows.append(['', '', '', 'Total:', _money(totals.grand_total)])
+
+    table = Table(rows, colWidths=col_widths)
+    last = len(rows) - 1
+    table.setStyle(TableStyle([
+        ('ALIGN', (4, 0), (4, last), 'RIGHT'),  # Right align the amounts
+        ('FONTNAME', (3, last), (4, last), 'Helvetica-Bold'),  # Bold font for the total
+        ('LINEABOVE', (3, last), (4, last), 1, colors.black),  # Line above the total
+    ]))
+    return table
+
+
 # function for generating an invoice pdf
 def generate_invoice_pdf(invoice_data):
     # Create a buffer to hold the PDF data
@@ -208,8 +233,8 @@ def generate_invoice_pdf(invoice_data):
     ]
     
     # Add each line item to the details data
-    for item in invoice_data.lineItems:
-        total_price = item.quantity * item.pricePerUnit
+    # Line totals are computed in Decimal, rounded to the penny
+    for item, total_price in zip(invoice_data.lineItems, invoice_data.totals.line_totals):
         details_data.append([
             item.lineItem,
             f"{int(item.quantity)}",
@@ -252,48 +277,8 @@ def generate_invoice_pdf(invoice_data):
         available_width * 0.15  # Amount - 15%
     ]
 
-    if invoice_data.cis_reversal:
-        # Calculate the VAT amount (21% of the invoice total)
-        vat_amount = invoice_data.invoiceTotal * 0.21
-        
-        # Create a table for the VAT amount
-        vat_data = [
-            ['', '', '', 'VAT (21%):', f"£{'{:,.2f}'.format(vat_amount)}"]
-        ]
-        
-        vat_table = Table(
-            vat_data,
-            colWidths=col_widths
-        )
-        
-        # Style the VAT table
-        vat_table.setStyle(TableStyle([
-            ('ALIGN', (4, 0), (4, 0), 'RIGHT'),  # Right align the VAT amount
-            ('FONTNAME', (3, 0), (4, 0), 'Helvetica-Bold'),  # Bold font for label and amount
-        ]))
-        
-        # Add the VAT table to elements
-        elements.append(vat_table)
-    
-    # Create a table for the total amount, aligned to the right
-    total_data = [
-        ['', '', '', 'Total:', f"£{'{:,.2f}'.format(invoice_data.invoiceTotal)}"]
-    ]
-    
-    total_table = Table(
-        total_data,
-        colWidths=col_widths
-    )
-    
-    # Style the total table
-    total_table.setStyle(TableStyle([
-        ('ALIGN', (4, 0), (4, 0), 'RIGHT'),  # Right align the total amount
-        ('FONTNAME', (3, 0), (4, 0), 'Helvetica-Bold'),  # Bold font for label and amount
-        ('LINEABOVE', (3, 0), (4, 0), 1, colors.black),  # Line above the total
-    ]))
-    
-    # Add the total table to elements
-    elements.append(total_table)
+    # Totals were computed server-side with the org's VAT rates
+    elements.append(totals_table(invoice_data.totals, col_widths))
     
     # ---------------------------
     # Payments Section
@@ -532,8 +517,8 @@ def generate_quote_pdf(quote_data):
     ]
     
     # Add each line item to the details data
-    for item in quote_data.lineItems:
-        total_price = item.quantity * item.pricePerUnit
+    # Line totals are computed in Decimal, rounded to the penny
+    for item, total_price in zip(quote_data.lineItems, quote_data.totals.line_totals):
         details_data.append([
             item.lineItem,
             f"{int(item.quantity)}",
@@ -567,32 +552,15 @@ def generate_quote_pdf(quote_data):
     # Spacer before total
     elements.append(Spacer(1, 10 * mm))  # 10mm space
     
-    # Create a table for the total amount, aligned to the right
-    total_data = [
-        ['', '', '', 'Total:', f"£{'{:,.2f}'.format(quote_data.quoteTotal)}"]
-    ]
-    
-    total_table = Table(
-        total_data,
-        colWidths=[
-            (available_width) * 0.4,  # Empty - 40%
-            (available_width) * 0.15, # Empty - 15%
-            (available_width) * 0.15, # Empty - 15%
-            (available_width) * 0.15, # Label - 15%
-            (available_width) * 0.15  # Amount - 15%
-        ]
-    )
-    
-    # Style the total table
-    total_table.setStyle(TableStyle([
-        ('ALIGN', (4, 0), (4, 0), 'RIGHT'),  # Right align the total amount
-        ('FONTNAME', (3, 0), (4, 0), 'Helvetica-Bold'),  # Bold font for label and amount
-        ('LINEABOVE', (3, 0), (4, 0), 1, colors.black),  # Line above the total
+    # Totals were computed server-side with the org's VAT rates
+    elements.append(totals_table(quote_data.totals, [
+        (available_width) * 0.4,  # Empty - 40%
+        (available_width) * 0.15, # Empty - 15%
+        (available_width) * 0.15, # Empty - 15%
+        (available_width) * 0.15, # Label - 15%
+        (available_width) * 0.15  # Amount - 15%
     ]))
     
-    # Add the total table to elements
-    elements.append(total_table)
-    
     # ---------------------------
     # Terms and Conditions Section
     # ---------------------------
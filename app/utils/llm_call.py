@@ -4,9 +4,8 @@ from botocore.exceptions import ClientError
 import logging
 from typing import Optional, Union
 import base64
-import json
-from datetime import datetime
 from pathlib import Path
+from app.utils.result_store import result_store
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -20,38 +19,6 @@ client = anthropic.Anthropic(
 # pdf_data = base64.standard_b64encode(httpx.get(pdf_url).content).decode("utf-8")
 
 
-def save_to_json(content: str, response_type: str = "form_analysis") -> None:
-    """
-    Save API response content to a JSON file with timestamp.
-    
-    Args:
-        content (str): The content to save
-        response_type (str): Type of response for filename
-    """
-    # Create logs directory if it doesn't exist
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
-    
-    # Generate timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    # Create filename
-    filename = log_dir / f"{response_type}_{timestamp}.json"
-    
-    # Prepare data structure
-    data = {
-        "timestamp": timestamp,
-        "type": response_type,
-        "content": content
-    }
-    
-    try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        logger.info(f"Successfully saved response to {filename}")
-    except Exception as e:
-        logger.error(f"Error saving to JSON: {str(e)}")
-
 def read_and_encode_file(file_path: str) -> str:
     """
     Read a PDF file and encode it to base64.
@@ -120,8 +87,8 @@ def llm_call(content: str, file_path: str, system_prompt: str = None) -> Union[s
         
         if hasattr(message, 'content'):
             logger.debug(f"Successful API call with content length: {len(message.content)}")
-            # Save the response to JSON
-            save_to_json(message.content[0].text)
+            # Record the response in the JSONL result store (written in the background)
+            result_store.append(message.content[0].text, model=message_params["model"], file=Path(file_path).name)
             return message.content
         else:
             logger.error("API response missing content field")
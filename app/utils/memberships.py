@@ -0,0 +1,26 @@
+# app/utils/memberships.py
+
+from typing import Dict, List, Optional
+
+PREMIUM_TIER = "Premium User"
+
+
+def to_memberships(organization_id: Optional[List[Dict]]) -> List[Dict[str, str]]:
+    """
+    Normalize a user's organization_id list ([{<org key>: <tier>}, ...]) into
+    org_memberships ([{"org": <org key>, "tier": <tier>}, ...]).
+
+    organization_id uses the org key as a field name, which no index can
+    serve; org_memberships is stored alongside it so team lookups can use
+    the multikey index on org_memberships.org.
+    """
+    return [
+        {"org": org, "tier": tier[0] if isinstance(tier, list) else tier}
+        for entry in organization_id or []
+        for org, tier in entry.items()
+    ]
+
+
+def find_premium_org(memberships: List[Dict[str, str]]) -> Optional[str]:
+    """Org key of the first membership with the Premium User tier"""
+    return next((m["org"] for m in memberships if m["tier"] == PREMIUM_TIER), None)
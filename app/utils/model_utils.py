@@ -0,0 +1,103 @@
+# app/utils/model_utils.py
+
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple, Type, TypeVar, Union, get_args, get_origin
+from pydantic import BaseModel
+
+M = TypeVar("M", bound=BaseModel)
+
+# Marker stamped on documents written from a validated model dump. Bump it
+# when a stored model changes shape, so older documents are validated on read.
+SCHEMA_VERSION = 1
+SCHEMA_VERSION_FIELD = "schema_version"
+
+# Nested field kinds handled by construct_model
+_MODEL = "model"
+_LIST = "list"
+_DICT = "dict"
+
+
+def _nested_model(annotation: Any) -> Optional[Tuple[str, Type[BaseModel]]]:
+    """Return (kind, model) if the annotation holds pydantic models, else None"""
+    origin = get_origin(annotation)
+    if origin is Union:
+        # Optional[X] / Union[X, None]
+        for arg in get_args(annotation):
+            if arg is not type(None):
+                found = _nested_model(arg)
+                if found:
+                    return found
+        return None
+    if origin in (list, tuple, set):
+        args = get_args(annotation)
+        if args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+            return _LIST, args[0]
+        return None
+    if origin is dict:
+        args = get_args(annotation)
+        if len(args) == 2 and isinstance(args[1], type) and issubclass(args[1], BaseModel):
+            return _DICT, args[1]
+        return None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _MODEL, annotation
+    return None
+
+
+@lru_cache(maxsize=None)
+def _construct_plan(model: Type[BaseModel]) -> Dict[str, Tuple[str, Type[BaseModel]]]:
+    """Fields of a model that need recursive construction, computed once per model"""
+    plan = {}
+    for name, field in model.model_fields.items():
+        nested = _nested_model(field.annotation)
+        if nested:
+            plan[name] = nested
+    return plan
+
+
+def construct_model(model: Type[M], data: Dict[str, Any]) -> M:
+    """
+    Build a model from a trusted document (one we wrote ourselves after
+    validation) without validating it again.
+
+    This is model_construct applied recursively, so nested models such as
+    List[LineItem] are real model instances and serialize without warnings.
+    Unknown keys (e.g. Mongo's _id) are dropped and missing optional fields get
+    their defaults, as with normal validation. Never use this on request input.
+    """
+    if isinstance(data, model):
+        return data
+    plan = _construct_plan(model)
+    if plan:
+        data = dict(data)
+        for name, (kind, sub_model) in plan.items():
+            value = data.get(name)
+            if value is None:
+                continue
+            if kind == _MODEL:
+                data[name] = construct_model(sub_model, value)
+            elif kind == _LIST:
+                data[name] = [construct_model(sub_model, item) for item in value]
+            else:
+                data[name] = {key: construct_model(sub_model, item) for key, item in value.items()}
+    return model.model_construct(**data)
+
+
+def stamp(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Mark a model_dump() about to be written as validated at the current SCHEMA_VERSION"""
+    document[SCHEMA_VERSION_FIELD] = SCHEMA_VERSION
+    return document
+
+
+def is_trusted(document: Optional[Dict[str, Any]]) -> bool:
+    """True if the document was written by stamp(); legacy and hand-edited documents are not"""
+    return bool(document) and document.get(SCHEMA_VERSION_FIELD) == SCHEMA_VERSION
+
+
+def read_model(model: Type[M], data: Dict[str, Any], trusted: bool) -> M:
+    """
+    Model for a stored document (or one of its items): constructed without
+    validation if the containing document is trusted (see is_trusted),
+    otherwise validated, so legacy shapes such as numbers stored as strings
+    or ISO date strings are coerced exactly as on the way in.
+    """
+    return construct_model(model, data) if trusted else model.model_validate(data)
@@ -0,0 +1,48 @@
+# app/utils/projections.py
+
+from typing import Any, Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+
+def items_map_stage(fields: Dict[str, Any], item_filter: Optional[Dict] = None) -> Dict:
+    """
+    $project stage that reshapes the org document's items array on the server,
+    keeping only `fields` (name -> default used when the item lacks it).
+    `item_filter` is an aggregation expression over $$item; items for which it
+    is false are dropped before shaping.
+    """
+    items = {"$ifNull": ["$items", []]}
+    if item_filter is not None:
+        items = {"$filter": {"input": items, "as": "item", "cond": item_filter}}
+    return {
+        "$project": {
+            "_id": 0,
+            "items": {
+                "$map": {
+                    "input": items,
+                    "as": "item",
+                    "in": {
+                        name: {"$ifNull": [f"$$item.{name}", default]}
+                        for name, default in fields.items()
+                    },
+                }
+            },
+        }
+    }
+
+
+async def find_org_items(
+    collection: AsyncIOMotorCollection,
+    owner: str,
+    fields: Dict[str, Any],
+    item_filter: Optional[Dict] = None,
+) -> List[Dict]:
+    """
+    Read only the listed item subfields of an org document ({owner_org, items: [...]}),
+    optionally keeping only the items matching `item_filter` (see items_map_stage).
+
+    Returns the shaped items, or an empty list if the org has no document.
+    """
+    pipeline = [{"$match": {"owner_org": owner}}, {"$limit": 1}, items_map_stage(fields, item_filter)]
+    docs = await collection.aggregate(pipeline).to_list(1)
+    return docs[0]["items"] if docs else []
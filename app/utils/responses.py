@@ -0,0 +1,55 @@
+# app/utils/responses.py
+
+import gzip
+from typing import Any
+import orjson
+from bson import ObjectId
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel
+
+
+def _orjson_default(obj: Any) -> Any:
+    """Fallback for types orjson does not handle natively (raw Mongo documents)"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Type {type(obj).__name__} is not JSON serializable")
+
+
+class ModelResponse(ORJSONResponse):
+    """
+    JSON response for payloads a service has already validated.
+
+    Returning a Response from an endpoint makes FastAPI skip the response_model
+    round trip (model_dump -> validate -> serialize), so large org documents
+    are serialized exactly once. Pydantic models are dumped by pydantic-core,
+    raw dicts / lists (e.g. aggregation results) go straight through orjson.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode("utf-8")
+        return orjson.dumps(
+            content,
+            default=_orjson_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+
+
+def gzipped(request: Request, response: Response, minimum_size: int = 1024) -> Response:
+    """
+    Gzip a rendered response if the client accepts it, for large payloads
+    sent to devices on slow links. This is per endpoint rather than a
+    GZipMiddleware, which would buffer the slate event streams.
+    """
+    if len(response.body) < minimum_size or "gzip" not in request.headers.get("accept-encoding", ""):
+        return response
+    headers = {"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+    return Response(
+        gzip.compress(response.body, compresslevel=6),
+        status_code=response.status_code,
+        media_type=response.media_type,
+        headers=headers,
+    )
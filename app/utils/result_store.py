@@ -0,0 +1,139 @@
+# app/utils/result_store.py
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class ResultStore:
+    """
+    Append-only JSONL store for LLM responses.
+
+    Callers only enqueue (safe from sync code, threads and the event loop);
+    a single writer thread appends the records in batches, so parallel calls
+    never block on disk or collide on file names. When the active file
+    reaches `max_bytes` it is rotated to `<prefix>.<timestamp>.jsonl`.
+
+    Each record is {"id", "timestamp", "type", "content", **extra}.
+    """
+
+    def __init__(self, directory: str = "logs", prefix: str = "form_analysis", max_bytes: int = 16 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def active_path(self) -> Path:
+        return self.directory / f"{self.prefix}.jsonl"
+
+    def append(self, content: str, response_type: str = "form_analysis", **extra) -> str:
+        """Queue a record for writing; returns its id"""
+        record = {
+            "id": uuid.uuid4().hex,
+            "timestamp": datetime.now().isoformat(timespec="microseconds"),
+            "type": response_type,
+            "content": content,
+            **extra,
+        }
+        self._ensure_writer()
+        self._queue.put(record)
+        return record["id"]
+
+    def flush(self) -> None:
+        """Block until every queued record is on disk"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def _ensure_writer(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._thread = threading.Thread(target=self._write_loop, name=f"{self.prefix}-writer", daemon=True)
+                self._thread.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            # Drain whatever else is queued so one write covers the burst
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [record for record in batch if record is not _STOP]
+            try:
+                if records:
+                    self._write(records)
+            except Exception as e:
+                logger.error(f"Error writing {len(records)} records to {self.active_path}: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(records) != len(batch):
+                return
+
+    def _write(self, records: List[Dict]) -> None:
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with open(self.active_path, "a", encoding="utf-8") as f:
+            f.write(lines)
+            size = f.tell()
+        if size >= self.max_bytes:
+            rotated = self.directory / f"{self.prefix}.{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.jsonl"
+            os.replace(self.active_path, rotated)
+            logger.info(f"Rotated {self.active_path} to {rotated}")
+
+
+def store_files(directory: str = "logs", prefix: str = "form_analysis") -> List[Path]:
+    """Rotated files oldest first, then the active file"""
+    directory = Path(directory)
+    files = sorted(directory.glob(f"{prefix}.*.jsonl"))
+    active = directory / f"{prefix}.jsonl"
+    if active.exists():
+        files.append(active)
+    return files
+
+
+def iter_lines(directory: str = "logs", prefix: str = "form_analysis") -> Iterator[str]:
+    """Stream the raw JSONL lines of a store, one file at a time"""
+    for path in store_files(directory, prefix):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield line
+
+
+def iter_records(directory: str = "logs", prefix: str = "form_analysis") -> Iterator[Dict]:
+    """Stream the records of a store; unreadable lines are logged and skipped"""
+    for line in iter_lines(directory, prefix):
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            logger.error(f"Skipping unreadable record: {str(e)}")
+
+
+result_store = ResultStore()
+atexit.register(result_store.close)
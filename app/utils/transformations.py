@@ -0,0 +1,248 @@
+# app/utils/transformations.py
+
+import ast
+import calendar
+import logging
+import math
+import re
+import string
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_EXPRESSION_LENGTH = 500
+# Longest string an expression may build
+MAX_STRING_LENGTH = 65536
+
+# Widths/precisions in format specs are capped so "{:999999999}" cannot allocate
+_FORMAT_SPEC_LIMIT = re.compile(r"\d{4,}")
+
+
+class TransformationError(ValueError):
+    """The expression is not valid in the transformation language"""
+
+
+# --- Functions available to expressions ---------------------------------------
+
+def _number(value: Any) -> Any:
+    if isinstance(value, bool):
+        raise TypeError("Not a number")
+    if isinstance(value, (int, float)):
+        return value
+    return float(value)
+
+
+def _bounded(result: Any) -> Any:
+    if isinstance(result, str) and len(result) > MAX_STRING_LENGTH:
+        raise ValueError(f"Strings are limited to {MAX_STRING_LENGTH} characters")
+    return result
+
+
+def _mul(a: Any, b: Any) -> Any:
+    # Numbers only: "x" * 10**9 would be a memory bomb
+    return _number(a) * _number(b)
+
+
+def _mod(a: Any, b: Any) -> Any:
+    # Numbers only: "%9999999s" % value and "%*d" build huge strings
+    return _number(a) % _number(b)
+
+
+def _add(a: Any, b: Any) -> Any:
+    return _bounded(a + b)
+
+
+def _text(value: Any) -> str:
+    return _bounded("" if value is None else str(value))
+
+
+def _format(template: str, *args: Any, **kwargs: Any) -> str:
+    """str.format without attribute/index access ("{0.__class__}"), nested or huge widths"""
+    for _, field, spec, _ in string.Formatter().parse(template):
+        if field and ("." in field or "[" in field):
+            raise ValueError("Attribute and index access are not allowed in format()")
+        # "{:{}}" takes its width from an argument
+        if spec and ("{" in spec or "*" in spec):
+            raise ValueError("Nested fields and '*' are not allowed in format specs")
+        if spec and _FORMAT_SPEC_LIMIT.search(spec):
+            raise ValueError("Format width too large")
+    return _bounded(template.format(*args, **kwargs))
+
+
+def _to_datetime(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(str(value))
+
+
+def _add_days(value: Any, days: float) -> datetime:
+    return _to_datetime(value) + timedelta(days=_number(days))
+
+
+def _add_months(value: Any, months: int) -> datetime:
+    moment = _to_datetime(value)
+    month_index = moment.month - 1 + int(months)
+    year, month = moment.year + month_index // 12, month_index % 12 + 1
+    return moment.replace(year=year, month=month, day=min(moment.day, calendar.monthrange(year, month)[1]))
+
+
+def _lookup(key: Any, table: Dict, default: Any = None) -> Any:
+    return table.get(key, default)
+
+
+def _coalesce(*values: Any) -> Any:
+    return next((value for value in values if value is not None), None)
+
+
+def _round(value: Any, digits: int = 0) -> Any:
+    return round(_number(value), int(digits))
+
+
+FUNCTIONS: Dict[str, Callable] = {
+    # arithmetic
+    "number": _number,
+    "round": _round,
+    "abs": abs,
+    "min": min,
+    "max": max,
+    "floor": math.floor,
+    "ceil": math.ceil,
+    # strings
+    "text": _text,
+    "upper": lambda value: _bounded(_text(value).upper()),
+    "lower": lambda value: _bounded(_text(value).lower()),
+    "strip": lambda value: _text(value).strip(),
+    "concat": lambda *parts: _bounded("".join(_text(part) for part in parts)),
+    "format": _format,
+    "length": lambda value: len(value) if value is not None else 0,
+    # dates
+    "date": _to_datetime,
+    "add_days": _add_days,
+    "add_months": _add_months,
+    # lookups
+    "lookup": _lookup,
+    "coalesce": _coalesce,
+}
+
+# Names an expression can read: the mapped source value and the source entity's data
+VARIABLES = ("value", "data")
+
+_BINARY_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod)
+_UNARY_OPERATORS = (ast.UAdd, ast.USub, ast.Not)
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+    ast.Call, ast.Constant, ast.Name, ast.Load, ast.Subscript, ast.List, ast.Tuple, ast.Dict,
+    ast.And, ast.Or, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+    ast.keyword,
+) + _BINARY_OPERATORS + _UNARY_OPERATORS
+
+
+class _Checker(ast.NodeVisitor):
+    """Reject anything outside the whitelist; the grammar has no loops, attributes or lambdas"""
+
+    def generic_visit(self, node: ast.AST) -> None:
+        if not isinstance(node, _ALLOWED_NODES):
+            raise TransformationError(f"{type(node).__name__} is not allowed in transformations")
+        super().generic_visit(node)
+
+    def visit_Name(self, node: ast.Name) -> None:
+        if node.id not in VARIABLES and node.id not in FUNCTIONS:
+            raise TransformationError(f"Unknown name {node.id!r}; use value, data or one of {sorted(FUNCTIONS)}")
+
+    def visit_Call(self, node: ast.Call) -> None:
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+            raise TransformationError("Only the transformation functions can be called")
+        self.generic_visit(node)
+
+    def visit_Constant(self, node: ast.Constant) -> None:
+        if not isinstance(node.value, (str, int, float, bool, type(None))):
+            raise TransformationError(f"Constant {node.value!r} is not allowed")
+
+
+# Operators that can build big strings run through their checked helpers
+_OPERATOR_HELPERS = {ast.Mult: ("__mul", _mul), ast.Mod: ("__mod", _mod), ast.Add: ("__add", _add)}
+
+
+class _Rewriter(ast.NodeTransformer):
+    """a * b -> __mul(a, b) etc., so * and % are numeric only and + is length-capped"""
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        self.generic_visit(node)
+        helper = _OPERATOR_HELPERS.get(type(node.op))
+        if helper:
+            return ast.copy_location(
+                ast.Call(func=ast.Name(id=helper[0], ctx=ast.Load()), args=[node.left, node.right], keywords=[]),
+                node,
+            )
+        return node
+
+
+class Transformation:
+    """
+    A FieldMapping.transformation parsed and compiled once.
+
+    Expressions are Python-syntax formulas over `value` (the mapped source
+    field) and `data` (the source entity's data), e.g.
+    `round(value * 1.2, 2)`, `format("{} - {}", data["client"], value)`,
+    `add_days(value, 30)` or `lookup(value, {"S": "Small", "L": "Large"})`.
+    Only literals, operators, conditionals, subscripts and FUNCTIONS are
+    allowed. There are no attributes, loops or builtins, so an expression
+    cannot reach anything else.
+
+    The expression is compiled once into a plain function, so a row costs
+    one call rather than an eval. apply_many() runs it over a whole batch
+    of mapped values; if any row raises (e.g. a division by zero), the batch
+    is re-run row by row and failing rows yield None.
+    """
+
+    def __init__(self, expression: str):
+        if len(expression) > MAX_EXPRESSION_LENGTH:
+            raise TransformationError(f"Transformations are limited to {MAX_EXPRESSION_LENGTH} characters")
+        try:
+            tree = ast.parse(expression.strip(), mode="eval")
+        except SyntaxError as e:
+            raise TransformationError(f"Invalid transformation: {e.msg}")
+        _Checker().visit(tree)
+        body = _Rewriter().visit(tree).body
+
+        self.expression = expression
+        function = ast.fix_missing_locations(ast.Expression(body=ast.Lambda(
+            args=ast.arguments(
+                posonlyargs=[], args=[ast.arg(arg=name) for name in VARIABLES],
+                kwonlyargs=[], kw_defaults=[], defaults=[],
+            ),
+            body=body,
+        )))
+        # Compiled to a plain function once; evaluating a row is a single call
+        env = {"__builtins__": {}, **dict(_OPERATOR_HELPERS.values()), **FUNCTIONS}
+        self._function = eval(compile(function, "<transformation>", "eval"), env)
+
+    def apply(self, value: Any, data: Optional[Dict[str, Any]] = None) -> Any:
+        """Evaluate for one row; raises on errors"""
+        return self._function(value, data or {})
+
+    def apply_many(self, values: List[Any], datas: List[Dict[str, Any]]) -> List[Any]:
+        """Evaluate for a batch (values[i] with datas[i]); failing rows give None"""
+        function = self._function
+        try:
+            return [function(value, data) for value, data in zip(values, datas)]
+        except Exception:
+            pass
+        results = []
+        for value, data in zip(values, datas):
+            try:
+                results.append(function(value, data))
+            except Exception as e:
+                logger.warning(f"Transformation {self.expression!r} failed for {value!r}: {str(e)}")
+                results.append(None)
+        return results
+
+
+@lru_cache(maxsize=1024)
+def compile_transformation(expression: str) -> Transformation:
+    """The compiled transformation for an expression, shared by every mapping that uses it"""
+    return Transformation(expression)
@@ -1,9 +1,13 @@
-from typing import Dict, List, Optional, Union, Literal
+from typing import Any, Dict, Iterator, List, Optional, Union, Literal
 from pydantic import BaseModel, Field
 import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
 from pathlib import Path
 from typing import List, Dict
 import logging
+from app.utils.result_store import iter_lines
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -53,8 +57,8 @@ class FormStructure(BaseModel):
         indices = [field.form_index for field in self.formFields]
         return indices == list(range(1, len(indices) + 1))
 
-# Example usage and validation
-def validate_form_schema(schema_dict: Dict) -> bool:
+def form_schema_error(schema_dict: Dict) -> Optional[str]:
+    """Why a {"formStructure": ...} dict is invalid, or None if it is valid"""
     try:
         # Extract the inner formStructure content
         form_structure = schema_dict.get("formStructure")
@@ -72,12 +76,93 @@ def validate_form_schema(schema_dict: Dict) -> bool:
             if not field.validate_table_fields():
                 raise ValueError(f"Missing required table fields for form index {field.form_index}")
         
-        return True
+        return None
     except Exception as e:
-        print(f"Validation failed: {str(e)}")
+        return str(e)
+
+# Example usage and validation
+def validate_form_schema(schema_dict: Dict) -> bool:
+    error = form_schema_error(schema_dict)
+    if error is not None:
+        logger.warning(f"Form schema validation failed: {error}")
         return False
+    return True
+
+
+def validate_record_line(line: str) -> Dict[str, Any]:
+    """Validate one result store line: {"id", "file", "valid", "error"}"""
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        return {"id": None, "file": None, "valid": False, "error": f"Unreadable record: {str(e)}"}
+    result = {"id": record.get("id"), "file": record.get("file"), "valid": False, "error": None}
+    try:
+        # Model replies may contain raw line breaks inside strings
+        content_obj = json.loads(record.get("content", ""), strict=False)
+    except json.JSONDecodeError as e:
+        result["error"] = f"Content is not JSON: {str(e)}"
+        return result
+    result["error"] = form_schema_error(content_obj) if isinstance(content_obj, dict) else "Content is not a JSON object"
+    result["valid"] = result["error"] is None
+    return result
+
+
+def _validate_chunk(lines: List[str]) -> List[Dict[str, Any]]:
+    return [validate_record_line(line) for line in lines]
 
 
+def stream_validate_results(directory: str = "logs", prefix: str = "form_analysis") -> Iterator[Dict[str, Any]]:
+    """Streaming validation pass over the result store, one record in memory at a time"""
+    for line in iter_lines(directory, prefix):
+        yield validate_record_line(line)
+
+
+def validation_report(
+    directory: str = "logs",
+    prefix: str = "form_analysis",
+    workers: Optional[int] = None,
+    chunk_size: int = 200,
+) -> Dict[str, Any]:
+    """
+    Batch validation report over the result store. Lines are streamed in
+    chunks and validated in parallel worker processes; at most two chunks
+    per worker are in flight, so memory stays bounded on large stores.
+    """
+    workers = workers or os.cpu_count() or 1
+    total = valid = 0
+    invalid: List[Dict[str, Any]] = []
+
+    def collect(results: List[Dict[str, Any]]) -> None:
+        nonlocal total, valid
+        for result in results:
+            total += 1
+            if result["valid"]:
+                valid += 1
+            else:
+                invalid.append(result)
+
+    lines = iter_lines(directory, prefix)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for chunk in iter(lambda: list(islice(lines, chunk_size)), []):
+            pending.add(executor.submit(_validate_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future.result())
+        for future in pending:
+            collect(future.result())
+
+    return {
+        "total": total,
+        "valid": valid,
+        "invalid": total - valid,
+        "success_rate": valid / total * 100 if total else 0.0,
+        "invalid_records": invalid,
+    }
+
+
+# Legacy: one timestamped file per response, as written before the JSONL result store
 def load_and_validate_json_files(log_directory: str = "logs") -> Dict[str, bool]:
     log_dir = Path(log_directory)
     validation_results = {}
@@ -173,9 +258,14 @@ def debug_schema(json_file_path: str) -> None:
 
 
 if __name__ == "__main__":
-    # Debug a specific file
-    debug_schema("logs/form_analysis_20250116_105512.json")
-    
-    # Or validate all files
-    validation_results = load_and_validate_json_files()
-    summarize_validation_results(validation_results)
\ No newline at end of file
+    import sys
+
+    # Parallel batch report over the JSONL result store: python -m app.utils.validate_form [log_directory]
+    report = validation_report(sys.argv[1] if len(sys.argv) > 1 else "logs")
+    print("\nValidation Summary:")
+    print(f"Total records processed: {report['total']}")
+    print(f"Valid schemas: {report['valid']}")
+    print(f"Invalid schemas: {report['invalid']}")
+    print(f"Success rate: {report['success_rate']:.2f}%")
+    for result in report["invalid_records"]:
+        print(f"- {result['id']} ({result['file']}): {result['error']}")
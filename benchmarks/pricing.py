@@ -0,0 +1,38 @@
+# benchmarks/pricing.py
+# Usage: python -m benchmarks.pricing [n_documents] [lines_per_document]
+
+import random
+import sys
+import timeit
+from app.services.pricing_service import compute_batch_totals, compute_totals, vat_rates_from_pricing
+
+n_documents = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+n_lines = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+categories = ["Labour", "Material", "Plant Hire", "Scaffolding"]
+rates = vat_rates_from_pricing([
+    {"category": c, "vatPercentage": v} for c, v in zip(categories, (20, 20, 5, 0))
+])
+documents = [
+    ([
+        {
+            "lineItem": random.choice(categories),
+            "quantity": random.randint(1, 40),
+            "pricePerUnit": round(random.uniform(1, 500), 2),
+        }
+        for _ in range(n_lines)
+    ], i % 3 == 0)
+    for i in range(n_documents)
+]
+
+per_document = lambda: [compute_totals(items, rates, reverse) for items, reverse in documents]
+batch = lambda: compute_batch_totals(documents, rates)
+assert per_document() == batch()
+
+runs = 5
+print(f"{n_documents} documents x {n_lines} lines")
+print(f"{'per document':<14} {timeit.timeit(per_document, number=runs) / runs * 1000:8.1f} ms")
+print(f"{'batch':<14} {timeit.timeit(batch, number=runs) / runs * 1000:8.1f} ms")
+
+# Float arithmetic drifts where Decimal does not
+items = [{"lineItem": "Labour", "quantity": 1, "pricePerUnit": 0.1}] * 3
+print("float net:", sum(i["quantity"] * i["pricePerUnit"] for i in items), "decimal net:", compute_totals(items, rates).net_total)
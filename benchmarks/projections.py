@@ -0,0 +1,43 @@
+# benchmarks/projections.py
+# Usage: python -m benchmarks.projections [n_items]
+
+import sys
+import timeit
+import bson
+
+n_items = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+full_doc = {
+    "_id": bson.ObjectId(),
+    "owner_org": "bench-org",
+    "items": [
+        {
+            "companyId": f"company-{i}",
+            "customer_name": f"Customer {i} Ltd",
+            "customer_address": f"{i} Long Street, Some Town, AB1 2CD",
+            "contact": f"Contact Person {i}",
+            "email": f"contact{i}@customer{i}.co.uk",
+            "telephone": "+44 20 7946 0000",
+            "vat_number": f"GB{i:09d}",
+            "company_number": f"{i:08d}",
+        }
+        for i in range(n_items)
+    ],
+}
+
+full_bytes = bson.encode(full_doc)
+runs = 20
+full_time = timeit.timeit(lambda: bson.decode(full_bytes), number=runs) / runs
+print(f"{n_items} CRM items")
+print(f"{'full document':<28} {len(full_bytes) / 1024:8.0f} KiB, decode {full_time * 1000:6.2f} ms")
+
+projections = {
+    # CRM_Service.customer_list (CustomerInfo)
+    "customer list": ("companyId", "customer_name", "customer_address", "vat_number", "company_number", "telephone"),
+    # id -> name lookups
+    "id / name only": ("companyId", "customer_name"),
+}
+for label, fields in projections.items():
+    projected_doc = {"items": [{k: item[k] for k in fields} for item in full_doc["items"]]}
+    projected_bytes = bson.encode(projected_doc)
+    projected_time = timeit.timeit(lambda: bson.decode(projected_bytes), number=runs) / runs
+    print(f"{label:<28} {len(projected_bytes) / 1024:8.0f} KiB, decode {projected_time * 1000:6.2f} ms")
@@ -0,0 +1,51 @@
+# benchmarks/responses.py
+# Usage: python -m benchmarks.responses [n_items]
+
+import sys
+import timeit
+from datetime import datetime
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.schemas.collections import Quote_Complete_Data
+from app.utils.responses import ModelResponse
+
+n_items = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+now = datetime.utcnow()
+payload = Quote_Complete_Data(
+    owner_org="bench-org",
+    items=[
+        {
+            "name": f"Quote {i}",
+            "creator": "bench@sitesteer.ai",
+            "last_updated": now,
+            "quoteId": f"quote-{i}",
+            "projectId": f"project-{i % 50}",
+            "companyId": f"company-{i % 20}",
+            "status": "Created",
+            "terms": "30 Days",
+            "issue_date": now,
+            "quoteTotal": 1000.0 + i,
+            "lineItems": [
+                {"lineItem": f"Item {j}", "quantity": j + 1, "units": "/ hour", "pricePerUnit": 50.0}
+                for j in range(5)
+            ],
+        }
+        for i in range(n_items)
+    ],
+)
+
+def default_path():
+    # What FastAPI does for a returned model: dump, re-validate, encode, json.dumps
+    validated = Quote_Complete_Data.model_validate(payload.model_dump())
+    return JSONResponse(jsonable_encoder(validated)).body
+
+def fast_path():
+    return ModelResponse(payload).body
+
+assert orjson.loads(default_path()) == orjson.loads(fast_path())
+runs = 5
+slow = timeit.timeit(default_path, number=runs) / runs
+fast = timeit.timeit(fast_path, number=runs) / runs
+print(f"{n_items} quotes, {len(fast_path()) / 1024:.0f} KiB")
+print(f"default JSONResponse path: {slow * 1000:.1f} ms")
+print(f"ModelResponse path:        {fast * 1000:.1f} ms ({slow / fast:.1f}x)")
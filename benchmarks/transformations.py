@@ -0,0 +1,20 @@
+# benchmarks/transformations.py
+# Usage: python -m benchmarks.transformations
+
+import time
+from app.utils.transformations import compile_transformation
+
+rows = [({"net": i * 1.5, "client": f"Client {i % 50}"}) for i in range(100000)]
+values = [row["net"] for row in rows]
+expression = 'round(value * 1.2, 2) if value > 10 else 0'
+
+transformation = compile_transformation(expression)
+for label, run in (
+    ("eval per entity", lambda: [eval(expression, {"__builtins__": {}, "round": round}, {"value": v}) for v in values]),
+    ("compiled, per entity", lambda: [transformation.apply(v, d) for v, d in zip(values, rows)]),
+    ("compiled, batch", lambda: transformation.apply_many(values, rows)),
+):
+    start = time.perf_counter()
+    run()
+    print(f"{label}: {(time.perf_counter() - start) * 1000:.1f} ms for {len(values)} rows")
+
@@ -0,0 +1,47 @@
+# tests/conftest.py
+
+import os
+
+# app.config reads these at import time; the suite never talks to the real services
+for name, value in {
+    "MONGO_DB_PASSWORD": "test",
+    "AUTH0_CLIENT_ID": "test",
+    "AUTH0_CLIENT_SECRET": "test",
+    "AUTH0_DOMAIN": "tests.auth0.com",
+    "AUTH0_AUDIENCE": "https://api.tests/",
+    "DO_SPACE_REGION": "test",
+    "DO_SPACE_NAME": "test",
+    "DO_ACCESS_KEY": "test",
+    "DO_SECRET_KEY": "test",
+    "DO_ENDPOINT_URL": "http://localhost",
+    "AUTH0_ACTION_API_KEY": "test",
+    "SMTP_HOST": "localhost",
+    "SMTP_PORT": "25",
+    "SMTP_USERNAME": "test",
+    "SMTP_PASSWORD": "test",
+    "SMTP_FROM_EMAIL": "noreply@sitesteer.ai",
+    "ADMIN_EMAIL": "admin@sitesteer.ai",
+    "SECOND_ADMIN_EMAIL": "admin2@sitesteer.ai",
+}.items():
+    os.environ.setdefault(name, value)
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from app.services.entity_registry import entity_registry
+from app.services.user_context_cache import user_context_cache
+
+
+@pytest.fixture
+def client():
+    """In-memory stand-in for the Motor client; every test gets an empty database"""
+    return AsyncMongoMockClient()
+
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    # Per-worker caches outlive a test's database
+    entity_registry.clear()
+    user_context_cache.clear()
+    yield
+    entity_registry.clear()
+    user_context_cache.clear()
@@ -0,0 +1,105 @@
+# tests/mock_anthropic.py
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+class MockAnthropicServer:
+    """
+    Local stand-in for the Messages API, for exercising the extraction pipeline
+    without network access or API credits.
+
+    - `failures` is a list of HTTP status codes returned, in order, before the
+      server starts answering normally (e.g. [429, 529, 500]).
+    - Replies echo the last text block, after `latency` seconds.
+    - A document block carrying cache_control is reported as a cache write the
+      first time it is seen and as a cache read afterwards, like the real API.
+
+    Records every request and the peak number of concurrent requests.
+    Listens on a free port unless `port` is given.
+    """
+
+    def __init__(self, failures: Optional[List[int]] = None, latency: float = 0.05, port: int = 0):
+        self.failures = list(failures or [])
+        self.latency = latency
+        self.port = port
+        self.requests: List[Dict] = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._cached_documents = set()
+        self._server: Optional[uvicorn.Server] = None
+        self._thread: Optional[threading.Thread] = None
+        self.app = Starlette(routes=[Route("/v1/messages", self.messages, methods=["POST"])])
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def messages(self, request: Request) -> JSONResponse:
+        body = await request.json()
+        self.requests.append(body)
+        if self.failures:
+            status = self.failures.pop(0)
+            return JSONResponse(
+                {"type": "error", "error": {"type": "mock_error", "message": f"Mock {status}"}},
+                status_code=status,
+                headers={"retry-after": "0"},
+            )
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+        usage = {"input_tokens": 10, "output_tokens": 10, "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+        text = ""
+        for block in body["messages"][-1]["content"]:
+            if block["type"] == "document" and "cache_control" in block:
+                digest = hashlib.sha256(block["source"]["data"].encode()).hexdigest()
+                tokens = len(block["source"]["data"]) // 4
+                if digest in self._cached_documents:
+                    usage["cache_read_input_tokens"] += tokens
+                else:
+                    self._cached_documents.add(digest)
+                    usage["cache_creation_input_tokens"] += tokens
+            elif block["type"] == "text":
+                text = block["text"]
+
+        return JSONResponse({
+            "id": f"msg_{uuid.uuid4().hex}",
+            "type": "message",
+            "role": "assistant",
+            "model": body["model"],
+            "content": [{"type": "text", "text": json.dumps({"echo": text[-80:]})}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": usage,
+        })
+
+    def start(self) -> None:
+        """Serve in a background thread until stop()"""
+        config = uvicorn.Config(self.app, host="127.0.0.1", port=self.port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        self.port = self._server.servers[0].sockets[0].getsockname()[1]
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join()
+            self._server = None
@@ -0,0 +1,82 @@
+import anthropic
+import pytest
+from app.services.extraction_cache import ExtractionCache
+from app.utils.agent import Document, ExtractionPipeline
+from tests.mock_anthropic import MockAnthropicServer
+
+STEPS = [("first step", "first system"), ("second step", "second system")]
+
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def start(**kwargs):
+        mock = MockAnthropicServer(**kwargs)
+        mock.start()
+        servers.append(mock)
+        return mock
+
+    yield start
+    for mock in servers:
+        mock.stop()
+
+
+def pipeline_for(mock, **kwargs):
+    client = anthropic.AsyncAnthropic(api_key="test", base_url=mock.base_url, max_retries=0)
+    return ExtractionPipeline(client, base_delay=0.01, **kwargs)
+
+
+def documents(count):
+    return [Document.from_bytes(f"%PDF document {i}".encode(), f"doc{i}.pdf") for i in range(count)]
+
+
+async def test_retries_transient_errors(server):
+    mock = server(failures=[429, 529, 500], latency=0)
+    result = await pipeline_for(mock).call("prompt", documents(1)[0])
+    assert result == '{"echo": "prompt"}'
+    assert len(mock.requests) == 4
+
+
+async def test_gives_up_after_max_retries(server):
+    mock = server(failures=[500, 500, 500], latency=0)
+    with pytest.raises(anthropic.InternalServerError):
+        await pipeline_for(mock, max_retries=2).call("prompt", documents(1)[0])
+    assert len(mock.requests) == 3
+
+
+async def test_client_errors_are_not_retried(server):
+    mock = server(failures=[400], latency=0)
+    with pytest.raises(anthropic.BadRequestError):
+        await pipeline_for(mock).call("prompt", documents(1)[0])
+    assert len(mock.requests) == 1
+
+
+async def test_concurrency_is_capped(server):
+    mock = server(latency=0.05)
+    results = await pipeline_for(mock, max_concurrency=3).chain_many("", STEPS, documents(6))
+    assert len(results) == 6
+    assert len(mock.requests) == 12
+    assert mock.peak_in_flight == 3
+
+
+async def test_steps_share_the_cached_document_prefix(server):
+    mock = server(latency=0)
+    document = documents(1)[0]
+    await pipeline_for(mock).chain("", STEPS, document)
+    first, second = mock.requests
+    for request in (first, second):
+        block = request["messages"][0]["content"][0]
+        assert block["type"] == "document" and block["cache_control"] == {"type": "ephemeral"}
+        assert block["source"]["data"] == document.data
+    # Each step feeds the previous result into the next prompt
+    assert second["messages"][0]["content"][-1]["text"].endswith('Input: {"echo": "first step\\nInput: "}')
+
+
+async def test_identical_documents_hit_the_extraction_cache(server, client):
+    mock = server(latency=0)
+    pipeline = pipeline_for(mock, cache=ExtractionCache(client.Forms.LLM_Cache))
+    same = [Document.from_bytes(b"%PDF same", f"copy{i}.pdf") for i in range(3)]
+    results = await pipeline.chain_many("", STEPS, same)
+    assert len(set(results)) == 1
+    assert len(mock.requests) == len(STEPS)
@@ -0,0 +1,87 @@
+import time
+import pytest
+import rsa
+from jose import jwk, jwt
+from app.utils.auth import AuthError, JWKSCache, TokenVerifier
+
+ISSUER = "https://tenant.example/"
+NS = "https://sitesteer.ai/"
+
+
+def make_key(kid: str):
+    _, private = rsa.newkeys(1024)
+    private_key = jwk.construct(private.save_pkcs1().decode(), "RS256")
+    public_jwk = {**private_key.public_key().to_dict(), "kid": kid, "use": "sig"}
+    return private_key.to_pem().decode(), public_jwk
+
+
+@pytest.fixture(scope="module")
+def keys():
+    return {"old": make_key("old"), "new": make_key("new")}
+
+
+def claims(**overrides):
+    return {
+        "sub": "auth0|1", "iss": ISSUER, "aud": "api", "exp": int(time.time()) + 60,
+        f"{NS}owner_org": "org-1", f"{NS}tier": "Premium User", **overrides,
+    }
+
+
+def sign(keys, kid, body=None, signer=None):
+    return jwt.encode(body or claims(), keys[signer or kid][0], "RS256", headers={"kid": kid})
+
+
+@pytest.fixture
+def published(keys):
+    return {"keys": [keys["old"][1]], "fetches": 0}
+
+
+@pytest.fixture
+def verifier(published):
+    async def fetcher():
+        published["fetches"] += 1
+        return {"keys": published["keys"]}
+
+    cache = JWKSCache(fetcher, min_refetch_seconds=0)
+    return TokenVerifier(cache, issuer=ISSUER, audience="api", claims_namespace=NS)
+
+
+async def test_verifies_and_maps_namespaced_claims(keys, verifier, published):
+    user = await verifier.verify(sign(keys, "old"))
+    assert (user.sub, user.owner_org, user.tier) == ("auth0|1", "org-1", "Premium User")
+    for _ in range(5):
+        await verifier.verify(sign(keys, "old"))
+    assert published["fetches"] == 1
+
+
+async def test_rotated_key_is_fetched_on_unknown_kid(keys, verifier, published):
+    await verifier.verify(sign(keys, "old"))
+    published["keys"] = [keys["old"][1], keys["new"][1]]
+    user = await verifier.verify(sign(keys, "new"))
+    assert user.sub == "auth0|1"
+    assert published["fetches"] == 2
+
+
+@pytest.mark.parametrize("case", ["unknown kid", "wrong key", "expired", "wrong audience", "no audience", "wrong issuer", "no subject"])
+async def test_rejects_bad_tokens(keys, verifier, case):
+    token = {
+        "unknown kid": lambda: sign(keys, "nope", signer="new"),
+        "wrong key": lambda: sign(keys, "old", signer="new"),
+        "expired": lambda: sign(keys, "old", claims(exp=int(time.time()) - 60)),
+        "wrong audience": lambda: sign(keys, "old", claims(aud="other")),
+        "no audience": lambda: sign(keys, "old", {k: v for k, v in claims().items() if k != "aud"}),
+        "wrong issuer": lambda: sign(keys, "old", claims(iss="https://evil.example/")),
+        "no subject": lambda: sign(keys, "old", {k: v for k, v in claims().items() if k != "sub"}),
+    }[case]()
+    with pytest.raises(AuthError):
+        await verifier.verify(token)
+
+
+async def test_rejects_malformed_token(verifier):
+    with pytest.raises(AuthError):
+        await verifier.verify("junk")
+
+
+def test_audience_is_required(published):
+    with pytest.raises(ValueError):
+        TokenVerifier(JWKSCache(lambda: published), issuer=ISSUER, audience="")
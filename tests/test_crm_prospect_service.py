@@ -0,0 +1,53 @@
+import pytest
+from app.services.crm_service import CRM_Service
+from app.services.prospect_service import Prospect_Service
+
+
+@pytest.fixture
+async def org(client):
+    await client.Forms.CRM.insert_one({"owner_org": "o", "items": [
+        {"companyId": "c1", "customer_name": "A", "customer_address": "x", "contact": "k", "email": "e",
+         "telephone": "t", "vat_number": "v", "company_number": "n"},
+        {"companyId": "c2", "customer_name": "B"},
+    ]})
+    await client.Forms.Prospects.insert_one({"owner_org": "o", "items": [
+        {"companyId": "c1", "projectId": "p1", "projectName": "P1", "site_address": "s", "status": "Active"},
+        {"companyId": "c1", "projectId": "p2", "projectName": "P2", "site_address": "s2", "status": "Archived"},
+        {"companyId": "c3", "projectId": "p3", "projectName": "P3", "site_address": "s3", "status": None},
+    ]})
+    return client
+
+
+async def test_crm_customer_list_projects_summary_fields(org):
+    customers = (await CRM_Service(org).customer_list("o")).model_dump()["customers"]
+    assert customers[0] == {"companyId": "c1", "customer_name": "A", "customer_address": "x",
+                            "vat_number": "v", "company_number": "n", "telephone": "t"}
+    assert customers[1]["customer_address"] == ""
+    assert (await CRM_Service(org).customer_list("none")).customers == []
+
+
+async def test_prospect_customer_list_only_has_companies_with_prospects(org):
+    customers = (await Prospect_Service(org).customer_list("o")).customers
+    assert [c.companyId for c in customers] == ["c1", "c3"]
+    assert customers[1].customer_name == "Unknown"
+
+
+async def test_prospect_list(org):
+    prospects = (await Prospect_Service(org).prospect_list("o")).prospects
+    assert [p.projectId for p in prospects] == ["p1", "p2", "p3"]
+
+
+async def test_merged_prospect_data(org):
+    service = Prospect_Service(org)
+    items = (await service.get_merged_prospect_data("o")).items
+    assert [(i.projectId, i.companyName) for i in items] == [("p1", "A"), ("p2", "A"), ("p3", "Unknown")]
+    active = (await service.get_active_merged_prospect_data("o")).items
+    assert [i.projectId for i in active] == ["p1", "p3"]
+
+
+async def test_merged_prospect_lookup(org):
+    service = Prospect_Service(org)
+    assert (await service.get_merged_prospect("o", "c1", "p2")).projectId == "p2"
+    # An unknown project falls back to the company's first project
+    assert (await service.get_merged_prospect("o", "c1", "zz")).projectId == "p1"
+    assert await service.get_merged_prospect("o", "c9") is None
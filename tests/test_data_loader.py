@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime
+import pytest
+from app.api.v1.endpoints.invoice import get_merged_invoice_data
+from app.services.data_loader import OrgDataLoader
+from app.services.invoice_service import Invoice_Service
+from app.services.quote_service import Quote_Service
+
+
+@pytest.fixture
+def loader():
+    loader = OrgDataLoader()
+    loader.fetches = []
+    fetch = loader._fetch
+
+    async def counting(collection, futures):
+        loader.fetches.append((collection.name, sorted(futures)))
+        await fetch(collection, futures)
+    loader._fetch = counting
+    return loader
+
+
+async def test_concurrent_loads_are_batched_and_deduplicated(client, loader):
+    await client.Forms.Quotes.insert_many([{"owner_org": "a", "items": []}, {"owner_org": "b", "items": []}])
+    a, b, again = await asyncio.gather(
+        loader.load(client.Forms.Quotes, "a"),
+        loader.load(client.Forms.Quotes, "b"),
+        loader.load(client.Forms.Quotes, "a"),
+    )
+    assert loader.fetches == [("Quotes", ["a", "b"])]
+    assert (a["owner_org"], b["owner_org"]) == ("a", "b")
+    assert again is a
+    assert await loader.load(client.Forms.Quotes, "c") is None
+
+
+async def test_loads_are_memoized_until_invalidated(client, loader):
+    await client.Forms.Quotes.insert_one({"owner_org": "a", "items": []})
+    await loader.load(client.Forms.Quotes, "a")
+    await loader.load(client.Forms.Quotes, "a")
+    assert len(loader.fetches) == 1
+    loader.invalidate(client.Forms.Quotes, "a")
+    await loader.load(client.Forms.Quotes, "a")
+    assert len(loader.fetches) == 2
+
+
+async def test_merged_invoice_reads_each_collection_once(client, loader):
+    now = datetime(2024, 1, 1)
+    await client.Forms.CRM.insert_one({"owner_org": "o", "items": [{
+        "companyId": "c1", "customer_name": "A", "customer_address": "x", "contact": "k", "email": "e",
+        "telephone": "t", "vat_number": "v", "company_number": "n"}]})
+    await client.Forms.Prospects.insert_one({"owner_org": "o", "items": [
+        {"companyId": "c1", "projectId": "p1", "projectName": "P1", "site_address": "s", "status": "Active"}]})
+    await client.Forms.Quotes.insert_one({"owner_org": "o", "items": [{
+        "name": "q", "last_updated": now, "quoteId": "q1", "projectId": "p1", "companyId": "c1", "status": "Created",
+        "terms": "30", "issue_date": now, "quoteTotal": 1, "lineItems": [], "quote_number": "7"}]})
+    await client.Forms.Invoices.insert_one({"owner_org": "o", "items": [{
+        "name": "i", "last_updated": now, "invoiceId": "i1", "quoteId": "q1", "projectId": "p1", "companyId": "c1",
+        "status": "Created", "terms": "30", "issue_date": now, "cis_reversal": False, "invoiceTotal": 1, "lineItems": []}]})
+    await client.Forms.Company_Details.insert_one({
+        "owner_org": "o", "companyName": "Me", "companyAddress": "a", "companyVat": "v",
+        "companyEmail": "e", "companyTelephone": "t", "companyId": "x"})
+
+    invoices, quotes = Invoice_Service(client, loader), Quote_Service(client, loader)
+    for _ in range(2):
+        merged = await get_merged_invoice_data(
+            "o", "i1", invoices.company_service, invoices.prospect_service, quotes, invoices)
+        assert (merged.customer_name, merged.projectName, merged.quote_number, merged.companyName) == ("A", "P1", "7", "Me")
+    collections = [name for name, _ in loader.fetches]
+    assert sorted(collections) == sorted(set(collections))
@@ -0,0 +1,258 @@
+import asyncio
+import random
+import pytest
+from app.config import settings
+from app.schemas.dynamic_entity import (
+    DynamicField, EntityFilter, EntityQuery, EntitySchema, FieldMapping, WorkflowDefinition, WorkflowStep,
+)
+from app.services.dynamic_entity_service import DynamicEntityService
+from app.services.entity_registry import entity_registry
+
+
+def field(name, field_type="string", required=False, **kwargs):
+    return DynamicField(field_name=name, field_type=field_type, required=required, **kwargs)
+
+
+def count_queries(monkeypatch, collection, names=None):
+    """Record find/find_one calls on the motor collection class, optionally for some collections only"""
+    calls = []
+    cls = type(collection)
+    for method in ("find", "find_one"):
+        original = getattr(cls, method)
+
+        def counting(self, *args, _original=original, **kwargs):
+            if names is None or self.name in names:
+                calls.append(self.name)
+            return _original(self, *args, **kwargs)
+        monkeypatch.setattr(cls, method, counting)
+    return calls
+
+
+@pytest.fixture
+def service(client):
+    return DynamicEntityService(client)
+
+
+@pytest.fixture
+async def project_workflow(service):
+    await service.create_schema("co", EntitySchema(schema_name="Project", fields={
+        "name": field("name", required=True), "client": field("client"), "budget": field("budget", "number")}))
+    await service.create_schema("co", EntitySchema(schema_name="Quote", fields={
+        "client": field("client"), "amount": field("amount", "number")}))
+    return await service.create_workflow(WorkflowDefinition(workflow_name="w", company_id="co", initial_step="p", steps={
+        "p": WorkflowStep(step_name="p", schema_name="Project", next_steps=["q"], field_mappings=[
+            FieldMapping(source_schema="Project", source_field="client", target_schema="Quote", target_field="client"),
+            FieldMapping(source_schema="Project", source_field="budget", target_schema="Quote", target_field="amount")]),
+        "q": WorkflowStep(step_name="q", schema_name="Quote")}))
+
+
+async def test_warm_registry_makes_no_metadata_queries(service, project_workflow, monkeypatch):
+    calls = count_queries(monkeypatch, service.entities, {"entity_schemas", "workflows"})
+    await service.create_entity("co", project_workflow["id"], "p", {"name": "x"})
+    assert sorted(set(calls)) == ["entity_schemas", "workflows"]
+    calls.clear()
+    for i in range(5):
+        await service.create_entity("co", project_workflow["id"], "p", {"name": str(i)})
+    assert calls == []
+
+
+async def test_registry_loads_companies_in_one_query_per_collection(service, project_workflow, monkeypatch):
+    calls = count_queries(monkeypatch, service.entities, {"entity_schemas", "workflows"})
+    snapshots = await entity_registry.get_many(service.db, ["co", "a", "b"])
+    assert sorted(snapshots) == ["a", "b", "co"]
+    assert sorted(calls) == ["entity_schemas", "workflows"]
+
+
+async def test_writes_through_another_worker_are_found_on_a_miss(service, project_workflow, monkeypatch):
+    monkeypatch.setattr(entity_registry, "min_reload_seconds", 0)
+    # Another worker's writes reach the collections without invalidating this worker's registry
+    await entity_registry.get(service.db, "co")
+    await service.entity_schemas.insert_one({
+        "company_id": "co", "schema_name": "Invoice", "fields": {"total": field("total", "number").model_dump()}, "relationships": {}})
+    workflow = await service.workflows.insert_one(WorkflowDefinition(workflow_name="i", company_id="co", initial_step="i", steps={
+        "i": WorkflowStep(step_name="i", schema_name="Invoice")}).model_dump())
+    assert "Invoice" not in (await entity_registry.get(service.db, "co")).schemas
+
+    calls = count_queries(monkeypatch, service.entities, {"entity_schemas", "workflows"})
+    entity = await service.create_entity("co", str(workflow.inserted_id), "i", {"total": 3})
+    assert entity["data"] == {"total": 3}
+    assert (await service.query_entities("co", EntityQuery(schema_name="Invoice")))["items"][0]["id"] == entity["id"]
+    # One reload served both lookups
+    assert sorted(calls) == ["entity_schemas", "workflows"]
+
+
+async def test_missing_metadata_is_reloaded_once_before_failing(service, project_workflow, monkeypatch):
+    monkeypatch.setattr(entity_registry, "min_reload_seconds", 0)
+    await entity_registry.get(service.db, "co")
+    calls = count_queries(monkeypatch, service.entities, {"entity_schemas", "workflows"})
+    with pytest.raises(ValueError, match="Schema Nope not found"):
+        await service.query_entities("co", EntityQuery(schema_name="Nope"))
+    with pytest.raises(ValueError, match="Schema Nope not found"):
+        await service.create_workflow(WorkflowDefinition(workflow_name="n", company_id="co", initial_step="n", steps={
+            "n": WorkflowStep(step_name="n", schema_name="Nope")}))
+    assert sorted(calls) == ["entity_schemas", "entity_schemas", "workflows", "workflows"]
+
+
+async def test_misses_reload_at_most_once_per_interval(service, project_workflow, monkeypatch):
+    monkeypatch.setattr(entity_registry, "min_reload_seconds", 0.2)
+    await entity_registry.get(service.db, "co")
+    version = entity_registry.version("co")
+    calls = count_queries(monkeypatch, service.entities, {"entity_schemas", "workflows"})
+    for _ in range(3):
+        with pytest.raises(ValueError, match="Schema Nope not found"):
+            await service.query_entities("co", EntityQuery(schema_name="Nope"))
+    assert calls == []
+    await asyncio.sleep(0.2)
+    with pytest.raises(ValueError, match="Schema Nope not found"):
+        await service.query_entities("co", EntityQuery(schema_name="Nope"))
+    assert sorted(calls) == ["entity_schemas", "workflows"]
+    # A miss does not count as a write
+    assert entity_registry.version("co") == version
+
+
+async def test_create_entity_validates_and_propagates(service, project_workflow):
+    with pytest.raises(ValueError, match="name"):
+        await service.create_entity("co", project_workflow["id"], "p", {})
+    with pytest.raises(ValueError, match="Workflow not found"):
+        await service.create_entity("other", project_workflow["id"], "p", {"name": "x"})
+    project = await service.create_entity("co", project_workflow["id"], "p", {"name": "x", "client": "ACME", "budget": 5})
+    quote = await service.entities.find_one({"schema_name": "Quote"})
+    assert quote["data"] == {"client": "ACME", "amount": 5}
+    assert quote["source_entity_id"] == project["id"]
+
+
+async def test_bulk_create_reports_errors_by_row(service, project_workflow):
+    rows = [{"name": f"p{i}", "client": f"c{i}", "budget": i} for i in range(5)]
+    rows += [{"client": "no name"}, {"name": "x", "budget": "12"}]
+    result = await service.bulk_create_entities("co", project_workflow["id"], "p", rows)
+    assert (result["inserted"], result["propagated"]) == (5, 5)
+    assert sorted(result["errors"]) == [5, 6]
+    assert "name" in result["errors"][5]
+    assert await service.entities.count_documents({"schema_name": "Quote"}) == 5
+
+
+@pytest.fixture
+async def chain(service):
+    await service.create_schema("co", EntitySchema(schema_name="Project", fields={"name": field("name")}))
+    await service.create_schema("co", EntitySchema(schema_name="Quote", fields={"client": field("client")},
+                                                   relationships={"project": "Project"}))
+    await service.create_schema("co", EntitySchema(schema_name="Invoice", fields={"n": field("n")},
+                                                   relationships={"quote": "Quote"}))
+    workflow = await service.create_workflow(WorkflowDefinition(workflow_name="w", company_id="co", initial_step="p", steps={
+        "p": WorkflowStep(step_name="p", schema_name="Project", next_steps=["q"]),
+        "q": WorkflowStep(step_name="q", schema_name="Quote", next_steps=["i"]),
+        "i": WorkflowStep(step_name="i", schema_name="Invoice")}))
+    project = await service.create_entity("co", workflow["id"], "p", {"name": "P"})
+    quotes = [await service.create_entity("co", workflow["id"], "q", {"client": str(i)}, {"project": [project["id"]]})
+              for i in range(3)]
+    invoice = await service.create_entity("co", workflow["id"], "i", {"n": "1"}, {"quote": [quotes[0]["id"]]})
+    return workflow, project, quotes, invoice
+
+
+@pytest.mark.parametrize("relationships, message", [
+    ("project", "must reference an existing Quote"),
+    ("undeclared", "not declared"),
+    ("bad id", "Invalid entity id"),
+])
+async def test_relationships_are_checked(service, chain, relationships, message):
+    workflow, project, _, _ = chain
+    relationships = {
+        "project": {"quote": [project["id"]]},
+        "undeclared": {"nope": [project["id"]]},
+        "bad id": {"quote": ["zz"]},
+    }[relationships]
+    with pytest.raises(ValueError, match=message):
+        await service.create_entity("co", workflow["id"], "i", {}, relationships)
+
+
+async def test_traversal_takes_one_query_per_hop(service, chain, monkeypatch):
+    _, project, quotes, invoice = chain
+    calls = count_queries(monkeypatch, service.entities, {"entities"})
+    related = await service.traverse("co", project["id"], max_depth=3)
+    assert [(d["schema_name"], d["depth"]) for d in related] == [("Quote", 1)] * 3 + [("Invoice", 2)]
+    # The start entity, then one query per hop
+    assert len(calls) == 1 + 3
+    related = await service.traverse("co", invoice["id"], max_depth=3, schema_names=["Quote", "Invoice"])
+    assert [(d["schema_name"], d["depth"]) for d in related] == [("Quote", 1)]
+
+
+async def test_link_entities(service, chain):
+    _, _, quotes, invoice = chain
+    assert [d["schema_name"] for d in await service.get_related_entities("co", quotes[0]["id"], "quote")] == ["Invoice"]
+    await service.link_entities("co", invoice["id"], {"quote": [quotes[1]["id"]]})
+    related = await service.get_related_entities("co", invoice["id"])
+    assert [d["data"] for d in related] == [{"client": "0"}, {"client": "1"}]
+
+
+@pytest.fixture
+async def quotes(service):
+    await service.create_schema("co", EntitySchema(schema_name="Quote", fields={
+        "client": field("client", indexed=True), "amount": field("amount", "number", indexed=True),
+        "issued": field("issued", "date"), "tags": field("tags", "array", items=field("tag"))}))
+    workflow = await service.create_workflow(WorkflowDefinition(
+        workflow_name="w", company_id="co", initial_step="q", steps={"q": WorkflowStep(step_name="q", schema_name="Quote")}))
+    rng = random.Random(1)
+    rows = [{"client": rng.choice("ABC"), "amount": rng.choice([None, 1, 2, 3, 4.5]),
+             "issued": f"2024-0{1 + i % 9}-01", "tags": ["x"] if i % 2 else []} for i in range(50)]
+    await service.bulk_create_entities("co", workflow["id"], "q", rows)
+    return rows
+
+
+async def test_indexed_fields_get_indexes(service, quotes):
+    assert {"entity_field_co.Quote.amount", "entity_field_co.Quote.client"} <= set(await service.entities.index_information())
+    with pytest.raises(ValueError, match="Only scalar fields"):
+        await service.create_schema("co", EntitySchema(schema_name="Bad", fields={"t": field("t", "array", indexed=True)}))
+
+
+async def test_indexed_fields_are_limited_per_company(service, monkeypatch):
+    monkeypatch.setattr(settings, "ENTITY_MAX_FIELD_INDEXES_PER_COMPANY", 2)
+    indexed = {name: field(name, indexed=True) for name in "abc"}
+    with pytest.raises(ValueError, match="Too many indexed fields"):
+        await service.create_schema("co", EntitySchema(schema_name="Wide", fields=indexed))
+    # Rejected whole: neither the schema nor any index was created
+    assert await service.entity_schemas.count_documents({}) == 0
+    assert not [name for name in await service.entities.index_information() if name.startswith("entity_field_")]
+
+    await service.create_schema("co", EntitySchema(schema_name="Narrow", fields={"a": indexed["a"], "b": indexed["b"]}))
+    # Another company has its own quota
+    await service.create_schema("other", EntitySchema(schema_name="Narrow", fields={"a": indexed["a"]}))
+    with pytest.raises(ValueError, match="2, 2 are in use"):
+        await service.create_schema("co", EntitySchema(schema_name="More", fields={"c": indexed["c"]}))
+    # The collection-wide budget still applies
+    monkeypatch.setattr(settings, "ENTITY_MAX_FIELD_INDEXES", 3)
+    with pytest.raises(ValueError, match="Indexed field limit reached"):
+        await service.create_schema("third", EntitySchema(schema_name="Narrow", fields={"a": indexed["a"]}))
+
+
+@pytest.mark.parametrize("descending", [False, True])
+async def test_cursor_pagination_visits_every_entity_once_in_order(service, quotes, descending):
+    query = EntityQuery(schema_name="Quote", filters=[EntityFilter(field="client", op="in", value=["A", "B"])],
+                        sort_by="amount", descending=descending, limit=7)
+    seen = []
+    while True:
+        page = await service.query_entities("co", query)
+        seen += [(d["data"].get("amount"), d["_id"]) for d in page["items"]]
+        if not page["next_cursor"]:
+            break
+        query = query.model_copy(update={"cursor": page["next_cursor"]})
+    expected = sorted((r.get("amount") for r in quotes if r["client"] in "AB"),
+                      key=lambda a: (a is not None, a or 0), reverse=descending)
+    assert len({entity_id for _, entity_id in seen}) == len(seen)
+    assert [amount for amount, _ in seen] == expected
+
+
+async def test_query_filters(service, quotes):
+    page = await service.query_entities("co", EntityQuery(schema_name="Quote", filters=[
+        EntityFilter(field="issued", op="gte", value="2024-08-01"), EntityFilter(field="tags", value="x")], limit=100))
+    assert len(page["items"]) == sum(1 for i, r in enumerate(quotes) if r["issued"] >= "2024-08-01" and i % 2)
+
+
+@pytest.mark.parametrize("query, message", [
+    (EntityQuery(schema_name="Quote", filters=[EntityFilter(field="nope", value=1)]), "Unknown field"),
+    (EntityQuery(schema_name="Quote", filters=[EntityFilter(field="amount", op="gt", value="x")]), "Invalid value"),
+    (EntityQuery(schema_name="Quote", cursor="zzz"), "Invalid cursor"),
+    (EntityQuery(schema_name="Nope"), "not found"),
+])
+async def test_invalid_queries_are_rejected(service, quotes, query, message):
+    with pytest.raises(ValueError, match=message):
+        await service.query_entities("co", query)
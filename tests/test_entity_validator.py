@@ -0,0 +1,74 @@
+from datetime import datetime
+import pytest
+from app.utils.entity_validator import EntityValidator
+
+FIELDS = {
+    "name": {"field_type": "string", "required": True},
+    "stage": {"field_type": "string", "required": True, "default_value": "Lead"},
+    "budget": {"field_type": "number", "required": True},
+    "start": {"field_type": "date"},
+    "active": {"field_type": "boolean", "default_value": True},
+    "tags": {"field_type": "array", "items": {"field_type": "string"}},
+    "site": {"field_type": "object", "properties": {
+        "postcode": {"field_type": "string", "required": True},
+        "floors": {"field_type": "number", "default_value": 1},
+    }},
+}
+
+
+@pytest.fixture
+def validator():
+    return EntityValidator("Project", FIELDS)
+
+
+def test_valid_data_gets_parsed_dates_and_defaults(validator):
+    result = validator.validate({"name": "P", "budget": 10, "start": "2024-01-02", "site": {"postcode": "AB1"}})
+    assert result["start"] == datetime(2024, 1, 2)
+    assert result["active"] is True
+    assert result["site"] == {"postcode": "AB1", "floors": 1}
+
+
+@pytest.mark.parametrize("data, message", [
+    ({"budget": 1}, "name: Field required"),
+    ({"name": "P", "budget": "12"}, "budget"),
+    ({"name": "P", "budget": 1, "active": 1}, "active"),
+    ({"name": "P", "budget": 1, "extra": 1}, "extra"),
+    ({"name": "P", "budget": 1, "site": {}}, "site.postcode"),
+    ({"name": "P", "budget": 1, "tags": ["a", 2]}, "tags.1"),
+])
+def test_invalid_data_is_rejected(validator, data, message):
+    with pytest.raises(ValueError, match=message):
+        validator.validate(data)
+
+
+def test_defaults_are_not_shared_between_results(validator):
+    first = validator.validate({"name": "P", "budget": 1, "site": {"postcode": "A"}})
+    first["site"]["floors"] = 9
+    assert validator.validate({"name": "P", "budget": 1, "site": {"postcode": "B"}})["site"]["floors"] == 1
+
+
+def test_validate_many_reports_errors_by_index(validator):
+    valid, errors = validator.validate_many([{"name": "a", "budget": 1}, {"budget": 1}, {"name": "c", "budget": 3}])
+    assert [row["name"] for row in valid] == ["a", "c"]
+    assert list(errors) == [1]
+    assert "name" in errors[1]
+
+
+def test_defaults_fill_required_fields_and_are_type_checked(validator):
+    data = {"name": "P", "budget": 1, "site": {"postcode": "A"}}
+    assert validator.validate(data)["stage"] == "Lead"
+    # The input is left as it was
+    assert data == {"name": "P", "budget": 1, "site": {"postcode": "A"}}
+    broken = EntityValidator("Project", {"budget": {"field_type": "number", "default_value": "12"}})
+    with pytest.raises(ValueError, match="budget"):
+        broken.validate({})
+
+
+def test_validate_many_validates_each_payload_once(validator, monkeypatch):
+    calls = []
+    fill = validator._fill
+    monkeypatch.setattr(validator, "_fill", lambda data: calls.append(data) or fill(data))
+    valid, errors = validator.validate_many([{"name": "a", "budget": 1}, {"budget": "x"}, {"name": "c", "budget": 3}])
+    assert len(calls) == 3
+    assert [(row["name"], row["stage"]) for row in valid] == [("a", "Lead"), ("c", "Lead")]
+    assert list(errors) == [1] and "budget" in errors[1]
@@ -0,0 +1,123 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from pymongo.errors import OperationFailure
+from app.config import settings
+from app.services.event_bus import EventBus, InMemoryChangeSource, MongoChangeSource
+from app.services.event_consumers import register_consumers
+
+
+@pytest.fixture(autouse=True)
+def fast_bus(monkeypatch):
+    monkeypatch.setattr(settings, "EVENT_BUS_RETRY_SECONDS", 0.001)
+    monkeypatch.setattr(settings, "EVENT_BUS_CHECKPOINT_SECONDS", 0)
+
+
+async def settle(condition, timeout=1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not await condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.005)
+
+
+async def test_org_metrics_follow_slate_changes(client):
+    db = client.Forms
+    source = InMemoryChangeSource()
+    bus = EventBus(source, db)
+    register_consumers(bus, client)
+    await bus.start()
+    try:
+        now = datetime.utcnow()
+        slates = [{"owner_org": "org", "status": False, "due_date": now + timedelta(days=3)},
+                  {"owner_org": "org", "status": False, "due_date": now - timedelta(days=2)},
+                  {"owner_org": "org", "status": True, "due_date": now - timedelta(days=4)}]
+        await db.Assigned_Slates.insert_many(slates)
+        for slate in slates:
+            await source.publish("Assigned_Slates", "insert", slate["_id"], document=slate)
+
+        async def refreshed():
+            metrics = await db.OrganizationMetrics.find_one({"owner_org": "org"})
+            return metrics is not None and metrics["total_slates"] == 3
+        await settle(refreshed)
+        metrics = await db.OrganizationMetrics.find_one({"owner_org": "org"})
+        assert (metrics["overdue_slates"], metrics["average_overdue"], metrics["project_health"]) == (1, 2, 50)
+    finally:
+        await bus.stop()
+
+
+async def test_failing_handler_is_dead_lettered_and_group_moves_on(client):
+    db = client.Forms
+    source = InMemoryChangeSource()
+    bus = EventBus(source, db)
+    seen = []
+
+    @bus.subscribe("flaky", ["Quotes"])
+    async def flaky(event):
+        seen.append(event.document_id)
+        if event.document_id == 1:
+            raise RuntimeError("boom")
+
+    await bus.start()
+    try:
+        await source.publish("Quotes", "update", 1, document={})
+        await source.publish("Quotes", "update", 2, document={})
+
+        async def delivered():
+            return 2 in seen
+        await settle(delivered)
+    finally:
+        await bus.stop()
+    assert seen.count(1) == settings.EVENT_BUS_MAX_ATTEMPTS
+    dead = await db.Event_Bus_Dead_Letters.find({}).to_list(None)
+    assert [(d["group"], d["document_id"]) for d in dead] == [("flaky", 1)]
+
+
+async def test_group_resumes_after_its_checkpoint(client):
+    db = client.Forms
+    source = InMemoryChangeSource()
+    bus = EventBus(source, db)
+    first = []
+
+    @bus.subscribe("g", ["Quotes"])
+    async def handler(event):
+        first.append(event.token)
+
+    await bus.start()
+    await source.publish("Quotes", "insert", 1)
+
+    async def delivered():
+        return first == [1]
+    await settle(delivered)
+    await bus.stop()
+
+    await source.publish("Quotes", "insert", 2)
+    bus = EventBus(source, db)
+    second = []
+
+    @bus.subscribe("g", ["Quotes"])
+    async def resumed(event):
+        second.append(event.token)
+
+    await bus.start()
+
+    async def caught_up():
+        return second == [2]
+    try:
+        await settle(caught_up)
+    finally:
+        await bus.stop()
+
+
+def test_unknown_collections_are_rejected(client):
+    bus = EventBus(InMemoryChangeSource(), client.Forms)
+    with pytest.raises(ValueError):
+        bus.subscribe("g", ["Nope"])
+
+
+async def test_missing_pre_images_stop_the_worker():
+    class NoPreImages:
+        async def command(self, command):
+            raise OperationFailure("changeStreamPreAndPostImages is not supported", code=2)
+
+    with pytest.raises(RuntimeError, match="pre-images on Assigned_Slates"):
+        await MongoChangeSource(NoPreImages()).enable_pre_images("Assigned_Slates")
@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from app.services.extraction_cache import ExtractionCache, extraction_cache_key
+
+
+def test_key_covers_document_model_and_prompts():
+    key = extraction_cache_key("doc", "model", "prompt", "system")
+    assert key == extraction_cache_key("doc", "model", "prompt", "system")
+    assert len({key, extraction_cache_key("doc2", "model", "prompt", "system"),
+                extraction_cache_key("doc", "model2", "prompt", "system"),
+                extraction_cache_key("doc", "model", "prompt2", "system"),
+                extraction_cache_key("doc", "model", "prompt", None)}) == 5
+
+
+async def test_concurrent_misses_share_one_computation(client):
+    cache = ExtractionCache(client.Forms.LLM_Cache, memory_entries=2)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*(cache.get_or_compute("k", "m", compute) for _ in range(5)))
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert cache.stats()["misses"] == 1
+
+
+async def test_results_are_shared_through_the_collection(client):
+    async def compute():
+        return "result"
+
+    await ExtractionCache(client.Forms.LLM_Cache).get_or_compute("k", "m", compute)
+    other_worker = ExtractionCache(client.Forms.LLM_Cache)
+
+    async def fail():
+        raise AssertionError("should be cached")
+
+    assert await other_worker.get_or_compute("k", "m", fail) == "result"
+    assert await other_worker.get_or_compute("k", "m", fail) == "result"
+    assert (other_worker.db_hits, other_worker.memory_hits) == (1, 1)
+
+
+async def test_memory_is_bounded_lru(client):
+    cache = ExtractionCache(client.Forms.LLM_Cache, memory_entries=2)
+    for key in ("a", "b"):
+        await cache.put(key, key, "m")
+    await cache.get("a")
+    await cache.put("c", "c", "m")
+    assert list(cache._memory) == ["a", "c"]
+
+
+async def test_failures_are_not_cached(client):
+    cache = ExtractionCache(client.Forms.LLM_Cache)
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_compute("k", "m", fail)
+    assert await cache.get("k") is None
@@ -0,0 +1,25 @@
+from app.services.index_service import INDEX_REGISTRY, QUERY_SHAPES, Index_Service
+
+
+async def test_ensure_indexes_creates_registry_and_is_idempotent(client):
+    service = Index_Service(client)
+    created = await service.ensure_indexes()
+    assert set(created) == set(INDEX_REGISTRY)
+    assert "owner_org_1" in created["Quotes"]
+    assert await service.index_drift() == {}
+    assert await service.ensure_indexes() == {}
+
+
+async def test_index_drift_reports_missing_indexes(client):
+    service = Index_Service(client)
+    await service.ensure_indexes()
+    await client.Forms.Quotes.drop_index("owner_org_1")
+    assert "owner_org_1" in str(await service.index_drift())
+
+
+def test_every_query_shape_has_registered_indexes():
+    # Shapes on _id alone are served by the default index
+    assert [
+        (collection, query_filter) for collection, query_filter, _ in QUERY_SHAPES
+        if collection not in INDEX_REGISTRY and set(query_filter) != {"_id"}
+    ] == []
@@ -0,0 +1,96 @@
+from datetime import datetime
+import pytest
+from app.schemas.collections import CRM_Data, Invoice_Complete_Data, PricingData, Prospect_Data, Quote_Complete_Data
+from app.schemas.company import Company
+from app.services.company_service import Company_Service
+from app.services.crm_service import CRM_Service
+from app.services.invoice_service import Invoice_Service
+from app.services.prospect_service import Prospect_Service
+from app.services.quote_service import Quote_Service
+from app.utils.model_utils import SCHEMA_VERSION_FIELD, construct_model, is_trusted, read_model
+from app.utils.responses import ModelResponse
+
+# Documents as older versions of the app wrote them: numbers stored as
+# strings, dates as ISO strings, optional fields missing, no schema marker
+LEGACY_QUOTES = {"owner_org": "o", "items": [{
+    "name": "Facade", "last_updated": "2024-10-31T12:00:00", "quoteId": "q1", "projectId": "p1",
+    "companyId": "c1", "status": "Created", "terms": "30 Days", "issue_date": datetime(2024, 10, 31),
+    "quoteTotal": "5055.89",
+    "lineItems": [{"lineItem": "Labour", "quantity": "10", "units": "/ hour", "pricePerUnit": 100}],
+}]}
+LEGACY_INVOICES = {"owner_org": "o", "items": [{
+    "name": "Facade", "last_updated": datetime(2024, 11, 1, 9, 30), "invoiceId": "i1", "quoteId": "q1",
+    "projectId": "p1", "companyId": "c1", "status": "Paid", "terms": "30 Days", "issue_date": "2024-11-01",
+    "cis_reversal": "false", "invoiceTotal": "1200",
+    "lineItems": [{"lineItem": "Labour", "quantity": 10, "units": "/ hour", "pricePerUnit": "120.5"}],
+}]}
+LEGACY_CRM = {"owner_org": "o", "items": [{
+    "companyId": "c1", "customer_name": "A", "customer_address": "x", "contact": "k", "email": "e",
+    "telephone": "t", "vat_number": "v", "company_number": "n"}]}
+LEGACY_PROSPECTS = {"owner_org": "o", "items": [{
+    "companyId": "c1", "projectId": "p1", "projectName": "P1", "site_address": "s", "status": None}]}
+LEGACY_PRICING = {"owner_org": "o", "items": [{
+    "category": "Labour", "vatPercentage": "20", "cost": "35.5", "units": "/ hour", "currency": "GBP"}]}
+LEGACY_COMPANY = {"owner_org": "o", "companyName": "Me", "companyAddress": "a", "companyVat": "v",
+                  "companyEmail": "e", "companyTelephone": "t", "companyId": "x"}
+
+
+def body(model) -> bytes:
+    return ModelResponse(model).body
+
+
+@pytest.fixture
+async def legacy(client):
+    db = client.Forms
+    await db.Quotes.insert_one(dict(LEGACY_QUOTES))
+    await db.Invoices.insert_one(dict(LEGACY_INVOICES))
+    await db.CRM.insert_one(dict(LEGACY_CRM))
+    await db.Prospects.insert_one(dict(LEGACY_PROSPECTS))
+    await db.Pricing.insert_one(dict(LEGACY_PRICING))
+    await db.Company_Details.insert_one(dict(LEGACY_COMPANY))
+    return client
+
+
+async def test_legacy_documents_read_like_validated_models(legacy):
+    assert body(await Quote_Service(legacy).get_quote_data("o")) == body(Quote_Complete_Data.model_validate(LEGACY_QUOTES))
+    assert body(await Invoice_Service(legacy).get_invoice_data("o")) == body(Invoice_Complete_Data.model_validate(LEGACY_INVOICES))
+    assert body(await CRM_Service(legacy).get_crm_data("o")) == body(CRM_Data.model_validate(LEGACY_CRM))
+    assert body(await Prospect_Service(legacy).get_prospect_data("o")) == body(Prospect_Data.model_validate(LEGACY_PROSPECTS))
+    assert body(await Company_Service(legacy).get_pricing_data("o")) == body(PricingData.model_validate(LEGACY_PRICING))
+    assert body(await Company_Service(legacy).get_company_details("o")) == body(Company.model_validate(LEGACY_COMPANY))
+
+
+async def test_legacy_single_items_are_validated(legacy):
+    quote = await Quote_Service(legacy).get_single_quote_data("o", "q1")
+    assert quote.quoteTotal == 5055.89
+    assert quote.issue_date == datetime(2024, 10, 31)
+    assert quote.lineItems[0].quantity == 10.0
+    invoice = await Invoice_Service(legacy).get_single_invoice_data("o", "i1")
+    assert invoice.cis_reversal is False
+    assert invoice.last_updated == datetime(2024, 11, 1, 9, 30)
+
+
+async def test_documents_written_by_the_services_are_stamped_and_read_back_unchanged(legacy):
+    quotes = Quote_Service(legacy)
+    await quotes.update_quote_data("o", Quote_Complete_Data.model_validate(LEGACY_QUOTES))
+    stored = await legacy.Forms.Quotes.find_one({"owner_org": "o"})
+    assert is_trusted(stored)
+    read = await Quote_Service(legacy).get_quote_data("o")
+    # last_updated is set on write and stored at millisecond precision
+    assert body(read) == body(Quote_Complete_Data.model_validate(stored))
+
+    crm = CRM_Service(legacy)
+    written = await crm.update_crm_data("o", CRM_Data.model_validate(LEGACY_CRM))
+    assert is_trusted(await legacy.Forms.CRM.find_one({"owner_org": "o"}))
+    assert body(await CRM_Service(legacy).get_crm_data("o")) == body(written)
+
+
+def test_read_model_only_skips_validation_for_trusted_documents():
+    item = LEGACY_QUOTES["items"][0]
+    assert not is_trusted(LEGACY_QUOTES)
+    assert not is_trusted({**LEGACY_QUOTES, SCHEMA_VERSION_FIELD: 0})
+    validated = read_model(Quote_Complete_Data.model_fields["items"].annotation.__args__[0], item, trusted=False)
+    assert validated.quoteTotal == 5055.89
+    constructed = read_model(type(validated), validated.model_dump(), trusted=True)
+    assert constructed == validated
+    assert construct_model(type(validated), item).quoteTotal == "5055.89"
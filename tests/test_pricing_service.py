@@ -0,0 +1,107 @@
+import random
+from decimal import Decimal
+import orjson
+from app.services.pricing_service import (
+    Pricing_Service, compute_batch_totals, compute_totals, to_decimal, vat_rates_from_pricing,
+)
+from app.schemas.collections import Invoice_Complete_Data, Quote_Complete_Data
+from app.schemas.quote import QuoteDownloadModel
+from app.services.invoice_service import Invoice_Service
+from app.services.quote_service import Quote_Service
+from app.utils.generate_pdf import generate_quote_pdf, totals_table
+from app.utils.responses import ModelResponse
+
+LINE_ITEMS = [
+    {"lineItem": "Labour", "quantity": 10, "units": "/h", "pricePerUnit": 100},
+    {"lineItem": "Material", "quantity": 1, "units": "/p", "pricePerUnit": 6000.5},
+]
+PARTIES = [
+    "projectName", "customer_name", "customer_address", "site_address", "telephone", "vat_number",
+    "company_number", "companyName", "companyAddress", "companyVat", "companyEmail", "companyTelephone",
+]
+RATES = vat_rates_from_pricing([{"category": "Labour", "vatPercentage": 20}, {"category": "material", "vatPercentage": 5}])
+
+
+def test_to_decimal_keeps_float_digits():
+    assert to_decimal(0.1) == Decimal("0.1")
+    assert to_decimal(None) == to_decimal("") == Decimal(0)
+
+
+def test_totals_round_vat_per_line():
+    totals = compute_totals(LINE_ITEMS, RATES)
+    assert totals.line_totals == [Decimal("1000.00"), Decimal("6000.50")]
+    # 200.00 + 300.025 rounded half up
+    assert totals.vat_total == Decimal("500.03")
+    assert totals.grand_total == Decimal("7500.53")
+
+
+def test_reverse_charge_vat_is_not_payable():
+    totals = compute_totals(LINE_ITEMS, RATES, reverse_charge=True)
+    assert totals.vat_total == Decimal("500.03")
+    assert totals.vat_payable == Decimal("0.00")
+    assert totals.grand_total == totals.net_total
+
+
+def test_unknown_categories_use_the_default_rate():
+    totals = compute_batch_totals([([{"lineItem": "Other", "quantity": 1, "pricePerUnit": 10}], False)], RATES, default_vat=20)
+    assert totals[0].vat_total == Decimal("2.00")
+
+
+def test_batch_matches_per_document():
+    rng = random.Random(7)
+    documents = [
+        ([{"lineItem": rng.choice(["Labour", "Material", "Other"]), "quantity": rng.randint(1, 40),
+           "pricePerUnit": round(rng.uniform(1, 500), 2)} for _ in range(rng.randint(0, 6))], i % 3 == 0)
+        for i in range(50)
+    ]
+    assert compute_batch_totals(documents, RATES) == [compute_totals(items, RATES, reverse) for items, reverse in documents]
+
+
+async def test_totals_report_flags_mismatched_stored_totals(client):
+    await client.Forms.Pricing.insert_one({"owner_org": "o", "items": [
+        {"category": "Labour", "vatPercentage": 20, "cost": 1, "units": "h", "currency": "GBP"},
+        {"category": "Material", "vatPercentage": 5, "cost": 1, "units": "h", "currency": "GBP"}]})
+    await client.Forms.Quotes.insert_one({"owner_org": "o", "items": [
+        {"quoteId": "q1", "companyId": "c", "status": "Draft", "quoteTotal": 8560.53, "lineItems": LINE_ITEMS}]})
+    await client.Forms.Invoices.insert_one({"owner_org": "o", "items": [
+        {"invoiceId": "i1", "companyId": "c", "status": "Paid", "cis_reversal": True, "invoiceTotal": 7000.5,
+         "lineItems": LINE_ITEMS}]})
+
+    report = orjson.loads(ModelResponse(await Pricing_Service(client).totals_report("o")).body)
+    assert report["quotes"][0]["difference"] == "1060.00"
+    assert report["quotes"][0]["matches"] is False
+    assert report["invoices"][0]["totals"]["vat_payable"] == "0.00"
+    assert report["invoices"][0]["matches"] is True
+    assert (report["quotes_total"], report["invoices_total"], report["mismatches"]) == ("7500.53", "7000.50", 1)
+
+
+async def test_writes_store_server_computed_totals_and_pdfs_print_them(client):
+    await client.Forms.Pricing.insert_one({"owner_org": "o", "items": [
+        {"category": "Labour", "vatPercentage": 20, "cost": 1, "units": "h", "currency": "GBP"},
+        {"category": "Material", "vatPercentage": 5, "cost": 1, "units": "h", "currency": "GBP"}]})
+    common = {"name": "n", "last_updated": "2024-10-31T12:00:00", "projectId": "p", "companyId": "c",
+              "status": "Draft", "terms": "30 Days", "issue_date": "2024-10-31T00:00:00", "lineItems": LINE_ITEMS}
+    quotes = Quote_Complete_Data.model_validate({"owner_org": "o", "items": [{**common, "quoteId": "q1", "quoteTotal": 1}]})
+    invoices = Invoice_Complete_Data.model_validate({"owner_org": "o", "items": [
+        {**common, "invoiceId": "i1", "quoteId": "q1", "cis_reversal": True, "invoiceTotal": 1}]})
+    quote_service, invoice_service = Quote_Service(client), Invoice_Service(client)
+    await quote_service.update_quote_data("o", quotes)
+    await invoice_service.update_invoice_data("o", invoices)
+
+    quote = (await client.Forms.Quotes.find_one({}))["items"][0]
+    invoice = (await client.Forms.Invoices.find_one({}))["items"][0]
+    assert (quote["quoteTotal"], quote["vatTotal"]) == (7500.53, 500.03)
+    # Reverse charge: VAT is shown but not added to the total
+    assert (invoice["invoiceTotal"], invoice["vatTotal"]) == (7000.5, 500.03)
+
+    # A later change of rate does not change what was issued
+    await client.Forms.Pricing.update_one({"owner_org": "o"}, {"$set": {"items.0.vatPercentage": 0}})
+    quote_totals = await Pricing_Service(client).document_totals("o", (await quote_service.get_quote_data("o")).items[0])
+    assert quote_totals == compute_totals(LINE_ITEMS, RATES)
+    invoice_totals = await Pricing_Service(client).document_totals("o", (await invoice_service.get_invoice_data("o")).items[0], True)
+    assert invoice_totals == compute_totals(LINE_ITEMS, RATES, reverse_charge=True)
+
+    rows = [row[3:] for row in totals_table(invoice_totals, [100] * 5)._cellvalues]
+    assert rows == [["Subtotal:", "£7,000.50"], ["VAT:", "£500.03"], ["VAT payable:", "£0.00"], ["Total:", "£7,000.50"]]
+    pdf = generate_quote_pdf(QuoteDownloadModel(**quote, totals=quote_totals, **dict.fromkeys(PARTIES, "x")))
+    assert pdf.getvalue().startswith(b"%PDF")
@@ -0,0 +1,29 @@
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from app.services.project_service import Project_Service
+from app.services.slates_service import SLATE
+
+
+async def test_deleting_a_project_removes_its_slates(client):
+    db = client.Forms
+    service = Project_Service(client)
+    project = await db.Projects.insert_one({"owner": "org", "projectName": "Site A"})
+    await db.Assigned_Slates.insert_many([
+        {"owner": "org", "project": "Site A", "assignee": "a@x.com"},
+        {"owner": "org", "project": "Site A", "assignee": "b@x.com"},
+        {"owner": "org", "project": "Site B", "assignee": "a@x.com"},
+        {"owner": "other", "project": "Site A", "assignee": "c@x.com"},
+    ])
+
+    await service.delete_project(str(project.inserted_id), "Site A", "org")
+    remaining = await db.Assigned_Slates.find({}, {"_id": 0, "owner": 1, "project": 1}).to_list(None)
+    assert sorted((s["owner"], s["project"]) for s in remaining) == [("org", "Site B"), ("other", "Site A")]
+    tombstones = await db.Slate_Tombstones.find({}).to_list(None)
+    assert sorted((t["kind"], t["assignee"]) for t in tombstones) == [(SLATE, "a@x.com"), (SLATE, "b@x.com")]
+
+
+async def test_deleting_a_missing_project_is_not_found(client):
+    with pytest.raises(HTTPException) as error:
+        await Project_Service(client).delete_project(str(ObjectId()), "Site A", "org")
+    assert error.value.status_code == 404
@@ -0,0 +1,39 @@
+from datetime import datetime
+import gzip
+import orjson
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from starlette.requests import Request
+from app.schemas.collections import Quote_Complete_Data
+from app.utils.responses import ModelResponse, gzipped
+
+
+def request(accept_encoding: str = "") -> Request:
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    return Request({"type": "http", "headers": headers})
+
+
+def test_model_response_matches_fastapi_encoding():
+    now = datetime(2024, 5, 1, 12, 30)
+    payload = Quote_Complete_Data(owner_org="o", items=[{
+        "name": "Quote", "last_updated": now, "quoteId": "q1", "projectId": "p", "companyId": "c",
+        "status": "Created", "terms": "30 Days", "issue_date": now, "quoteTotal": 10.5,
+        "lineItems": [{"lineItem": "Item", "quantity": 2, "units": "/ hour", "pricePerUnit": 5.25}],
+    }])
+    assert orjson.loads(ModelResponse(payload).body) == jsonable_encoder(payload)
+
+
+def test_model_response_serializes_raw_documents():
+    object_id = ObjectId()
+    body = orjson.loads(ModelResponse([{"_id": object_id, "count": 1}]).body)
+    assert body == [{"_id": str(object_id), "count": 1}]
+
+
+def test_gzipped_only_compresses_large_bodies_for_accepting_clients():
+    response = ModelResponse({"items": ["x" * 20] * 100})
+    compressed = gzipped(request("gzip, deflate"), response)
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(compressed.body) == response.body
+    assert gzipped(request(), response) is response
+    small = ModelResponse({"ok": True})
+    assert gzipped(request("gzip"), small) is small
@@ -0,0 +1,45 @@
+import json
+import threading
+from app.utils.result_store import ResultStore, iter_records, store_files
+from app.utils.validate_form import stream_validate_results, validation_report
+
+VALID = json.dumps({"formStructure": {
+    "header": {"mainTitle": {"name": "Site survey"}, "subTitles": {}},
+    "formFields": [{"form_index": 1, "name": "Date", "elementType": "date"}],
+}})
+
+
+def test_concurrent_appends_are_all_written_and_rotated(tmp_path):
+    store = ResultStore(str(tmp_path), max_bytes=20_000)
+
+    def write(n):
+        for i in range(n):
+            store.append("{}", file=f"f{i}.pdf")
+
+    threads = [threading.Thread(target=write, args=(200,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store.flush()
+    store.close()
+
+    ids = [record["id"] for record in iter_records(str(tmp_path))]
+    assert len(ids) == len(set(ids)) == 800
+    # Rotated files are at least max_bytes; the active file, if any, is the remainder
+    rotated = [path for path in store_files(str(tmp_path)) if path != store.active_path]
+    assert rotated and all(path.stat().st_size >= 20_000 for path in rotated)
+
+
+def test_validation_report_matches_streaming_pass(tmp_path):
+    store = ResultStore(str(tmp_path))
+    for i in range(30):
+        store.append('{"formStructure": {}}' if i % 10 == 0 else VALID, file=f"f{i}.pdf")
+    store.append("not json", file="bad.pdf")
+    store.close()
+
+    streamed = list(stream_validate_results(str(tmp_path)))
+    report = validation_report(str(tmp_path), workers=2, chunk_size=7)
+    assert report["total"] == len(streamed) == 31
+    assert report["valid"] == sum(1 for result in streamed if result["valid"])
+    assert {result["file"] for result in report["invalid_records"]} == {"f0.pdf", "f10.pdf", "f20.pdf", "bad.pdf"}
@@ -0,0 +1,59 @@
+from datetime import datetime
+import orjson
+from app.schemas.slate import AssignSlateModel
+from app.services.slate_stream import RESYNC, SlateEventHub, assignee_topic, org_topic, slate_hub
+from app.services.slates_service import Slates_Service
+
+
+async def drain(subscription):
+    frames = []
+    while (frame := await subscription.next(0.01)) is not None:
+        frames.append(frame)
+    return frames
+
+
+def parse(frame):
+    lines = dict(line.split(": ", 1) for line in frame.decode().strip().split("\n"))
+    return lines["event"], orjson.loads(lines["data"])
+
+
+async def test_slate_writes_reach_assignee_and_org_subscribers(client):
+    service = Slates_Service(client)
+    now = datetime.now()
+    with slate_hub.subscribe([assignee_topic("a@x")]) as assignee, \
+            slate_hub.subscribe([org_topic("org")]) as org, \
+            slate_hub.subscribe([assignee_topic("a@x"), org_topic("org")]) as both:
+        slate = await service.assign_slate(AssignSlateModel(
+            database_id=None, title="T", projectId="p", description="d", due_date=now, assigned_date=now,
+            assignee="a@x", owner_org="org", last_updated=now, status=False, fields=[], data={"x": 1}))
+        await service.update_slate(slate["id"], {"status": True, "data": {"x": 2}})
+
+        assignee_frames = [parse(frame) for frame in await drain(assignee)]
+        assert [event for event, _ in assignee_frames] == ["assigned", "submitted"]
+        assert assignee_frames[0][1]["data"] == {"x": 1}
+        assert assignee_frames[1][1] == {"status": True, "data": {"x": 2}, "database_id": slate["id"]}
+
+        # The org gets summary fields only
+        org_frames = [parse(frame) for frame in await drain(org)]
+        assert "data" not in org_frames[0][1] and org_frames[0][1]["title"] == "T"
+        assert org_frames[1][1] == {"status": True, "database_id": slate["id"]}
+
+        # Subscribed to both: the assignee copy, once
+        assert [parse(frame) for frame in await drain(both)] == assignee_frames
+    assert slate_hub.subscriber_count() == 0
+
+
+async def test_slow_subscriber_gets_a_resync_instead_of_its_backlog():
+    hub = SlateEventHub(queue_size=50)
+    with hub.subscribe([org_topic("org")]) as subscription:
+        for i in range(250):
+            hub.publish([org_topic("org")], "updated", {"i": i})
+        frames = [parse(frame) for frame in await drain(subscription)]
+    assert len(frames) == 50
+    assert frames[0] == (RESYNC, {"dropped": 200})
+    assert frames[-1] == ("updated", {"i": 249})
+
+
+async def test_publish_without_subscribers_is_a_no_op():
+    hub = SlateEventHub(queue_size=10)
+    assert hub.publish([org_topic("org")], "updated", {}) == 0
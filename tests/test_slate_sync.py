@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from app.config import settings
+from app.schemas.slate import AssignSlateModel, CreateTemplateModel, SlateFieldChanges
+from app.services.slates_service import Slates_Service
+
+
+@pytest.fixture
+async def synced(client):
+    service = Slates_Service(client)
+    now = datetime.now()
+    ids = []
+    for i in range(3):
+        slate = await service.assign_slate(AssignSlateModel(
+            database_id=None, title=f"S{i}", projectId="p", description="d", due_date=now, assigned_date=now,
+            assignee="a@x", owner_org="org", last_updated=now - timedelta(days=400), status=False,
+            fields=[], data={"x": 1, "y": 1}))
+        ids.append(slate["id"])
+    template = await service.create_slate(CreateTemplateModel(
+        title="T", description="", owner_org="org", last_updated=now, status=True, fields=[], data={}))
+    full = await service.sync("a@x", "org")
+    return service, ids, template["id"], full
+
+
+async def test_full_sync_then_delta(synced, monkeypatch):
+    service, ids, template_id, full = synced
+    assert full.reset is True
+    assert (len(full.slates), len(full.templates)) == (3, 1)
+
+    monkeypatch.setattr(settings, "SLATE_SYNC_OVERLAP_SECONDS", 0)
+    await service.update_slate(ids[0], {"data": {"x": 1, "y": 2}})
+    await service.delete_slate_template(template_id)
+    delta = await service.sync("a@x", "org", full.token)
+    assert delta.reset is False
+    assert ids[0] in [slate["database_id"] for slate in delta.slates]
+    assert delta.deleted_templates == [template_id]
+
+
+async def test_submit_merges_fields_and_reports_conflicts(client, synced):
+    service, ids, _, full = synced
+    base = full.slates[0]["last_updated"]
+    # Another device changed y since the base
+    await service.update_slate(ids[0], {"data": {"x": 1, "y": 2}})
+
+    results = await service.sync_submit("a@x", [
+        SlateFieldChanges(database_id=ids[0], base=base, data={"x": 5, "y": 9}),
+        SlateFieldChanges(database_id=ids[1], base=base, data={"x": 7}, status=True),
+        SlateFieldChanges(database_id=ids[2], base=base, data={"x": 1}),
+        SlateFieldChanges(database_id="nope", base=base, data={}),
+    ])
+    assert [(r.result, r.applied, r.conflicts) for r in results] == [
+        ("conflict", ["x"], {"y": 2}),
+        ("applied", ["x"], {}),
+        ("applied", [], {}),
+        ("not_found", [], {}),
+    ]
+    stored = await client.Forms.Assigned_Slates.find_one({"_id": ObjectId(ids[0])})
+    assert stored["data"] == {"x": 5, "y": 2}
+
+
+async def test_invalid_input_is_rejected(synced):
+    service, ids, _, full = synced
+    with pytest.raises(ValueError, match="Invalid sync token"):
+        await service.sync("a@x", "org", "garbage")
+    with pytest.raises(ValueError, match="Invalid field name"):
+        await service.sync_submit("a@x", [SlateFieldChanges(database_id=ids[0], base=datetime.now(), data={"a.b": 1})])
+
+
+async def test_expired_token_resets(synced):
+    service = synced[0]
+    token = service._encode_sync_token(datetime.utcnow() - timedelta(days=31))
+    assert (await service.sync("a@x", "org", token)).reset is True
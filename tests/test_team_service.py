@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+import pytest
+from app.services.team_service import MEMBERSHIPS_BACKFILL, Team_Service
+from app.services.user_service import User_Service
+
+
+@pytest.fixture
+async def team(client):
+    await client.Forms.Users.insert_many([
+        {"email": "a", "name": "A", "organization": "o", "organization_id": [{"K": "Premium User"}], "auth0_id": "1"},
+        {"email": "b", "name": "B", "organization": "o", "organization_id": [{"K": "Team Member"}, {"Z": "Premium User"}],
+         "auth0_id": None},
+    ])
+    return Team_Service(client)
+
+
+async def test_backfill_reruns_for_users_without_memberships(team, client):
+    assert await team.backfill_memberships() == 2
+    user = await client.Forms.Users.find_one({"email": "b"})
+    assert [m["org"] for m in user["org_memberships"]] == ["K", "Z"]
+    marker = await client.Forms.Migrations.find_one({"_id": MEMBERSHIPS_BACKFILL})
+    assert marker["locked_until"] is None and marker["updated"] == 2
+
+    # Nothing left to do: the marker is not even locked
+    assert await team.backfill_memberships() == 0
+    assert await client.Forms.Migrations.find_one({"_id": MEMBERSHIPS_BACKFILL}) == marker
+
+    # Users written without org_memberships later are picked up on the next startup
+    await client.Forms.Users.insert_one({"email": "c", "organization_id": [{"K": "Team Member"}]})
+    assert await team.backfill_memberships() == 1
+    assert [m["org"] for m in (await client.Forms.Users.find_one({"email": "c"}))["org_memberships"]] == ["K"]
+
+
+async def test_backfill_skips_while_another_worker_holds_the_lock(team, client):
+    await client.Forms.Migrations.insert_one({
+        "_id": MEMBERSHIPS_BACKFILL, "locked_until": datetime.utcnow() + timedelta(minutes=5)})
+    assert await team.backfill_memberships() is None
+    assert await client.Forms.Users.count_documents({"org_memberships": {"$exists": True}}) == 0
+
+
+async def test_backfill_takes_over_an_expired_lock(team, client):
+    await client.Forms.Migrations.insert_one({
+        "_id": MEMBERSHIPS_BACKFILL, "locked_until": datetime.utcnow() - timedelta(minutes=1)})
+    assert await team.backfill_memberships() == 2
+
+
+async def test_failed_backfill_releases_the_lock(team, client, monkeypatch):
+    async def fail():
+        raise RuntimeError("boom")
+    monkeypatch.setattr(team, "_backfill_memberships", fail)
+    with pytest.raises(RuntimeError):
+        await team.backfill_memberships()
+    monkeypatch.undo()
+    assert await team.backfill_memberships() == 2
+
+
+async def test_team_membership_changes(team):
+    await team.backfill_memberships()
+    listed = await team.list_team_users("a")
+    assert ([u["email"] for u in listed["users"]], listed["premium_key"]) == (["a", "b"], "K")
+    await team.add_user("a", {"email": "c", "name": "C", "premiumKey": "K", "subscription_tier": "Team Member"})
+    assert [u["email"] for u in (await team.list_team_users("a"))["users"]] == ["a", "b", "c"]
+    removed = await team.remove_team_users(["b", "c", "zz"], "K")
+    assert removed["updated_users"] == ["b", "c"]
+    assert [u["email"] for u in (await team.list_team_users("a"))["users"]] == ["a"]
+
+
+async def test_cached_context_is_dropped_after_the_write_commits(team, client, monkeypatch):
+    users = User_Service(client)
+    await team.backfill_memberships()
+    context = await users.get_user_context(email="b")
+    assert next(m["tier"] for m in context.memberships if m["org"] == "K") == "Team Member"
+
+    # A request reading the user while the write is in flight caches the old context
+    collection = type(client.Forms.Users)
+    update_one = collection.update_one
+
+    async def racing_update(self, *args, **kwargs):
+        await users.get_user_context(email="b")
+        return await update_one(self, *args, **kwargs)
+    monkeypatch.setattr(collection, "update_one", racing_update)
+
+    await team.add_user("a", {"email": "b", "name": "B", "premiumKey": "K", "subscription_tier": "Admin"})
+    context = await users.get_user_context(email="b")
+    assert next(m["tier"] for m in context.memberships if m["org"] == "K") == "Admin"
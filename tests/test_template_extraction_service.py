@@ -0,0 +1,126 @@
+import asyncio
+import io
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from starlette.datastructures import Headers, UploadFile
+import app.services.template_extraction_service as template_extraction
+from app.config import settings
+from app.services.template_extraction_service import Template_Extraction_Service, TemplateExtractionWorker
+from app.utils.agent import TEMPLATE_EXTRACTION_STEPS
+
+SAMPLE = TEMPLATE_EXTRACTION_STEPS[0][0]
+SAMPLE = SAMPLE[SAMPLE.index("{"):SAMPLE.rindex("}") + 1]
+
+
+class FakeSpaces:
+    def __init__(self):
+        self.objects = {}
+
+    def upload_fileobj(self, file_obj, bucket, key, ExtraArgs=None):
+        self.objects[key] = file_obj.read()
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+
+class FakePipeline:
+    def __init__(self, reply=SAMPLE, delay=0.0):
+        self.reply = reply
+        self.delay = delay
+        self.calls = 0
+
+    async def chain(self, input, steps, document):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return f"```json\n{self.reply}\n```"
+
+
+@pytest.fixture(autouse=True)
+def spaces(monkeypatch):
+    fake = FakeSpaces()
+    monkeypatch.setattr(template_extraction, "spaces_client", fake)
+    return fake
+
+
+@pytest.fixture
+def service(client):
+    return Template_Extraction_Service(client)
+
+
+async def create_job(service):
+    upload = UploadFile(io.BytesIO(b"%PDF-1.4 form"), filename="form.pdf", headers=Headers({"content-type": "application/pdf"}))
+    return await service.create_job("org-1", upload)
+
+
+async def test_job_runs_to_a_template(service, client):
+    job = await create_job(service)
+    await service.run_job(job.job_id, FakePipeline())
+    job = await service.get_job("org-1", job.job_id)
+    assert job.status == "succeeded" and job.claimed_at is not None
+    template = await client.Forms.Templates.find_one({})
+    assert str(template["_id"]) == job.template_id
+    assert template["title"] == "TOOLBOX TALK 2024" and template["status"] is False
+
+
+async def test_invalid_extraction_fails_the_job(service):
+    job = await create_job(service)
+    await service.run_job(job.job_id, FakePipeline('{"nope": 1}'))
+    job = await service.get_job("org-1", job.job_id)
+    assert job.status == "failed"
+    assert job.error == "Extracted form structure failed validation: Missing formStructure key"
+
+
+async def test_a_job_is_claimed_once(service, client):
+    job = await create_job(service)
+    pipeline = FakePipeline(delay=0.01)
+    await asyncio.gather(*(service.run_job(job.job_id, pipeline) for _ in range(3)))
+    assert pipeline.calls == 1
+    assert await client.Forms.Templates.count_documents({}) == 1
+
+
+async def test_only_expired_claims_are_requeued(service):
+    fresh, expired, legacy, done = [await create_job(service) for _ in range(4)]
+    now = datetime.utcnow()
+    lease = timedelta(seconds=settings.TEMPLATE_EXTRACTION_LEASE_SECONDS)
+    for job, update in [
+        (fresh, {"status": "running", "claimed_at": now}),
+        (expired, {"status": "running", "claimed_at": now - lease - timedelta(seconds=1)}),
+        # Claimed before claims were timestamped
+        (legacy, {"status": "running"}),
+        (done, {"status": "succeeded"}),
+    ]:
+        await service.jobs.update_one({"_id": ObjectId(job.job_id)}, {"$set": update})
+
+    assert sorted(await service.queued_job_ids()) == sorted([expired.job_id, legacy.job_id])
+    assert (await service.get_job("org-1", fresh.job_id)).status == "running"
+
+
+async def test_superseded_worker_does_not_record_its_outcome(service):
+    job = await create_job(service)
+    object_id = ObjectId(job.job_id)
+
+    class Requeued(FakePipeline):
+        async def chain(self, input, steps, document):
+            # The lease expires mid-run and another worker takes the job over
+            await service.jobs.update_one({"_id": object_id}, {"$set": {"status": "running", "claimed_at": datetime(2000, 1, 1)}})
+            return await super().chain(input, steps, document)
+
+    await service.run_job(job.job_id, Requeued())
+    job = await service.get_job("org-1", job.job_id)
+    assert job.status == "running" and job.template_id is None
+
+
+async def test_worker_processes_submitted_and_recovered_jobs(service, client):
+    recovered = await create_job(service)
+    await service.jobs.update_one({"_id": ObjectId(recovered.job_id)}, {"$set": {"status": "running"}})
+    worker = TemplateExtractionWorker(2)
+    await worker.start(client, FakePipeline())
+    try:
+        submitted = await create_job(service)
+        worker.submit(submitted.job_id)
+        await worker.join()
+    finally:
+        await worker.stop()
+    for job in (recovered, submitted):
+        assert (await service.get_job("org-1", job.job_id)).status == "succeeded"
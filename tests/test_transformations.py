@@ -0,0 +1,52 @@
+from datetime import datetime
+import pytest
+from app.utils.transformations import MAX_STRING_LENGTH, TransformationError, compile_transformation
+
+
+@pytest.mark.parametrize("expression, value, data, expected", [
+    ("round(value * 1.2, 2)", 10, {}, 12.0),
+    ('format("Invoice for {}", upper(value))', "acme", {}, "Invoice for ACME"),
+    ("add_days(value, 30)", "2024-01-15", {}, datetime(2024, 2, 14)),
+    ("add_months(value, 1)", "2024-01-31", {}, datetime(2024, 2, 29)),
+    ('lookup(value, {"S": "Small"}, "Other")', "S", {}, "Small"),
+    ('concat(data["client"], " - ", value)', 3, {"client": "A"}, "A - 3"),
+    ("value if value > 0 else 0", -5, {}, 0),
+    ("value % 7", 23, {}, 2),
+    ('value + "!"', "hi", {}, "hi!"),
+])
+def test_expressions(expression, value, data, expected):
+    assert compile_transformation(expression).apply(value, data) == expected
+
+
+@pytest.mark.parametrize("expression", [
+    "value.__class__",
+    "__import__('os')",
+    "open('x')",
+    "[x for x in value]",
+    "lambda: 1",
+    "value" + " + 1" * 300,
+])
+def test_unsafe_expressions_are_rejected(expression):
+    with pytest.raises(TransformationError):
+        compile_transformation(expression)
+
+
+@pytest.mark.parametrize("expression", [
+    '"x" * 1000000000',
+    'format("{0.__class__}", value)',
+    'format("{:999999999}", value)',
+    'format("{:{}}", value, 9999999)',
+    'format("{:*>9}", value)',
+    '"%9999999s" % value',
+    '"%*d" % [9999999, 1]',
+    'concat(value, value)',
+    'upper(value + value)',
+])
+def test_runaway_evaluation_is_rejected(expression):
+    with pytest.raises((TypeError, ValueError)):
+        compile_transformation(expression).apply("v" * (MAX_STRING_LENGTH // 2 + 1))
+
+
+def test_apply_many_gives_none_for_failing_rows():
+    transformation = compile_transformation("100 / value")
+    assert transformation.apply_many([4, 0, 5], [{}, {}, {}]) == [25.0, None, 20.0]
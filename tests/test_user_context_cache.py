@@ -0,0 +1,50 @@
+import time
+from app.schemas.user import UserContext
+from app.services.user_context_cache import UserContextCache
+
+
+def context(email, auth0_id=None, tier="Team Member"):
+    return UserContext(email=email, auth0_id=auth0_id, tier=tier)
+
+
+def test_lookup_by_email_and_auth0_id():
+    cache = UserContextCache(ttl_seconds=60)
+    cache.put(context("a", "auth0|a"))
+    assert cache.get(email="a") is cache.get(auth0_id="auth0|a")
+    cache.invalidate(auth0_id="auth0|a")
+    assert cache.get(email="a") is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = UserContextCache(ttl_seconds=60, max_entries=2)
+    cache.put(context("a", "auth0|a"))
+    cache.put(context("b"))
+    cache.get(email="a")
+    cache.put(context("c"))
+    assert len(cache) == 2
+    assert cache.get(email="b") is None
+    assert cache.get(auth0_id="auth0|a").email == "a"
+
+
+def test_expired_entries_are_evicted_first(monkeypatch):
+    cache = UserContextCache(ttl_seconds=10, max_entries=2)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache.put(context("old", "auth0|old"))
+    monkeypatch.setattr(time, "monotonic", lambda: now + 5)
+    cache.put(context("b"))
+    cache.get(email="old")  # still fresh, so most recently used
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    cache.put(context("c"))
+    assert len(cache) == 2
+    assert cache.get(email="b").email == "b"
+    assert cache.get(auth0_id="auth0|old") is None
+
+
+def test_put_replaces_an_entry_and_its_auth0_id():
+    cache = UserContextCache(ttl_seconds=60, max_entries=2)
+    cache.put(context("a", "auth0|1"))
+    cache.put(context("a", "auth0|2"))
+    assert len(cache) == 1
+    assert cache.get(auth0_id="auth0|1") is None
+    assert cache.get(auth0_id="auth0|2").email == "a"
@@ -0,0 +1,151 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from app.schemas.dynamic_entity import DynamicField, EntitySchema, FieldMapping, WorkflowDefinition, WorkflowStep
+from app.services.dynamic_entity_service import DynamicEntityService
+from app.services.index_service import INDEX_REGISTRY
+from app.services.workflow_runtime import WorkflowRuntimeService, WorkflowWorker
+
+
+def field(name, field_type="string", required=False):
+    return DynamicField(field_name=name, field_type=field_type, required=required)
+
+
+@pytest.fixture
+async def runtime(client):
+    entities = DynamicEntityService(client)
+    await client.Forms.workflow_events.create_indexes(INDEX_REGISTRY["workflow_events"])
+    await entities.create_schema("co", EntitySchema(schema_name="Project", fields={
+        "name": field("name", required=True), "client": field("client"), "budget": field("budget", "number")}))
+    await entities.create_schema("co", EntitySchema(schema_name="Quote", fields={
+        "client": field("client", required=True), "amount": field("amount", "number"), "note": field("note")}))
+    await entities.create_schema("co", EntitySchema(schema_name="Survey", fields={
+        "client": field("client"), "date": field("date")}))
+    workflow = await entities.create_workflow(WorkflowDefinition(workflow_name="w", company_id="co", initial_step="p", steps={
+        "p": WorkflowStep(step_name="p", schema_name="Project", next_steps=["q", "s"], field_mappings=[
+            FieldMapping(source_schema="Project", source_field="client", target_schema="Quote", target_field="client"),
+            FieldMapping(source_schema="Project", source_field="budget", target_schema="Quote", target_field="amount"),
+            FieldMapping(source_schema="Project", source_field="client", target_schema="Survey", target_field="client")]),
+        "q": WorkflowStep(step_name="q", schema_name="Quote"),
+        "s": WorkflowStep(step_name="s", schema_name="Survey")}))
+    worker = WorkflowWorker(2)
+    await worker.start(client)
+    service = WorkflowRuntimeService(client)
+    instance = await service.start_instance("co", workflow["id"])
+    yield service, entities, worker, instance["id"]
+    await worker.stop()
+
+
+async def test_steps_activate_in_order_and_propagate(runtime):
+    service, entities, worker, instance_id = runtime
+    with pytest.raises(ValueError, match="not active"):
+        await service.complete_step("co", instance_id, "q", {"client": "x"})
+    with pytest.raises(ValueError, match="name"):
+        await service.complete_step("co", instance_id, "p", {"client": "x"})
+
+    result = await service.complete_step("co", instance_id, "p", {"name": "P", "client": "ACME", "budget": 10})
+    worker.submit(result["event_id"])
+    assert {k: v["status"] for k, v in result["instance"]["steps"].items()} == {"p": "completed", "q": "active", "s": "active"}
+    await worker.join()
+    drafts = await entities.entities.find({"schema_name": {"$ne": "Project"}}).to_list(None)
+    assert sorted((d["step_name"], d["data"]["client"]) for d in drafts) == [("q", "ACME"), ("s", "ACME")]
+
+    # Completing the draft step merges into the propagated draft
+    result = await service.complete_step("co", instance_id, "q", {"note": "hi"})
+    worker.submit(result["event_id"])
+    assert result["entity"]["data"] == {"client": "ACME", "amount": 10, "note": "hi"}
+    assert result["instance"]["status"] == "active"
+    result = await service.complete_step("co", instance_id, "s", {"date": "d"})
+    worker.submit(result["event_id"])
+    await worker.join()
+    assert result["instance"]["status"] == "completed"
+    assert await entities.entities.count_documents({}) == 3
+    events = await service.list_events("co", instance_id)
+    assert [(e["type"], e["processed"]) for e in events] == [("instance_started", True)] + [("step_completed", True)] * 3
+
+
+async def test_completing_a_step_twice_is_idempotent(runtime):
+    service, entities, worker, instance_id = runtime
+    first = await service.complete_step("co", instance_id, "p", {"name": "P", "client": "ACME", "budget": 10})
+    again = await service.complete_step("co", instance_id, "p", {"name": "other"})
+    assert (first["duplicate"], again["duplicate"]) == (False, True)
+    assert again["entity"]["data"]["name"] == "P"
+    worker.submit(first["event_id"])
+    await worker.join()
+    assert await service.replay("co", instance_id) == 1
+    assert await entities.entities.count_documents({}) == 3
+
+
+def statuses(instance):
+    return {name: step["status"] for name, step in instance["steps"].items()}
+
+
+async def test_retry_finishes_a_completion_that_stopped_before_advancing(runtime, monkeypatch):
+    service, entities, worker, instance_id = runtime
+
+    async def crash(*args):
+        raise RuntimeError("worker died")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(service, "_advance", crash)
+        with pytest.raises(RuntimeError):
+            await service.complete_step("co", instance_id, "p", {"name": "P", "client": "ACME"})
+    assert statuses(await service.get_instance("co", instance_id))["p"] == "active"
+
+    again = await service.complete_step("co", instance_id, "p", {"name": "other"})
+    assert again["duplicate"] and again["entity"]["data"]["name"] == "P"
+    assert statuses(again["instance"]) == {"p": "completed", "q": "active", "s": "active"}
+
+
+async def test_worker_finishes_a_completion_that_stopped_before_activating_next_steps(runtime):
+    service, entities, worker, instance_id = runtime
+    result = await service.complete_step("co", instance_id, "p", {"name": "P", "client": "ACME"})
+    # As if the request died between completing p and activating its next steps
+    await service.instances.update_one(
+        {"_id": result["instance"]["_id"]}, {"$set": {"steps.q.status": "pending", "steps.s.status": "pending"}}
+    )
+    worker.submit(result["event_id"])
+    await worker.join()
+    instance = await service.get_instance("co", instance_id)
+    assert instance["status"] == "active"
+    assert statuses(instance) == {"p": "completed", "q": "active", "s": "active"}
+    assert await entities.entities.count_documents({"step_name": {"$in": ["q", "s"]}}) == 2
+
+
+async def test_instance_is_not_completed_while_next_steps_await_activation(runtime):
+    service, entities, worker, instance_id = runtime
+    result = await service.complete_step("co", instance_id, "p", {"name": "P", "client": "ACME"})
+    await service.instances.update_one({"_id": result["instance"]["_id"]}, {"$set": {"steps.q.status": "pending"}})
+    # s completing sees no active step, but p's next step q is still to be activated
+    done = await service.complete_step("co", instance_id, "s", {})
+    assert done["instance"]["status"] == "active"
+    assert await service.replay("co", instance_id) == 2
+    instance = await service.get_instance("co", instance_id)
+    assert (instance["status"], statuses(instance)["q"]) == ("active", "active")
+
+
+async def test_stale_completion_without_an_entity_can_be_retried(runtime):
+    service, entities, worker, instance_id = runtime
+    instance = await service.get_instance("co", instance_id)
+    # The request died after writing p's entity but before recording it on the event
+    await entities.create_entity("co", instance["workflow_id"], "p", {"name": "P"}, instance_id=instance_id, propagate=False)
+    event = await service._record(instance["_id"], "co", "step_completed", "p", step_name="p", entity_id=None, data={})
+    with pytest.raises(ValueError, match="already being completed"):
+        await service.complete_step("co", instance_id, "p", {"name": "P2"})
+
+    await service.events.update_one({"_id": event["_id"]}, {"$set": {"created_at": datetime.now() - timedelta(hours=1)}})
+    result = await service.complete_step("co", instance_id, "p", {"name": "P2"})
+    assert not result["duplicate"] and result["entity"]["data"]["name"] == "P2"
+    assert statuses(result["instance"])["p"] == "completed"
+    assert await entities.entities.count_documents({"step_name": "p"}) == 1
+
+
+async def test_concurrent_completions_apply_once(runtime):
+    service, entities, worker, instance_id = runtime
+    results = await asyncio.gather(*(
+        service.complete_step("co", instance_id, "p", {"name": str(i)}) for i in range(3)
+    ), return_exceptions=True)
+    completed = [r for r in results if isinstance(r, dict)]
+    assert [r["duplicate"] for r in completed].count(False) == 1
+    assert all(isinstance(r, ValueError) for r in results if not isinstance(r, dict))
+    assert await entities.entities.count_documents({"step_name": "p"}) == 1